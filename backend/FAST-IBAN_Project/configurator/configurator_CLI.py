@@ -107,6 +107,7 @@ class Configurator:
             "mapTypes": self.args["mapTypes"],
             "mapLevels": self.args["mapLevels"],
             "fileFormat": self.args["fileFormat"],
+            "labelMode": self.args["labelMode"],
             "noData": self.args["noData"],
             "noMaps": self.args["noMaps"],
             "omp": self.args["omp"],
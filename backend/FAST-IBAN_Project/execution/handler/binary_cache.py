@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+
+# Where the built executables are kept: <dir>/<variant>-<key>/FAST-IBAN
+BINARY_CACHE_DIR = os.getenv("BINARY_CACHE_DIR", "./bin-cache")
+# Parallel jobs of each build
+BUILD_JOBS = int(os.getenv("BUILD_JOBS", os.cpu_count() or 1))
+# Compiler flags that take part in the build (and so in the cache key)
+C_FLAGS = os.getenv("CFLAGS", "")
+C_COMPILER = os.getenv("CC", "cc")
+
+EXECUTABLE = "FAST-IBAN"
+BUILD_INFO = "build.json"
+
+# Every program the execution module can run: source tree and CMake options
+VARIANTS = {
+    "serial": ("./code", ["-DFAST_IBAN_VARIANT=serial"]),
+    "omp": ("./code", ["-DFAST_IBAN_VARIANT=omp"]),
+    "mpi": ("./code", ["-DFAST_IBAN_VARIANT=mpi"]),
+    "omp_mpi": ("./code", ["-DFAST_IBAN_VARIANT=omp_mpi"]),
+    "temperature": ("./code_t", []),
+}
+
+SOURCE_SUFFIXES = (".c", ".h", ".txt", ".cmake")
+
+
+class BinaryNotCached(LookupError):
+    """The executable of a variant is not in the cache; requests never build it."""
+
+
+def source_digest(source_dir: str) -> str:
+    """sha256 of every source file of a tree (paths and contents), skipping build folders."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("build"))
+        for name in sorted(files):
+            if name.endswith(SOURCE_SUFFIXES):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, source_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def toolchain_id() -> str:
+    """Versions of the compilers and CMake, so a toolchain upgrade rebuilds everything."""
+    versions = []
+    for tool in (C_COMPILER, "mpicc", "cmake"):
+        try:
+            output = subprocess.run([tool, "--version"], capture_output=True, text=True, timeout=30).stdout
+            versions.append(output.splitlines()[0] if output else tool)
+        except (OSError, subprocess.SubprocessError):
+            versions.append(f"{tool} missing")
+    return "|".join(versions)
+
+
+class BinaryCache:
+    """Build-once cache of the FAST-IBAN executables.
+
+    Each variant is stored under a key made of the hash of its source tree,
+    its CMake options, the compiler flags and the toolchain versions, so a
+    change to any of them builds a new entry instead of reusing a stale one.
+    ``warm`` builds what is missing (at image build or container start);
+    ``lookup`` only resolves paths and never compiles on the request path.
+    """
+
+    def __init__(self, root: str = BINARY_CACHE_DIR, variants: dict = None):
+        self.root = os.path.abspath(root)
+        self.variants = variants or VARIANTS
+        self.warm_seconds = 0.0
+        self.built = {}
+        self._keys = {}
+        self._toolchain = None
+
+    def key(self, variant: str) -> str:
+        """Cache key of a variant, computed once per process."""
+        if variant not in self._keys:
+            if variant not in self.variants:
+                raise BinaryNotCached(f"Unknown FAST-IBAN variant: {variant}")
+            if self._toolchain is None:
+                self._toolchain = toolchain_id()
+            source_dir, options = self.variants[variant]
+            payload = json.dumps([source_digest(source_dir), options, C_FLAGS, self._toolchain])
+            self._keys[variant] = hashlib.sha256(payload.encode()).hexdigest()[:16]
+        return self._keys[variant]
+
+    def entry_dir(self, variant: str) -> str:
+        return os.path.join(self.root, f"{variant}-{self.key(variant)}")
+
+    def path(self, variant: str) -> str:
+        return os.path.join(self.entry_dir(variant), EXECUTABLE)
+
+    def info(self, variant: str) -> dict:
+        """Build metadata of a cached variant (key, build seconds, date), or {} if missing."""
+        try:
+            with open(os.path.join(self.entry_dir(variant), BUILD_INFO)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, variant: str) -> str:
+        """Path of the cached executable of ``variant``.
+
+        Raises:
+            BinaryNotCached: If the variant was not built; it is never compiled here.
+        """
+        path = self.path(variant)
+        if not os.access(path, os.X_OK):
+            raise BinaryNotCached(f"FAST-IBAN '{variant}' is not built (key {self.key(variant)})")
+        return path
+
+    def build(self, variant: str) -> float:
+        """Configure and build one variant in a scratch folder and publish it atomically.
+
+        Returns:
+            float: Build time in seconds.
+        """
+        source_dir, options = self.variants[variant]
+        start_time = time.time()
+        os.makedirs(self.root, exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix=f".build-{variant}-", dir=self.root)
+        try:
+            configure = ["cmake", "-S", os.path.abspath(source_dir), "-B", build_dir, *options]
+            if C_FLAGS:
+                configure.append(f"-DCMAKE_C_FLAGS={C_FLAGS}")
+            for command in (configure, ["cmake", "--build", build_dir, "--target", EXECUTABLE, "-j", str(BUILD_JOBS)]):
+                result = subprocess.run(command, capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise RuntimeError(f"{' '.join(command[:2])} failed for '{variant}':\n{result.stdout}{result.stderr}")
+
+            entry_dir = self.entry_dir(variant)
+            os.makedirs(entry_dir, exist_ok=True)
+            staged = os.path.join(entry_dir, f".{EXECUTABLE}.tmp")
+            shutil.copy2(os.path.join(build_dir, EXECUTABLE), staged)
+            seconds = time.time() - start_time
+            with open(os.path.join(entry_dir, BUILD_INFO), "w") as f:
+                json.dump({"variant": variant, "key": self.key(variant), "seconds": round(seconds, 2),
+                           "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+            os.replace(staged, os.path.join(entry_dir, EXECUTABLE))
+            return seconds
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def warm(self, variants=None) -> dict:
+        """Make sure every variant is built, building only the missing ones.
+
+        Returns:
+            dict: {variant: seconds spent building it now, 0 for hits, None if the build failed}.
+        """
+        start_time = time.time()
+        report = {}
+        for variant in variants or self.variants:
+            try:
+                self.lookup(variant)
+                report[variant] = 0.0
+            except BinaryNotCached:
+                try:
+                    report[variant] = self.build(variant)
+                    print(f"FAST-IBAN '{variant}' built in {report[variant]:.2f} seconds ({self.key(variant)})")
+                except Exception as e:
+                    print(f"Error building FAST-IBAN '{variant}': {str(e)}")
+                    report[variant] = None
+        self.built.update(report)
+        self.warm_seconds = time.time() - start_time
+        return report
+
+
+BINARY_CACHE = BinaryCache()
+
+
+if __name__ == "__main__":
+    # Build every variant, e.g. at image build time: python3 handler/binary_cache.py
+    report = BINARY_CACHE.warm(sys.argv[1:] or None)
+    print(f"Binary cache ready in {BINARY_CACHE.warm_seconds:.2f} seconds: {report}")
+    sys.exit(1 if None in report.values() else 0)
@@ -0,0 +1,139 @@
+import os
+import re
+import time
+import asyncio
+from collections import deque
+
+# Lines of stdout/stderr kept from the engine (the rest is only parsed, never stored)
+ENGINE_OUTPUT_LINES = int(os.getenv("ENGINE_OUTPUT_LINES", 200))
+# Minimum seconds between two progress notifications
+ENGINE_PROGRESS_INTERVAL = float(os.getenv("ENGINE_PROGRESS_INTERVAL", 5))
+# Longest line read from the engine; longer ones are split
+ENGINE_LINE_LIMIT = 1024 * 1024
+
+# Per time step markers printed by every FAST-IBAN variant (English and Spanish builds)
+FILTER_DONE = re.compile(r"^#2-(\d+)\.")
+FORMATIONS_DONE = re.compile(r"^#4-(\d+)\.")
+STEP_DONE = re.compile(r"^(?:Time|Tiempo) (\d+) (?:processed|procesado)\.")
+# Size of the grid read from the NetCDF, printed once before the first step
+GRID = re.compile(r"NLON: (\d+), NLAT: (\d+), NTIME: (\d+)")
+
+
+class EngineProgress:
+    """Time steps the engine went through, parsed from its output.
+
+    MPI ranks print their own markers, so steps are kept as sets and each
+    one counts once whatever the number of ranks.
+    """
+
+    def __init__(self):
+        self.filtered = set()
+        self.formations = set()
+        self.completed = set()
+        self.lines = 0
+        self.grid = None
+
+    def parse(self, line: str) -> bool:
+        """Update from one line of stdout. Returns True when a new step reached a stage."""
+        self.lines += 1
+        if self.grid is None:
+            match = GRID.search(line)
+            if match:
+                self.grid = dict(zip(("nlon", "nlat", "ntime"), map(int, match.groups())))
+                return False
+        for pattern, steps in ((STEP_DONE, self.completed), (FORMATIONS_DONE, self.formations),
+                               (FILTER_DONE, self.filtered)):
+            match = pattern.match(line)
+            if match:
+                step = int(match.group(1))
+                if step in steps:
+                    return False
+                steps.add(step)
+                return True
+        return False
+
+    def summary(self) -> str:
+        last = max(self.completed) if self.completed else None
+        return (f"{len(self.completed)} pasos temporales procesados (último: {last}), "
+                f"{len(self.filtered)} filtrados, {len(self.formations)} con formaciones")
+
+
+class EngineRun:
+    """Result of one engine run: exit code, duration, parsed progress and the tail of its output."""
+
+    def __init__(self, returncode: int, seconds: float, progress: EngineProgress, stdout: deque, stderr: deque):
+        self.returncode = returncode
+        self.seconds = seconds
+        self.progress = progress
+        self.stdout = "\n".join(stdout)
+        self.stderr = "\n".join(stderr)
+
+
+async def _pump(stream: asyncio.StreamReader, tail: deque, on_line=None):
+    """Read ``stream`` line by line until EOF, keeping the last lines in ``tail``."""
+    while True:
+        try:
+            raw = await stream.readline()
+        except ValueError:
+            # Line over the limit: take what is buffered and go on
+            raw = await stream.read(ENGINE_LINE_LIMIT)
+        if not raw:
+            return
+        line = raw.decode(errors="replace").rstrip("\r\n")
+        tail.append(line)
+        if on_line is not None:
+            await on_line(line)
+
+
+async def run_engine(cmd: list, cwd: str, on_progress=None, interval: float = ENGINE_PROGRESS_INTERVAL,
+                     max_lines: int = ENGINE_OUTPUT_LINES) -> EngineRun:
+    """Run FAST-IBAN without blocking the event loop and report its progress.
+
+    stdout and stderr are streamed line by line: only the last ``max_lines``
+    of each are kept, so memory does not grow with the engine's chatty
+    output, and the loop stays free for the RabbitMQ heartbeats however long
+    the run takes.
+
+    Args:
+        cmd (list): Command to run.
+        cwd (str): Working directory.
+        on_progress (coroutine function, optional): ``await on_progress(progress)``
+            with the EngineProgress, at most once every ``interval`` seconds
+            and only when a time step reached a new stage.
+        interval (float): Minimum seconds between two progress reports.
+        max_lines (int): Lines of each stream kept.
+
+    Returns:
+        EngineRun: Exit code, duration, progress and output tails.
+    """
+    start_time = time.time()
+    progress = EngineProgress()
+    stdout_tail, stderr_tail = deque(maxlen=max_lines), deque(maxlen=max_lines)
+    state = {"last": 0.0, "pending": False}
+
+    async def on_stdout(line: str):
+        if progress.parse(line):
+            print(line, flush=True)
+            state["pending"] = True
+        if on_progress is not None and state["pending"] and time.time() - state["last"] >= interval:
+            state["last"] = time.time()
+            state["pending"] = False
+            try:
+                await on_progress(progress)
+            except Exception as e:
+                print(f"Warning: progress notification failed: {str(e)}")
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=ENGINE_LINE_LIMIT
+    )
+    try:
+        await asyncio.gather(_pump(process.stdout, stdout_tail, on_stdout), _pump(process.stderr, stderr_tail))
+        returncode = await process.wait()
+    except BaseException:
+        # Cancelled or failed while reading: don't leave the engine running
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    return EngineRun(returncode, time.time() - start_time, progress, stdout_tail, stderr_tail)
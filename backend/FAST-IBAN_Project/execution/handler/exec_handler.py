@@ -1,9 +1,11 @@
-import subprocess
 import sys
 import os
+import time
+import shutil
 import asyncio
 
 sys.path.append("/app/")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.rabbitMQ.rabbitmq import RabbitMQ
 from utils.rabbitMQ.process_body import process_body
@@ -11,84 +13,169 @@ from utils.rabbitMQ.create_message import create_message
 from utils.rabbitMQ.notify_updates import notify_update
 from utils.rabbitMQ.rabbit_consts import NOTIFICATIONS_EXCHANGE, NOTIFY_HANDLER_KEY, EXECUTION_ALGORITHM_QUEUE, NOTIFY_EXECUTION
 from utils.minio.upload_files import upload_files_to_request_hash
-from utils.consts.consts import STATUS_OK, STATUS_ERROR
+from utils.minio.shard_files import download_shard_input, upload_shard_outputs
+from utils.consts.consts import STATUS_OK, STATUS_ERROR, EXEC_FILE
+from binary_cache import BINARY_CACHE, BinaryNotCached
+from engine_runner import run_engine
+from utils.perf_metrics import PERF_HISTORY, speed_file, read_speed_file, stage_metrics, summary
+
+# Folder each program runs in; the paths of its command are relative to it
+RUN_FOLDERS = {"geopotential": "./code/build", "temperature": "./code_t/build"}
+# Executions a replica runs at once; 1 leaves queued time shards to the other replicas
+EXECUTION_PREFETCH = int(os.getenv("EXECUTION_PREFETCH", 1))
+
+
+def resolve_variant(data: dict) -> str:
+    """FAST-IBAN build a request runs: the temperature program, or the geopotential one
+    (serial, omp, mpi, omp_mpi) sent by the handler or deduced from the command."""
+    if data["variable_name"] == "temperature":
+        return "temperature"
+    if data.get("variant"):
+        return data["variant"]
+    cmd = data["cmd"]
+    mpi = cmd[0] == "mpirun"
+    omp = cmd[-1] != "1"
+    return {(False, False): "serial", (True, False): "omp", (False, True): "mpi", (True, True): "omp_mpi"}[(omp, mpi)]
+
+
+def performance_report(data: dict, variant: str, run_cmd: list, binary: str, result) -> dict:
+    """Per stage histograms of the run's speed file, stored in the performance history.
+
+    The command gives the output folder, threads and processes; the engine's
+    output gives the grid and the time steps. The parallelism chosen by the
+    handler (and why) is stored with them, next to the speedup achieved.
+    """
+    args = run_cmd[run_cmd.index(binary) + 1:]
+    processes = int(run_cmd[run_cmd.index("-n") + 1]) if run_cmd[0] == "mpirun" else 1
+    path = speed_file(args[5])
+    metrics = stage_metrics(read_speed_file(path)) if path else {}
+    grid = result.progress.grid or {}
+    choice = data.get("parallelism") or {}
+    run = {
+        "build": BINARY_CACHE.key(variant),
+        "variant": variant,
+        "threads": int(args[6]),
+        "processes": processes,
+        "nlat": grid.get("nlat"),
+        "nlon": grid.get("nlon"),
+        "time_steps": grid.get("ntime") or len(result.progress.completed) or None,
+        "request_hash": data["request_hash"],
+        "wall_seconds": round(result.seconds, 3),
+        "parallelism": choice.get("mode", "manual"),
+        "reason": choice.get("reason"),
+        "expected_speedup": choice.get("expected_speedup"),
+    }
+    return {**run, "stages": metrics, **PERF_HISTORY.record(run, metrics)}
 
 
 async def handle_message(body, rabbitmq_client):
     """Process the message received by the general handler, and launch the algorithm execution."""
     
-    await notify_update(rabbitmq_client, 1, "EXEC: Compilando algoritmo.")
-
     data = process_body(body)
+    # A time shard is one of several executions of the request: the handler reports the stages and uploads the merged results
+    shard = data.get("shard")
+    increment = 0 if shard else 1
     
-    if data["variable_name"] == "geopotential":
-        build_folder = "./code/build"
-    elif data["variable_name"] == "temperature":
-        build_folder = "./code_t/build"
-        
-    # print("\n[ ] Contenido de code_t: ", os.listdir("./"))
-        
+    await notify_update(rabbitmq_client, increment, "EXEC: Preparando algoritmo.")
+    
+    build_folder = RUN_FOLDERS[data["variable_name"]]
     os.makedirs(build_folder, exist_ok=True)
-    print("\n[ ] Compilando el algoritmo en la carpeta: ", build_folder)
-
-    subprocess.run(["cmake", ".."], cwd=build_folder)
-
-    build_cmd = ["cmake", "--build", "."]
-    process = subprocess.Popen(
-        build_cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        cwd=build_folder,
-    )
-    stdout, stderr = process.communicate()
-
-    if process.returncode == 0:
-        print(stdout)
-        print("\n✅ Build completado exitosamente.")
-    else:
-        print("\n❌ Error al ejecutar el build:")
-        message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_ERROR, "exec_message": "Error al compilar"}
+
+    # The executables are built once, at image build or service start: never compile here
+    lookup_start = time.time()
+    try:
+        variant = resolve_variant(data)
+        binary = BINARY_CACHE.lookup(variant)
+    except (BinaryNotCached, KeyError) as e:
+        print(f"\n❌ Ejecutable no disponible: {e}")
+        message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_ERROR, "exec_message": f"Error al preparar el algoritmo: {e}", "shard": shard}
         await rabbitmq_client.publish(
             NOTIFICATIONS_EXCHANGE, 
             NOTIFY_HANDLER_KEY, 
             create_message(STATUS_OK, "", message)
         )
         return False
+    lookup_ms = (time.time() - lookup_start) * 1000
+    print(f"\n[ ] Ejecutable '{variant}' ({BINARY_CACHE.key(variant)}) resuelto en {lookup_ms:.2f} ms: {binary}")
 
-    run_cmd = data["cmd"]
+    run_cmd = [binary if arg == EXEC_FILE else arg for arg in data["cmd"]]
 
-    await notify_update(rabbitmq_client, 1, "EXEC: Ejecutando algoritmo.")
+    # This replica may run on another node than the handler: the shard's NetCDF comes from MinIO
+    if shard:
+        try:
+            os.makedirs(shard["out_dir"], exist_ok=True)
+            if await asyncio.to_thread(download_shard_input, shard["object"], shard["file_name"]):
+                print(f"\n[ ] Fragmento {shard['index']} descargado de minio: {shard['object']}")
+        except Exception as e:
+            print(f"\n❌ Fragmento {shard['index']} no disponible: {e}")
+            message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_ERROR, "exec_message": f"Fragmento {shard['index']} no disponible en minio ({shard['object']}): {e}", "shard": shard}
+            await rabbitmq_client.publish(
+                NOTIFICATIONS_EXCHANGE, 
+                NOTIFY_HANDLER_KEY, 
+                create_message(STATUS_OK, "", message)
+            )
+            return False
+
+    await notify_update(rabbitmq_client, increment, "EXEC: Ejecutando algoritmo.")
         
     print("\n[ ] Ejecutando comando: ", run_cmd)
-    result = subprocess.run(run_cmd, capture_output=True, text=True, cwd=build_folder)
-    
-    # print("\n[ ] Resultado de la ejecución:")
-    # print(f"Código de retorno: {result.returncode}")
-    
-    # print("Salida estándar (stdout):")
-    # print(result.stdout)
 
-    # print("Salida de error (stderr):")
-    # print(result.stderr)
+    # Per time step progress; increment 0 keeps the request's percentage where the stages put it
+    async def report_progress(progress):
+        await notify_update(rabbitmq_client, 0, f"EXEC: {progress.summary()}.")
+
+    # Streamed and awaited, not run blocking: the event loop keeps the RabbitMQ heartbeats going
+    result = await run_engine(run_cmd, build_folder, on_progress=report_progress)
+    run_seconds = result.seconds
 
     if result.returncode == 0:
         print("\n✅ Ejecución exitosa.")
-        message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_OK, "exec_message": "Ejecutado correctamente"}
+        build_info = BINARY_CACHE.info(variant)
+        try:
+            perf = await asyncio.to_thread(performance_report, data, variant, run_cmd, binary, result)
+            print(f"[ ] Rendimiento: {summary(perf)}")
+        except Exception as e:
+            # Metrics never fail an execution
+            print(f"Warning: performance metrics not recorded: {str(e)}")
+            perf = None
+        message = {
+            "request_type": NOTIFY_EXECUTION,
+            "exec_status": STATUS_OK,
+            "exec_message": f"Ejecutado correctamente en {run_seconds:.2f} s ({result.progress.summary()}). Arranque en caliente: ejecutable '{variant}' "
+                            f"resuelto en {lookup_ms:.2f} ms, sin compilar. Arranque en frío: caché de binarios lista en "
+                            f"{BINARY_CACHE.warm_seconds:.2f} s al iniciar el servicio "
+                            f"(compilación de '{variant}': {build_info.get('seconds', 0):.2f} s, {build_info.get('built_at', 'n/a')})."
+                            + (f" Rendimiento: {summary(perf)}." if perf else ""),
+            "perf": perf,
+            "shard": shard
+        }
         
         #save the files in minio
-        upload_files_to_request_hash(data["request_hash"], local_folder="./out/"+data["request_hash"])
-        print("\n[ ] Archivos subidos a minio.")
+        if not shard:
+            await asyncio.to_thread(upload_files_to_request_hash, data["request_hash"], local_folder="./out/"+data["request_hash"])
+            print("\n[ ] Archivos subidos a minio.")
+        else:
+            # The handler merges the shards from MinIO, whatever node it runs on
+            try:
+                objects = await asyncio.to_thread(upload_shard_outputs, data["request_hash"], shard["index"], shard["out_dir"])
+                print(f"\n[ ] {objects} salidas del fragmento {shard['index']} subidas a minio.")
+            except Exception as e:
+                print(f"\n❌ Salidas del fragmento {shard['index']} no subidas: {e}")
+                message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_ERROR, "exec_message": f"Error al subir las salidas del fragmento {shard['index']}: {e}", "shard": shard}
+            finally:
+                shutil.rmtree(shard["out_dir"], ignore_errors=True)
         
         await rabbitmq_client.publish(
             NOTIFICATIONS_EXCHANGE, 
             NOTIFY_HANDLER_KEY, 
             create_message(STATUS_OK, "", message)
         )
-        return True
+        return message["exec_status"] == STATUS_OK
     else:
-        print("\n❌ Ejecución fallida.")
-        message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_ERROR, "exec_message": result.stderr}
+        print(f"\n❌ Ejecución fallida (código {result.returncode}, {result.progress.summary()}).")
+        if shard:
+            shutil.rmtree(shard["out_dir"], ignore_errors=True)
+        message = {"request_type": NOTIFY_EXECUTION, "exec_status": STATUS_ERROR, "exec_message": result.stderr or result.stdout, "shard": shard}
         await rabbitmq_client.publish(
             NOTIFICATIONS_EXCHANGE, 
             NOTIFY_HANDLER_KEY, 
@@ -99,6 +186,10 @@ async def handle_message(body, rabbitmq_client):
 
 if __name__ == "__main__":
     async def main():
+        # Build (or find already built at image build time) every FAST-IBAN variant before taking requests
+        report = BINARY_CACHE.warm()
+        print(f"Binary cache ready in {BINARY_CACHE.warm_seconds:.2f} seconds: {report}")
+        
         # Initialize the RabbitMQ connection
         rabbitmq_client = RabbitMQ()
         await rabbitmq_client.initialize()
@@ -110,7 +201,8 @@ if __name__ == "__main__":
         # Start consuming messages
         await rabbitmq_client.consume(
             EXECUTION_ALGORITHM_QUEUE, 
-            callback=message_handler
+            callback=message_handler,
+            prefetch_count=EXECUTION_PREFETCH
         )
         
         # Keep the application running
@@ -1,17 +1,23 @@
 import sys
+import os
 from typing import List
 import asyncio
 
 sys.path.append('/app/')
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.rabbitMQ.rabbitmq import RabbitMQ
 from utils.rabbitMQ.process_body import process_body
 from utils.rabbitMQ.create_message import create_message
 from utils.rabbitMQ.rabbit_consts import HANDLER_QUEUE, NOTIFICATIONS_QUEUE, EXECUTION_EXCHANGE, EXECUTION_ALGORITHM_KEY, EXECUTION_VISUALIZATION_KEY, NOTIFY_EXECUTION, NOTIFY_VISUALIZATION
 from utils.minio.upload_files import upload_files_to_request_hash
+from utils.minio.shard_files import upload_shard_input, download_shard_outputs, remove_shard_objects
 from utils.clean_folder_files import clean_directory
 from utils.rabbitMQ.notify_results import notify_result
+from utils.rabbitMQ.notify_updates import notify_update
 from utils.consts.consts import EXEC_FILE, STATUS_OK, STATUS_ERROR
+from time_shards import EXECUTION_SHARDS, write_shards, merge_shards, remove_shards
+from parallelism import AUTO, SERIAL, Parallelism, wants_auto, problem_size, choose
 
 OUT_DIR = "./out"
 
@@ -47,6 +53,7 @@ class ConfigHandler:
         self.map_types = None
         self.map_levels = None
         self.file_format = None
+        self.label_mode = None
         self.no_data = None
         self.no_maps = None
         self.omp = None
@@ -57,6 +64,16 @@ class ConfigHandler:
         # Processing state
         self.execution_completed = False
         self.maps_generated = False
+        
+        # Time shards of the current execution (empty when it runs as a single process)
+        self.shards = []
+        self.shards_done = set()
+        self.shards_failed = False
+        # MinIO object of every shard's NetCDF
+        self.shard_objects = []
+        
+        # Parallelism the execution runs with (requested or chosen automatically)
+        self.parallelism = None
 
 
     def init(self, data) -> None:
@@ -80,6 +97,7 @@ class ConfigHandler:
         self.map_types = data["mapTypes"]
         self.map_levels = data["mapLevels"]
         self.file_format = data["fileFormat"]
+        self.label_mode = data.get("labelMode")
         self.no_data = data["noData"]
         self.no_maps = data["noMaps"]
         self.omp = data["omp"]
@@ -128,7 +146,11 @@ class ConfigHandler:
         """
         message = process_body(body)
         
-        if message["exec_status"] == STATUS_ERROR:
+        if message.get("shard") is not None:
+            # Only the last shard to finish carries on, once the outputs are merged
+            if not await self.collect_shard(message):
+                return
+        elif message["exec_status"] == STATUS_ERROR:
             print("\n❌ Error al ejecutar el programa.")
             print(f"\t❌ Error: {message['exec_message']}")
             return
@@ -145,6 +167,70 @@ class ConfigHandler:
             await notify_result(self.rabbitmq, "Processing completed successfully.", self.request_hash)
             clean_directory(OUT_DIR+"/"+self.request_hash)
 
+    async def collect_shard(self, message: dict) -> bool:
+        """
+        Record the result of one time shard and merge the outputs once all of them finished.
+        
+        Args:
+            message: Execution notification of a shard
+            
+        Returns:
+            True when every shard succeeded and the merged results are uploaded
+        """
+        shard = message["shard"]
+        if shard["request_hash"] != self.request_hash or self.shards_failed or shard["index"] in self.shards_done:
+            return False
+        
+        if message["exec_status"] == STATUS_ERROR:
+            self.shards_failed = True
+            print(f"\n❌ Error al ejecutar el fragmento {shard['index']} (pasos {shard['start']}-{shard['stop'] - 1}).")
+            print(f"\t❌ Error: {message['exec_message']}")
+            await asyncio.to_thread(self.discard_shards)
+            return False
+        
+        self.shards_done.add(shard["index"])
+        print(f"\n[ ] Fragmento {shard['index']} completado ({len(self.shards_done)}/{len(self.shards)}).")
+        if len(self.shards_done) < len(self.shards):
+            return False
+        
+        out_dir = OUT_DIR+"/"+self.request_hash
+        try:
+            # The executions may have run on other nodes: their outputs come from MinIO
+            for shard in self.shards:
+                await asyncio.to_thread(download_shard_outputs, self.request_hash, shard.index, shard.out_dir)
+            merged = await asyncio.to_thread(merge_shards, self.shards, out_dir)
+            remove_shards(out_dir)
+            await asyncio.to_thread(upload_files_to_request_hash, self.request_hash, local_folder=out_dir)
+        except Exception as e:
+            self.shards_failed = True
+            print(f"\n❌ Error al unir los fragmentos: {str(e)}")
+            return False
+        finally:
+            await asyncio.to_thread(self.discard_shards)
+        
+        print(f"\n✅ Ejecución completada en {len(self.shards)} fragmentos; {len(merged)} archivos unidos.")
+        self.execution_completed = True
+        return True
+
+    def upload_shards(self) -> List[str]:
+        """
+        Upload the NetCDF of every shard, after removing whatever a previous run of the request left.
+        
+        Returns:
+            MinIO object of each shard, in order
+        """
+        self.discard_shards()
+        return [upload_shard_input(self.request_hash, shard.index, shard.file_name) for shard in self.shards]
+
+    def discard_shards(self) -> None:
+        """
+        Delete the inputs and outputs of the request's shards from MinIO; a failure only leaves them behind.
+        """
+        try:
+            remove_shard_objects(self.request_hash)
+        except Exception as e:
+            print(f"Warning: shard objects of {self.request_hash} not removed: {str(e)}")
+
     async def handle_map_generation_message(self, body: bytes) -> None:
         """
         Handle map generation completion messages and proceed to the next step.
@@ -176,40 +262,132 @@ class ConfigHandler:
         
         print(f"\n[ ] Ejecutando el programa para el archivo: {self.file_name}")
 
-        cmd = self.prepare_execution_command(lat_range, lon_range)
+        self.shards, self.shards_done, self.shards_failed, self.shard_objects = [], set(), False, []
+        if EXECUTION_SHARDS > 1:
+            shards = await asyncio.to_thread(write_shards, self.file_name, OUT_DIR+"/"+self.request_hash)
+            if len(shards) > 1:
+                self.shards = shards
+                # Replicas on other nodes can't see this volume: every shard goes through MinIO
+                self.shard_objects = await asyncio.to_thread(self.upload_shards)
+                await notify_update(self.rabbitmq, 1, f"EXEC: Archivo dividido en {len(shards)} fragmentos temporales.")
         
-        print("\n[ ] Enviando mensaje a la cola de ejecución...")
+        self.parallelism = await asyncio.to_thread(self.resolve_parallelism, lat_range, lon_range)
+        if self.parallelism.mode == AUTO:
+            print(f"\n[ ] Paralelismo automático: {self.parallelism}")
+            await notify_update(self.rabbitmq, 0, f"EXEC: Paralelismo automático: '{self.parallelism.variant}', "
+                                                  f"{self.parallelism.processes} procesos x {self.parallelism.threads} hilos "
+                                                  f"({self.parallelism.reason}).")
         
-        data = {"cmd": cmd, "request_hash": self.request_hash, "variable_name": self.variable_name.lower()}
+        print("\n[ ] Enviando mensaje a la cola de ejecución...")
         
-        # Send execution request and wait for response
-        message = create_message(STATUS_OK, "", data)
-        await self.rabbitmq.publish(EXECUTION_EXCHANGE, EXECUTION_ALGORITHM_KEY, message)
+        if self.shards:
+            await self.publish_shards(lat_range, lon_range)
+        else:
+            cmd = self.prepare_execution_command(lat_range, lon_range)
+            data = {"cmd": cmd, "request_hash": self.request_hash, "variable_name": self.variable_name.lower(),
+                    "variant": self.execution_variant(), "parallelism": self.parallelism._asdict()}
+            
+            # Send execution request and wait for response
+            message = create_message(STATUS_OK, "", data)
+            await self.rabbitmq.publish(EXECUTION_EXCHANGE, EXECUTION_ALGORITHM_KEY, message)
         await self.rabbitmq.consume(NOTIFICATIONS_QUEUE, callback=self.handle_general_notification_message)
 
-    def prepare_execution_command(self, lat_range: List[int], lon_range: List[int]) -> List[str]:
+    async def publish_shards(self, lat_range: List[int], lon_range: List[int]) -> None:
+        """
+        Publish one execution per time shard; any execution replica can take each of them.
+        
+        Args:
+            lat_range: Latitude range [min, max]
+            lon_range: Longitude range [min, max]
+        """
+        for shard, object_name in zip(self.shards, self.shard_objects):
+            cmd = self.prepare_execution_command(lat_range, lon_range, shard.file_name, shard.out_dir)
+            data = {"cmd": cmd, "request_hash": self.request_hash, "variable_name": self.variable_name.lower(),
+                    "variant": self.execution_variant(), "parallelism": self.parallelism._asdict(),
+                    "shard": {"request_hash": self.request_hash, "index": shard.index, "count": len(self.shards),
+                              "start": shard.start, "stop": shard.stop, "object": object_name,
+                              "file_name": shard.file_name, "out_dir": shard.out_dir}}
+            
+            # Shards wait in the queue until a replica is free, however long that takes
+            message = create_message(STATUS_OK, "", data)
+            await self.rabbitmq.publish(EXECUTION_EXCHANGE, EXECUTION_ALGORITHM_KEY, message, expiration=None)
+        
+        print(f"\n[ ] {len(self.shards)} fragmentos enviados: {[(shard.start, shard.stop) for shard in self.shards]}")
+        await notify_update(self.rabbitmq, 1, f"EXEC: Ejecutando algoritmo en {len(self.shards)} fragmentos temporales.")
+
+    def resolve_parallelism(self, lat_range: List[int], lon_range: List[int]) -> Parallelism:
+        """
+        Parallelism of the execution: the one requested, or one chosen from the problem size,
+        the cores available and the timings of previous runs when the request asks for "auto".
+        
+        Args:
+            lat_range: Latitude range [min, max]
+            lon_range: Longitude range [min, max]
+            
+        Returns:
+            Parallelism applied to omp, mpi, n_threads and n_processes
+        """
+        if not wants_auto(self.omp, self.mpi, self.n_threads, self.n_processes):
+            threads = int(self.n_threads) if self.omp and str(self.n_threads).isdigit() else 1
+            processes = int(self.n_processes) if self.mpi and str(self.n_processes).isdigit() else 1
+            return Parallelism(self.execution_variant(), processes, threads, "manual", "configuración de la petición", None)
+        
+        if self.variable_name.lower() == "temperature":
+            choice = Parallelism(*SERIAL, AUTO, "el programa de temperatura solo tiene versión en serie", None)
+        else:
+            # Each shard runs on its own: size the run by the shortest one
+            ntime = min(shard.stop - shard.start for shard in self.shards) if self.shards else None
+            choice = choose(problem_size(self.file_name, lat_range, lon_range, ntime))
+        
+        self.omp = choice.threads > 1
+        self.mpi = choice.processes > 1
+        self.n_threads = str(choice.threads)
+        self.n_processes = str(choice.processes)
+        return choice
+
+    def execution_variant(self) -> str:
+        """
+        FAST-IBAN build matching the parallelism requested (serial, omp, mpi or omp_mpi).
+        
+        Returns:
+            Name of the prebuilt variant the execution module runs
+        """
+        if self.omp and self.mpi:
+            return "omp_mpi"
+        if self.mpi:
+            return "mpi"
+        if self.omp:
+            return "omp"
+        return "serial"
+
+    def prepare_execution_command(self, lat_range: List[int], lon_range: List[int], file_name: str = None,
+                                  out_dir: str = None) -> List[str]:
         """
         Prepare the execution command based on configuration.
         
         Args:
             lat_range: Latitude range [min, max]
             lon_range: Longitude range [min, max]
+            file_name: NetCDF to process (the request's file by default, or a time shard of it)
+            out_dir: Output folder (the request's folder by default)
             
         Returns:
             List of command arguments
         """
+        file_name = file_name or self.file_name
+        out_dir = out_dir or OUT_DIR+"/"+self.request_hash+"/"
         if self.omp and not self.mpi:
-            return [EXEC_FILE, self.file_name, str(lat_range[0]), str(lat_range[1]), 
-                    str(lon_range[0]), str(lon_range[1]), OUT_DIR+"/"+self.request_hash+"/", self.n_threads]
+            return [EXEC_FILE, file_name, str(lat_range[0]), str(lat_range[1]), 
+                    str(lon_range[0]), str(lon_range[1]), out_dir, self.n_threads]
         elif self.mpi and not self.omp:
-            return ["mpirun", "-n", self.n_processes, EXEC_FILE, self.file_name, 
-                    str(lat_range[0]), str(lat_range[1]), str(lon_range[0]), str(lon_range[1]), OUT_DIR+"/"+self.request_hash+"/", "1"]
+            return ["mpirun", "-n", self.n_processes, EXEC_FILE, file_name, 
+                    str(lat_range[0]), str(lat_range[1]), str(lon_range[0]), str(lon_range[1]), out_dir, "1"]
         elif self.omp and self.mpi:
-            return ["mpirun", "-n", self.n_processes, EXEC_FILE, self.file_name, 
-                    str(lat_range[0]), str(lat_range[1]), str(lon_range[0]), str(lon_range[1]), OUT_DIR+"/"+self.request_hash+"/", self.n_threads]
+            return ["mpirun", "-n", self.n_processes, EXEC_FILE, file_name, 
+                    str(lat_range[0]), str(lat_range[1]), str(lon_range[0]), str(lon_range[1]), out_dir, self.n_threads]
         else:
-            return [EXEC_FILE, self.file_name, str(lat_range[0]), str(lat_range[1]), 
-                    str(lon_range[0]), str(lon_range[1]), OUT_DIR+"/"+self.request_hash+"/", "1"]
+            return [EXEC_FILE, file_name, str(lat_range[0]), str(lat_range[1]), 
+                    str(lon_range[0]), str(lon_range[1]), out_dir, "1"]
         
     async def process_map_generation(self) -> None:
         """
@@ -228,6 +406,7 @@ class ConfigHandler:
             "map_types": self.map_types,
             "map_levels": self.map_levels,
             "file_format": self.file_format,
+            "label_mode": self.label_mode,
             "area_covered": self.area_covered,
         }
        
@@ -0,0 +1,112 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import xarray as xr
+
+from utils.perf_metrics import PERF_HISTORY, SERIAL
+from utils.system_resources import available_cpus, memory_limit
+
+# "request": each request's omp/mpi/nThreads/nProces, unless one of them is "auto"; "auto": chosen for every request
+EXECUTION_PARALLELISM = os.getenv("EXECUTION_PARALLELISM", "request")
+# Cores of an execution node (0: those of this host, where docker-compose runs every module)
+EXECUTION_CPUS = int(os.getenv("EXECUTION_CPUS", 0))
+# Grid points x time steps below which threads and ranks cost more than they save
+AUTO_SERIAL_WORK = int(os.getenv("AUTO_SERIAL_WORK", 250_000))
+# Fewest latitude rows per thread (the OpenMP loop hands out rows)
+AUTO_ROWS_PER_THREAD = int(os.getenv("AUTO_ROWS_PER_THREAD", 8))
+# Runs of a configuration before its measured time is trusted over the size model
+AUTO_MIN_HISTORY = int(os.getenv("AUTO_MIN_HISTORY", 2))
+# Memory of an MPI rank besides the field it loads (every rank reads the whole file)
+AUTO_RANK_BASE_MB = int(os.getenv("AUTO_RANK_BASE_MB", 64))
+
+AUTO = "auto"
+# Bytes per point of the packed field and of the per step work arrays of the engine
+FIELD_BYTES = 2
+POINT_BYTES = 64
+
+# Size of a run: time steps, grid of the file and points of the requested window
+ProblemSize = namedtuple("ProblemSize", ["ntime", "nlat", "nlon", "rows", "columns"])
+# Configuration chosen for a run and why
+Parallelism = namedtuple("Parallelism", ["variant", "processes", "threads", "mode", "reason", "expected_speedup"])
+
+VARIANTS = {(False, False): "serial", (True, False): "omp", (False, True): "mpi", (True, True): "omp_mpi"}
+
+
+def wants_auto(*values) -> bool:
+    """Whether a request leaves its parallelism to the handler."""
+    return EXECUTION_PARALLELISM == AUTO or any(str(value).lower() == AUTO for value in values)
+
+
+def problem_size(file_name: str, lat_range: list, lon_range: list, ntime: int = None) -> ProblemSize:
+    """Time steps and grid of the NetCDF, and the points inside the requested window."""
+    with xr.open_dataset(file_name, decode_cf=False) as ds:
+        lats = ds["latitude"].values
+        lons = (ds["longitude"].values + 180) % 360 - 180
+        rows = int(np.count_nonzero((lats >= lat_range[0]) & (lats <= lat_range[1])))
+        columns = int(np.count_nonzero((lons >= lon_range[0]) & (lons <= lon_range[1])))
+        return ProblemSize(ntime or ds.sizes["time"], ds.sizes["latitude"], ds.sizes["longitude"], rows, columns)
+
+
+def rank_memory(size: ProblemSize) -> int:
+    """Bytes an MPI rank needs: the whole field plus the work arrays of a step."""
+    return (size.ntime * size.nlat * size.nlon * FIELD_BYTES + size.rows * size.columns * POINT_BYTES
+            + AUTO_RANK_BASE_MB * 1024 * 1024)
+
+
+def fits(config: tuple, size: ProblemSize, cpus: int, memory: int) -> bool:
+    _, processes, threads = config
+    return processes * threads <= cpus and processes <= size.ntime and processes * rank_memory(size) <= memory
+
+
+def model_choice(size: ProblemSize, cpus: int, memory: int) -> tuple:
+    """Configuration the size model picks, and why.
+
+    Time steps are independent, so ranks come first (up to one per step and
+    as many as fit in memory); the cores left go to threads, up to one per
+    ``AUTO_ROWS_PER_THREAD`` rows. Small problems stay serial.
+    """
+    work = size.ntime * size.rows * size.columns
+    if work < AUTO_SERIAL_WORK:
+        return SERIAL, f"problema pequeño ({work} puntos x pasos)"
+
+    processes = max(min(size.ntime, cpus, memory // rank_memory(size)), 1)
+    threads = max(min(cpus // processes, size.rows // AUTO_ROWS_PER_THREAD), 1)
+    variant = VARIANTS[(threads > 1, processes > 1)]
+    return (variant, processes, threads), (f"modelo de tamaño: {size.ntime} pasos de {size.rows}x{size.columns} "
+                                           f"puntos en {cpus} núcleos")
+
+
+def choose(size: ProblemSize, cpus: int = None, memory: int = None, history: dict = None) -> Parallelism:
+    """Variant, ranks and threads of an automatic run.
+
+    The size model decides until its configuration has ``AUTO_MIN_HISTORY``
+    runs on this grid; from then on the fastest configuration measured on it
+    (wall time per step) that fits the cores and memory wins.
+
+    Args:
+        size (ProblemSize): Size of the run.
+        cpus (int, optional): Cores of an execution node. Defaults to ``EXECUTION_CPUS`` or this host's.
+        memory (int, optional): Bytes of an execution node. Defaults to this host's limit.
+        history (dict, optional): Measured configurations, from ``PerfHistory.configurations``.
+
+    Returns:
+        Parallelism: Configuration chosen, with the speedup the history expects from it (None if unknown).
+    """
+    cpus = cpus or EXECUTION_CPUS or available_cpus()
+    memory = memory or memory_limit()
+    if history is None:
+        history = PERF_HISTORY.configurations(size.nlat, size.nlon)
+
+    config, reason = model_choice(size, cpus, memory)
+    trusted = {measured: timing for measured, timing in history.items()
+               if timing[1] >= AUTO_MIN_HISTORY and fits(measured, size, cpus, memory)}
+    if config in trusted:
+        config = min(trusted, key=lambda measured: trusted[measured][0])
+        per_step, runs = trusted[config]
+        reason = f"la más rápida del histórico en esta malla ({per_step:.3f} s/paso, {runs} ejecuciones)"
+
+    expected = None
+    if config in history and SERIAL in history:
+        expected = history[SERIAL][0] / history[config][0]
+    return Parallelism(*config, AUTO, reason, expected)
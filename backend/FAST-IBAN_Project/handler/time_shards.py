@@ -0,0 +1,138 @@
+import os
+import re
+import shutil
+from collections import namedtuple
+
+import xarray as xr
+
+# Shards the time axis of a request is split in (1 = a single execution over the whole file)
+EXECUTION_SHARDS = int(os.getenv("EXECUTION_SHARDS", 1))
+# Fewest time steps worth a shard of their own
+EXECUTION_SHARD_MIN_STEPS = int(os.getenv("EXECUTION_SHARD_MIN_STEPS", 1))
+
+TIME_DIM = "time"
+SHARDS_DIR = "shards"
+# Run date the engine puts in its output names; shards started at different minutes differ only in it
+RUN_DATE = re.compile(r"_\d{2}-\d{2}-\d{4}_\d{2}-\d{2}UTC")
+
+# One slice of the time axis: steps [start, stop) of the original file, its NetCDF and output folder
+Shard = namedtuple("Shard", ["index", "start", "stop", "file_name", "out_dir"])
+
+
+def time_steps(file_name: str) -> int:
+    with xr.open_dataset(file_name, decode_cf=False) as ds:
+        return ds.sizes[TIME_DIM]
+
+
+def shard_ranges(steps: int, shards: int = EXECUTION_SHARDS, min_steps: int = EXECUTION_SHARD_MIN_STEPS) -> list:
+    """Split ``steps`` time steps in up to ``shards`` contiguous ranges of (almost) equal size.
+
+    Returns:
+        list: [(start, stop), ...] covering [0, steps).
+    """
+    count = max(min(shards, steps // max(min_steps, 1)), 1)
+    bounds = [steps * i // count for i in range(count + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def write_shards(file_name: str, out_dir: str, shards: int = EXECUTION_SHARDS) -> list:
+    """Write one NetCDF per slice of the time axis, for the executions to run on.
+
+    Each shard lives in ``<out_dir>/shards/<index>/`` with the original file
+    name, so its outputs are named like those of a single execution. The
+    variables are copied raw (packed values and their attributes untouched).
+
+    Returns:
+        list: Shard of every slice; a single shard means sharding is not worth it.
+    """
+    with xr.open_dataset(file_name, decode_cf=False) as ds:
+        ranges = shard_ranges(ds.sizes[TIME_DIM], shards)
+        if len(ranges) <= 1:
+            return [Shard(0, *ranges[0], file_name, out_dir)]
+
+        result = []
+        for index, (start, stop) in enumerate(ranges):
+            shard_dir = os.path.join(out_dir, SHARDS_DIR, f"{index:03d}")
+            os.makedirs(shard_dir, exist_ok=True)
+            shard_file = os.path.join(shard_dir, os.path.basename(file_name))
+            ds.isel({TIME_DIM: slice(start, stop)}).to_netcdf(shard_file)
+            result.append(Shard(index, start, stop, shard_file, shard_dir + "/"))
+    return result
+
+
+def _merge_csv(paths: list, shards: list, target):
+    """Rows of every shard with their time step (first column) offset; the header once."""
+    for path, shard in zip(paths, shards):
+        with open(path) as source:
+            header = next(source, "")
+            if shard.index == 0:
+                target.write(header)
+            for line in source:
+                step, rest = line.split(",", 1)
+                target.write(f"{int(step) + shard.start},{rest}")
+
+
+def _merge_speed(paths: list, shards: list, target):
+    """Per step timings with their step offset; init and total rows as the longest shard's.
+
+    Shards run concurrently, so the run took as long as its slowest shard,
+    not the sum of them.
+    """
+    totals = {}
+    for path, shard in zip(paths, shards):
+        with open(path) as source:
+            header = next(source, "")
+            if shard.index == 0:
+                target.write(header)
+            for line in source:
+                part, instant, elapsed = line.rstrip("\n").split(",")
+                if int(instant) < 0:
+                    totals[part] = max(totals.get(part, 0.0), float(elapsed))
+                else:
+                    target.write(f"{part},{int(instant) + shard.start},{elapsed}\n")
+    for part, elapsed in totals.items():
+        target.write(f"{part},-1,{elapsed:.3f}\n")
+
+
+def _merge_log(paths: list, shards: list, target):
+    for path, shard in zip(paths, shards):
+        target.write(f"--- Shard {shard.index}: time steps {shard.start}-{shard.stop - 1} ---\n")
+        with open(path) as source:
+            shutil.copyfileobj(source, target)
+
+
+def merge_shards(shards: list, out_dir: str) -> list:
+    """Merge the outputs of every shard into ``out_dir`` as a single execution would have written them.
+
+    The time step of the selected points and formations (and of the speed
+    file) is offset by the shard's first step, headers are kept once and
+    logs are concatenated. Files are matched by name regardless of the
+    minute each shard started.
+
+    Returns:
+        list: Paths of the merged files.
+    """
+    outputs = {}
+    for shard in shards:
+        for name in sorted(os.listdir(shard.out_dir)):
+            if name.endswith((".csv", ".txt")):
+                outputs.setdefault(RUN_DATE.sub("_UTC", name), {})[shard.index] = os.path.join(shard.out_dir, name)
+
+    merged = []
+    for files in outputs.values():
+        missing = [shard.index for shard in shards if shard.index not in files]
+        if missing:
+            raise FileNotFoundError(f"Shards {missing} did not write {os.path.basename(next(iter(files.values())))}")
+
+        paths = [files[shard.index] for shard in shards]
+        name = os.path.basename(paths[0])
+        merge = _merge_log if name.endswith(".txt") else _merge_speed if name.startswith("speed_") else _merge_csv
+        target_path = os.path.join(out_dir, name)
+        with open(target_path, "w") as target:
+            merge(paths, shards, target)
+        merged.append(target_path)
+    return merged
+
+
+def remove_shards(out_dir: str):
+    shutil.rmtree(os.path.join(out_dir, SHARDS_DIR), ignore_errors=True)
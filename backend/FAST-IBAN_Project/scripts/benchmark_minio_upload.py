@@ -0,0 +1,69 @@
+"""Compare the serial fput_object loop with the concurrent MinioUploader.
+
+Run it against a local MinIO stand-in, e.g.:
+
+    docker run -p 9000:9000 minio/minio server /data
+    python scripts/benchmark_minio_upload.py --endpoint localhost:9000 --files 200 --size-kb 512
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from minio import Minio
+
+from utils.minio.uploader import MinioUploader, MINIO_USER, MINIO_PASSWORD
+
+
+def make_files(folder: str, count: int, size_kb: int):
+    for i in range(count):
+        with open(os.path.join(folder, f"file_{i:05d}.bin"), "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+
+
+def serial_upload(client: Minio, bucket: str, prefix: str, folder: str) -> float:
+    """The previous upload_files_to_request_hash loop: bucket check + one fput_object at a time."""
+    start_time = time.time()
+    if not client.bucket_exists(bucket):
+        client.make_bucket(bucket)
+    for filename in os.listdir(folder):
+        local_path = os.path.join(folder, filename)
+        if os.path.isfile(local_path):
+            client.fput_object(bucket, f"{prefix}/{filename}", local_path)
+    return time.time() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", default="localhost:9000")
+    parser.add_argument("--bucket", default="upload-benchmark")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--part-size-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_files(folder, args.files, args.size_kb)
+        total_mb = args.files * args.size_kb / 1024
+
+        client = Minio(args.endpoint, access_key=MINIO_USER, secret_key=MINIO_PASSWORD, secure=False)
+        serial_seconds = serial_upload(client, args.bucket, "serial", folder)
+
+        uploader = MinioUploader(endpoint=args.endpoint, bucket=args.bucket, workers=args.workers,
+                                 part_size_mb=args.part_size_mb)
+        result = uploader.upload_folder("concurrent", folder)
+        uploader.close()
+
+    print(f"{args.files} files x {args.size_kb} KB ({total_mb:.1f} MB)")
+    print(f"serial loop:    {serial_seconds:7.2f} s  {total_mb / serial_seconds:8.2f} MB/s")
+    print(f"MinioUploader:  {result.seconds:7.2f} s  {total_mb / result.seconds:8.2f} MB/s "
+          f"({args.workers} workers, {len(result.failed)} failed)")
+    print(f"speedup:        {serial_seconds / result.seconds:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare one render written in many formats with one request per format.
+
+Renders the maps of one time step in-process, first as a single work unit
+asking for every format, then once per format as separate requests would.
+Only the visualization stage is timed; a separate request would also run
+the engine again. Contour and 3D maps only need the NetCDF file; the CSV
+based maps need the engine's output in ``<out-dir>/<request-hash>``, e.g.:
+
+    python scripts/benchmark_output_formats.py --file data.nc --date 2022-03-14_06 \\
+        --formats png,svg,pdf,webp --map-types cont,3d
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import visualization.mapGeneration.generate_maps as generate_maps
+from visualization.mapGeneration.figure_export import parse_file_formats
+
+
+def render(args, file_formats) -> tuple:
+    """Render every requested map once, written in ``file_formats``. Returns (seconds, files)."""
+    year, month, rest = args.date.split("-")
+    day, hour = rest.split("_")
+    products = tuple((map_type, str(args.map_level)) for map_type in args.map_types.split(","))
+
+    start_time = time.time()
+    result = generate_maps.generate_time_step_maps((
+        args.file, args.request_hash, args.variable, str(args.pressure_level),
+        year, month, day, hour, products, file_formats, args.area, None, None
+    ))
+    seconds = time.time() - start_time
+    if result["failed"]:
+        print(f"Warning: {result['failed']} maps failed")
+    return seconds, result["files"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", required=True, help="NetCDF file")
+    parser.add_argument("--variable", default="geopotential")
+    parser.add_argument("--pressure-level", type=float, default=500)
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD_HH")
+    parser.add_argument("--area", type=float, nargs=4, default=[85, -180, 25, 180], help="N W S E")
+    parser.add_argument("--map-types", default="cont,3d")
+    parser.add_argument("--map-level", type=int, default=20)
+    parser.add_argument("--formats", default="png,svg,pdf,webp")
+    parser.add_argument("--out-dir", default=None, help="Defaults to a temporary folder")
+    parser.add_argument("--request-hash", default="format-benchmark")
+    args = parser.parse_args()
+
+    file_formats = parse_file_formats(args.formats)
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="format-benchmark.")
+    generate_maps.OUT_DIR = out_dir
+
+    try:
+        # Warm the field and basemap caches so both runs start from the same state
+        render(args, file_formats[:1])
+
+        combined_seconds, combined_files = render(args, file_formats)
+        separate = [render(args, [file_format]) for file_format in file_formats]
+        separate_seconds = sum(seconds for seconds, _ in separate)
+    finally:
+        if args.out_dir is None:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(f"{args.map_types} maps in {', '.join(file_formats)}")
+    print(f"one render, all formats:  {combined_seconds:7.2f} s  ({len(combined_files)} files)")
+    for file_format, (seconds, files) in zip(file_formats, separate):
+        print(f"  request with {file_format:<5}      {seconds:7.2f} s  ({len(files)} files)")
+    print(f"one request per format:   {separate_seconds:7.2f} s")
+    print(f"speedup:                  {separate_seconds / combined_seconds:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
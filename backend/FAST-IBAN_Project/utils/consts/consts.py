@@ -15,6 +15,7 @@ ARGUMENTS = [
     "mapTypes",
     "mapLevels",
     "fileFormat",
+    "labelMode",
     "noData",
     "noMaps",
     "omp",
@@ -29,6 +30,13 @@ VARIABLE_NAMES = {
     "u-component_of_wind": "u",
 }
 
+# Modos de etiquetado de los mapas de dispersión y combinados
+LABEL_MODE_POINTS = "points"
+LABEL_MODE_CLUSTERS = "clusters"
+LABEL_MODE_NONE = "none"
+LABEL_MODES = (LABEL_MODE_POINTS, LABEL_MODE_CLUSTERS, LABEL_MODE_NONE)
+DEFAULT_LABEL_MODE = LABEL_MODE_POINTS
+
 STATUS_OK = "OK"
 STATUS_ERROR = "ERROR"
 MESSAGE_NO_DATA = "NO_DATA"
@@ -7,3 +7,4 @@ class DataFormat(Enum):
     JPEG_FORMAT = "jpeg"
     SVG_FORMAT = "svg"
     PDF_FORMAT = "pdf"
+    WEBP_FORMAT = "webp"
@@ -7,3 +7,6 @@ class DataType(Enum):
     TYPE_CONT = "cont"
     TYPE_FORMS = "forms"
     TYPE_3D = "3d"
+    TYPE_GEOJSON = "geojson"
+    TYPE_TILES = "tiles"
+    TYPE_ANIM = "anim"
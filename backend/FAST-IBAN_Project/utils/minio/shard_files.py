@@ -0,0 +1,80 @@
+import os
+
+from utils.minio.uploader import UPLOADER
+
+# Time shards travel through MinIO, so a replica on any node can run them: <prefix>/<hash>/<index>/
+SHARDS_PREFIX = "shards"
+# Folder of a shard's prefix holding the outputs of its execution
+OUTPUTS_DIR = "out"
+# Outputs of the engine the handler merges
+OUTPUT_EXTENSIONS = (".csv", ".txt")
+
+
+def shard_prefix(request_hash: str, index: int) -> str:
+    return f"{SHARDS_PREFIX}/{request_hash}/{index:03d}"
+
+
+def upload_shard_input(request_hash: str, index: int, local_path: str) -> str:
+    """Upload the NetCDF of a shard.
+
+    Returns:
+        str: Object name the execution downloads it from.
+    """
+    object_name = f"{shard_prefix(request_hash, index)}/{os.path.basename(local_path)}"
+    UPLOADER.upload_file(local_path, object_name)
+    return object_name
+
+
+def download_shard_input(object_name: str, local_path: str) -> bool:
+    """Fetch the NetCDF of a shard, unless this node already has it (same volume as the handler).
+
+    Returns:
+        bool: Whether it was downloaded.
+    """
+    stat = UPLOADER.client.stat_object(UPLOADER.bucket, object_name)
+    if os.path.isfile(local_path) and os.path.getsize(local_path) == stat.size:
+        return False
+    UPLOADER.download_file(object_name, local_path)
+    return True
+
+
+def upload_shard_outputs(request_hash: str, index: int, local_folder: str) -> int:
+    """Upload the outputs an execution wrote for a shard.
+
+    Returns:
+        int: Objects uploaded.
+    """
+    prefix = f"{shard_prefix(request_hash, index)}/{OUTPUTS_DIR}"
+    files = [(os.path.join(local_folder, name), f"{prefix}/{name}") for name in sorted(os.listdir(local_folder))
+             if name.endswith(OUTPUT_EXTENSIONS)]
+    if not files:
+        raise FileNotFoundError(f"Shard {index} wrote no outputs in {local_folder}")
+
+    result = UPLOADER.upload_files(files)
+    if result.failed:
+        raise RuntimeError(f"Failed to upload {len(result.failed)} of {len(files)} outputs of shard {index}")
+    return result.objects
+
+
+def download_shard_outputs(request_hash: str, index: int, local_folder: str) -> list:
+    """Download the outputs of a shard into ``local_folder``.
+
+    Returns:
+        list: Paths of the downloaded files.
+    """
+    prefix = f"{shard_prefix(request_hash, index)}/{OUTPUTS_DIR}/"
+    names = UPLOADER.list_names(prefix)
+    if not names:
+        raise FileNotFoundError(f"Shard {index} has no outputs under {prefix} in MinIO")
+
+    paths = []
+    for name in names:
+        local_path = os.path.join(local_folder, name[len(prefix):])
+        UPLOADER.download_file(name, local_path)
+        paths.append(local_path)
+    return paths
+
+
+def remove_shard_objects(request_hash: str) -> int:
+    """Delete the inputs and outputs of every shard of a request."""
+    return UPLOADER.remove_prefix(f"{SHARDS_PREFIX}/{request_hash}/")
@@ -1,32 +1,34 @@
 import os
-from minio import Minio
-from dotenv import load_dotenv
 
-load_dotenv()
+from utils.minio.uploader import UPLOADER, MINIO_BUCKET
 
-MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
-MINIO_USER = os.getenv("MINIO_USER", "minioadmin")
-MINIO_PASSWORD = os.getenv("MINIO_PASSWORD", "minioadmin")
-MINIO_BUCKET = os.getenv("MINIO_BUCKET", "my-bucket")
 
-minio_client = Minio(
-    endpoint=MINIO_ENDPOINT,  
-    access_key=MINIO_USER,             
-    secret_key=MINIO_PASSWORD,
-    secure=False                              
-)
+def ensure_bucket():
+    """Create the bucket if it does not exist yet."""
+    UPLOADER.ensure_bucket()
+
+
+def upload_file(request_hash: str, local_path: str) -> int:
+    """Upload one file under the request hash.
+
+    Args:
+        request_hash (str): Request the file belongs to.
+        local_path (str): Path of the file to upload.
+
+    Returns:
+        int: Bytes uploaded.
+    """
+    return UPLOADER.upload_file(local_path, f"{request_hash}/{os.path.basename(local_path)}")
+
 
 def upload_files_to_request_hash(request_hash: str, local_folder: str = "./out"):
     print(f"Uploading files to MinIO bucket '{MINIO_BUCKET}' under request hash '{request_hash}'...")
-    if not minio_client.bucket_exists(MINIO_BUCKET):
-        minio_client.make_bucket(MINIO_BUCKET)
-
-    for filename in os.listdir(local_folder):
-        local_path = os.path.join(local_folder, filename)
-        if os.path.isfile(local_path):
-            object_name = f"{request_hash}/{filename}"
-            # print(f"Uploading {local_path} to {MINIO_BUCKET}/{object_name}")
-            minio_client.fput_object(MINIO_BUCKET, object_name, local_path)
+    result = UPLOADER.upload_folder(request_hash, local_folder)
 
-    print("✅ All files uploaded successfully.")
+    if result.failed:
+        raise RuntimeError(f"Failed to upload {len(result.failed)} of {len(result.failed) + result.objects} files")
 
+    mb_per_second = result.bytes / 1024 / 1024 / result.seconds if result.seconds > 0 else 0
+    print(f"✅ All files uploaded successfully ({result.objects} objects, "
+          f"{result.bytes / 1024 / 1024:.2f} MB in {result.seconds:.2f} seconds, {mb_per_second:.2f} MB/s).")
+    return result
@@ -0,0 +1,183 @@
+import os
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import urllib3
+from minio import Minio
+from minio.deleteobjects import DeleteObject
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
+MINIO_USER = os.getenv("MINIO_USER", "minioadmin")
+MINIO_PASSWORD = os.getenv("MINIO_PASSWORD", "minioadmin")
+MINIO_BUCKET = os.getenv("MINIO_BUCKET", "my-bucket")
+
+# Concurrent uploads (and pooled HTTP connections) per uploader
+MINIO_UPLOAD_WORKERS = int(os.getenv("MINIO_UPLOAD_WORKERS", 8))
+# Multipart part size for large outputs (MinIO requires at least 5 MiB)
+MINIO_PART_SIZE_MB = int(os.getenv("MINIO_PART_SIZE_MB", 16))
+# Attempts per object and base delay of the exponential backoff between them
+MINIO_UPLOAD_RETRIES = int(os.getenv("MINIO_UPLOAD_RETRIES", 3))
+MINIO_UPLOAD_BACKOFF = float(os.getenv("MINIO_UPLOAD_BACKOFF", 0.5))
+
+UploadResult = namedtuple("UploadResult", ["objects", "bytes", "seconds", "failed"])
+
+
+class MinioUploader:
+    """Concurrent uploader sharing one MinIO client and HTTP connection pool.
+
+    Objects are uploaded by a bounded thread pool, large files in parts of
+    ``part_size`` bytes, and every object is retried with exponential backoff.
+    The bucket is checked once per uploader instead of once per call.
+    """
+
+    def __init__(self, endpoint: str = MINIO_ENDPOINT, access_key: str = MINIO_USER,
+                 secret_key: str = MINIO_PASSWORD, bucket: str = MINIO_BUCKET,
+                 workers: int = MINIO_UPLOAD_WORKERS, part_size_mb: int = MINIO_PART_SIZE_MB,
+                 retries: int = MINIO_UPLOAD_RETRIES, backoff: float = MINIO_UPLOAD_BACKOFF):
+        self.bucket = bucket
+        self.workers = workers
+        self.part_size = max(part_size_mb, 5) * 1024 * 1024
+        self.retries = max(retries, 1)
+        self.backoff = backoff
+
+        # Retries are handled per object below, so urllib3 must not retry on its own
+        self.http_client = urllib3.PoolManager(
+            maxsize=workers,
+            timeout=urllib3.Timeout(connect=10, read=300),
+            retries=False,
+        )
+        self.client = Minio(
+            endpoint=endpoint,
+            access_key=access_key,
+            secret_key=secret_key,
+            secure=False,
+            http_client=self.http_client,
+        )
+        self._executor = None
+        self._bucket_ready = False
+        self._lock = threading.Lock()
+
+    def ensure_bucket(self):
+        """Create the bucket if needed. Only the first call hits the server."""
+        with self._lock:
+            if self._bucket_ready:
+                return
+            if not self.client.bucket_exists(self.bucket):
+                self.client.make_bucket(self.bucket)
+            self._bucket_ready = True
+
+    def upload_file(self, local_path: str, object_name: str) -> int:
+        """Upload one file, retrying with exponential backoff.
+
+        Args:
+            local_path (str): Path of the file to upload.
+            object_name (str): Object name inside the bucket.
+
+        Returns:
+            int: Bytes uploaded.
+        """
+        self.ensure_bucket()
+
+        for attempt in range(self.retries):
+            try:
+                self.client.fput_object(self.bucket, object_name, local_path, part_size=self.part_size)
+                return os.path.getsize(local_path)
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                print(f"Upload of {object_name} failed ({str(e)}), retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+
+    def submit(self, local_path: str, object_name: str):
+        """Upload a file in the background.
+
+        Returns:
+            Future: Resolves to the bytes uploaded.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="minio-upload")
+        return self._executor.submit(self.upload_file, local_path, object_name)
+
+    def upload_files(self, files) -> UploadResult:
+        """Upload (local_path, object_name) pairs concurrently and wait for all of them.
+
+        Returns:
+            UploadResult: Objects and bytes uploaded, wall time and failed paths.
+        """
+        start_time = time.time()
+        futures = {self.submit(local_path, object_name): local_path for local_path, object_name in files}
+        wait(futures)
+
+        objects, uploaded, failed = 0, 0, []
+        for future, local_path in futures.items():
+            try:
+                uploaded += future.result()
+                objects += 1
+            except Exception as e:
+                print(f"Error uploading {local_path}: {str(e)}")
+                failed.append(local_path)
+
+        return UploadResult(objects, uploaded, time.time() - start_time, failed)
+
+    def upload_folder(self, prefix: str, local_folder: str) -> UploadResult:
+        """Upload the files directly inside ``local_folder`` as ``<prefix>/<filename>``."""
+        files = []
+        for filename in sorted(os.listdir(local_folder)):
+            local_path = os.path.join(local_folder, filename)
+            if os.path.isfile(local_path):
+                files.append((local_path, f"{prefix}/{filename}"))
+        return self.upload_files(files)
+
+    def download_file(self, object_name: str, local_path: str) -> int:
+        """Download one object, retrying with exponential backoff.
+
+        The object is written next to ``local_path`` and renamed once
+        complete, so a failed download never leaves a truncated file.
+
+        Returns:
+            int: Bytes downloaded.
+        """
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        for attempt in range(self.retries):
+            try:
+                self.client.fget_object(self.bucket, object_name, local_path)
+                return os.path.getsize(local_path)
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                print(f"Download of {object_name} failed ({str(e)}), retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+
+    def list_names(self, prefix: str) -> list:
+        """Names of the objects under ``prefix``, recursively."""
+        return [obj.object_name for obj in self.client.list_objects(self.bucket, prefix=prefix, recursive=True)]
+
+    def remove_prefix(self, prefix: str) -> int:
+        """Delete every object under ``prefix``.
+
+        Returns:
+            int: Objects deleted.
+        """
+        names = self.list_names(prefix)
+        errors = list(self.client.remove_objects(self.bucket, [DeleteObject(name) for name in names]))
+        if errors:
+            raise RuntimeError(f"Failed to delete {len(errors)} objects under {prefix}: {errors[0]}")
+        return len(names)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.http_client.clear()
+
+
+UPLOADER = MinioUploader()
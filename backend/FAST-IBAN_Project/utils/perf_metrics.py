@@ -0,0 +1,229 @@
+import os
+import glob
+import math
+import time
+import sqlite3
+import statistics
+
+# History of every run, on the config volume so it survives releases and rebuilds
+PERF_HISTORY_DB = os.getenv("PERF_HISTORY_DB", "./config/perf/perf_history.sqlite")
+# Previous runs of the same configuration the current one is compared against
+PERF_BASELINE_RUNS = int(os.getenv("PERF_BASELINE_RUNS", 10))
+
+# Parts of the speed file: "init" and "total" once per run (once per rank with MPI), stages once per time step
+STAGES = {"init": "init", "1": "filtering", "2": "formations", "total": "total"}
+STEP_STAGES = ("filtering", "formations")
+# Serial runs the speedup of a run is measured against
+SERIAL = ("serial", 1, 1)
+# Columns added after the table was first created: (name, type)
+ADDED_COLUMNS = (("parallelism", "TEXT"), ("reason", "TEXT"), ("speedup", "REAL"), ("expected_speedup", "REAL"))
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 150, 300, math.inf)
+
+
+def speed_file(out_dir: str):
+    """Speed CSV the engine just wrote in ``out_dir`` (the newest one), or None."""
+    paths = glob.glob(os.path.join(out_dir, "speed_*.csv"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def read_speed_file(path: str) -> dict:
+    """Timings of a speed CSV (``part,instant,time_elapsed``) by stage.
+
+    Returns:
+        dict: {stage: [seconds, ...]}; unknown parts and malformed lines are skipped.
+    """
+    timings = {}
+    with open(path) as f:
+        next(f, None)
+        for line in f:
+            fields = line.strip().split(",")
+            if len(fields) != 3 or fields[0] not in STAGES:
+                continue
+            try:
+                timings.setdefault(STAGES[fields[0]], []).append(float(fields[2]))
+            except ValueError:
+                continue
+    return timings
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    index = min(max(math.ceil(fraction * len(ordered)) - 1, 0), len(ordered) - 1)
+    return ordered[index]
+
+
+def histogram(values: list) -> dict:
+    """Summary and per bucket counts (non cumulative, empty buckets left out) of a list of durations."""
+    ordered = sorted(values)
+    counts = [0] * len(BUCKETS)
+    for value in ordered:
+        counts[next(i for i, bound in enumerate(BUCKETS) if value <= bound)] += 1
+    return {
+        "count": len(ordered),
+        "sum": round(sum(ordered), 3),
+        "min": ordered[0],
+        "mean": round(statistics.fmean(ordered), 4),
+        "p50": _percentile(ordered, 0.5),
+        "p95": _percentile(ordered, 0.95),
+        "max": ordered[-1],
+        "buckets": {("+Inf" if math.isinf(bound) else str(bound)): count
+                    for bound, count in zip(BUCKETS, counts) if count},
+    }
+
+
+def stage_metrics(timings: dict) -> dict:
+    """Histograms of the per time step stages plus init and total.
+
+    Ranks run init in parallel and only rank 0 writes the total, so both are
+    the largest value written.
+    """
+    metrics = {stage: histogram(timings[stage]) for stage in STEP_STAGES if timings.get(stage)}
+    for stage in ("init", "total"):
+        if timings.get(stage):
+            metrics[stage] = max(timings[stage])
+    return metrics
+
+
+class PerfHistory:
+    """SQLite history of the engine's timings, one row per run.
+
+    Rows are keyed by what decides the speed of a run (grid size, time
+    steps, variant, threads and processes) and by the build of the
+    executable, so the same configuration can be compared across releases.
+    """
+
+    def __init__(self, path: str = PERF_HISTORY_DB):
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recorded_at TEXT NOT NULL,
+                build TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                threads INTEGER NOT NULL,
+                processes INTEGER NOT NULL,
+                nlat INTEGER,
+                nlon INTEGER,
+                time_steps INTEGER,
+                request_hash TEXT,
+                wall_seconds REAL NOT NULL,
+                init_seconds REAL,
+                total_seconds REAL,
+                filtering_sum REAL,
+                filtering_p50 REAL,
+                filtering_p95 REAL,
+                formations_sum REAL,
+                formations_p50 REAL,
+                formations_p95 REAL,
+                seconds_per_step REAL
+            )""")
+        # Columns added after the table was first created
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(runs)")}
+        for column, kind in ADDED_COLUMNS:
+            if column not in existing:
+                connection.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+        connection.execute("CREATE INDEX IF NOT EXISTS runs_config ON runs "
+                           "(variant, threads, processes, nlat, nlon, time_steps)")
+        return connection
+
+    def _wall_per_step(self, connection, where: str, values: tuple) -> list:
+        return [value for (value,) in connection.execute(
+            f"SELECT wall_seconds / time_steps FROM runs WHERE {where} AND time_steps > 0 "
+            f"ORDER BY id DESC LIMIT ?", (*values, PERF_BASELINE_RUNS))]
+
+    def configurations(self, nlat: int, nlon: int) -> dict:
+        """Measured wall seconds per time step of every configuration run on a grid.
+
+        Returns:
+            dict: {(variant, processes, threads): (median seconds per step, runs)} over the last
+            ``PERF_BASELINE_RUNS`` runs of each configuration.
+        """
+        result = {}
+        with self._connect() as connection:
+            configs = connection.execute("SELECT DISTINCT variant, processes, threads FROM runs "
+                                         "WHERE nlat = ? AND nlon = ?", (nlat, nlon)).fetchall()
+            for variant, processes, threads in configs:
+                timings = self._wall_per_step(
+                    connection, "variant = ? AND processes = ? AND threads = ? AND nlat = ? AND nlon = ?",
+                    (variant, processes, threads, nlat, nlon))
+                if timings:
+                    result[(variant, processes, threads)] = (statistics.median(timings), len(timings))
+        connection.close()
+        return result
+
+    def record(self, run: dict, metrics: dict) -> dict:
+        """Store a run and compare it with the previous runs of the same configuration.
+
+        Args:
+            run (dict): build, variant, threads, processes, nlat, nlon, time_steps, request_hash, wall_seconds,
+                and optionally parallelism ("auto" or "manual"), reason and expected_speedup of its choice.
+            metrics (dict): Output of ``stage_metrics``.
+
+        Returns:
+            dict: seconds_per_step of this run, median of the baseline and their ratio (None without
+            history), and its speedup over the serial runs of the same grid.
+        """
+        steps = run.get("time_steps")
+        step_seconds = sum(metrics[stage]["sum"] for stage in STEP_STAGES if stage in metrics)
+        per_step = step_seconds / steps if steps and step_seconds else None
+
+        row = {
+            **run,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "init_seconds": metrics.get("init"),
+            "total_seconds": metrics.get("total"),
+            "seconds_per_step": per_step,
+        }
+        for stage in STEP_STAGES:
+            for field in ("sum", "p50", "p95"):
+                row[f"{stage}_{field}"] = metrics.get(stage, {}).get(field)
+
+        config = "variant = ? AND threads = ? AND processes = ? AND nlat IS ? AND nlon IS ? AND time_steps IS ?"
+        config_values = (run["variant"], run["threads"], run["processes"], run.get("nlat"), run.get("nlon"), steps)
+        with self._connect() as connection:
+            previous = [value for (value,) in connection.execute(
+                f"SELECT seconds_per_step FROM runs WHERE {config} AND seconds_per_step IS NOT NULL "
+                f"ORDER BY id DESC LIMIT ?", (*config_values, PERF_BASELINE_RUNS))]
+            # Achieved speedup: wall time per step of the serial runs of this grid over this run's
+            serial = self._wall_per_step(
+                connection, "variant = ? AND processes = ? AND threads = ? AND nlat IS ? AND nlon IS ?",
+                (*SERIAL, run.get("nlat"), run.get("nlon")))
+            wall_per_step = run["wall_seconds"] / steps if steps else None
+            if (run["variant"], run["processes"], run["threads"]) == SERIAL and not serial and wall_per_step:
+                serial = [wall_per_step]
+            row["speedup"] = statistics.median(serial) / wall_per_step if serial and wall_per_step else None
+            columns = ", ".join(row)
+            connection.execute(f"INSERT INTO runs ({columns}) VALUES ({', '.join('?' * len(row))})",
+                               tuple(row.values()))
+        connection.close()
+
+        baseline = statistics.median(previous) if previous else None
+        return {
+            "seconds_per_step": per_step,
+            "baseline_seconds_per_step": baseline,
+            "baseline_runs": len(previous),
+            "ratio": per_step / baseline if per_step and baseline else None,
+            "speedup": row["speedup"],
+        }
+
+
+def summary(report: dict) -> str:
+    """One line description of a performance report, for the execution notification."""
+    parts = []
+    for stage, name in (("filtering", "filtrado"), ("formations", "formaciones")):
+        if stage in report["stages"]:
+            stats = report["stages"][stage]
+            parts.append(f"{name} p50 {stats['p50']:.3f} s / p95 {stats['p95']:.3f} s ({stats['count']} pasos)")
+    if report.get("speedup"):
+        parts.append(f"aceleración x{report['speedup']:.2f} sobre la ejecución en serie")
+    if report.get("ratio"):
+        parts.append(f"{report['ratio']:.0%} del tiempo por paso de las {report['baseline_runs']} ejecuciones previas "
+                     f"con la misma configuración")
+    return "; ".join(parts) or "sin tiempos por etapa"
+
+
+PERF_HISTORY = PerfHistory()
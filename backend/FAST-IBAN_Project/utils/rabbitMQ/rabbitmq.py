@@ -77,7 +77,7 @@ class RabbitMQ:
         logger.info(f"Started consuming from queue: {queue_name} with tag: {consumer_tag}")
         return consumer_tag
 
-    async def publish(self, exchange: str, routing_key: str, message: Any):
+    async def publish(self, exchange: str, routing_key: str, message: Any, expiration: Any = MESSAGE_TTL):
         """
         Publish a message to the specified exchange with the given routing key asynchronously.
         
@@ -85,6 +85,7 @@ class RabbitMQ:
             exchange: Exchange name
             routing_key: Routing key
             message: Message to publish (will be serialized to JSON if not already a string)
+            expiration: Seconds the message may wait in the queue (None: no expiration)
         """
         if not self.channel:
             raise Exception("Connection is not established.")
@@ -101,7 +102,7 @@ class RabbitMQ:
             aio_pika.Message(
                 body=message.encode(),
                 delivery_mode=MESSAGE_PERSISTENT,
-                expiration=MESSAGE_TTL
+                expiration=expiration
             ),
             routing_key=routing_key
         )
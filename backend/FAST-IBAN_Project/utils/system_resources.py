@@ -0,0 +1,120 @@
+import os
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# cgroup v1 reports "no limit" as a huge page-aligned number instead of "max"
+UNLIMITED = 1 << 60
+
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_dirs(controller: str) -> list:
+    """Directories to look for ``controller`` files in, most specific first.
+
+    Inside a container the cgroup namespace makes the mount root the
+    container's own group; on a host the group path of this process is
+    tried first.
+    """
+    v1, v2 = [], []
+    for line in (_read("/proc/self/cgroup") or "").splitlines():
+        hierarchy, controllers, path = line.split(":", 2)
+        if hierarchy == "0" and controllers == "":
+            v2.append(os.path.join(CGROUP_ROOT, path.lstrip("/")))
+        elif controller in controllers.split(","):
+            v1.append(os.path.join(CGROUP_ROOT, controllers, path.lstrip("/")))
+            v1.append(os.path.join(CGROUP_ROOT, controller))
+    v2.append(CGROUP_ROOT)
+    return v1 + v2
+
+
+def _cgroup_value(controller: str, names) -> tuple:
+    """First (path, content) found among the file ``names`` in the cgroup directories."""
+    for directory in _cgroup_dirs(controller):
+        for name in names:
+            path = os.path.join(directory, name)
+            value = _read(path)
+            if value is not None:
+                return path, value
+    return None, None
+
+
+def _meminfo(field: str):
+    for line in (_read("/proc/meminfo") or "").splitlines():
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+def memory_limit() -> int:
+    """Memory the container may use, in bytes: the cgroup limit or the machine's RAM."""
+    total = _meminfo("MemTotal") or UNLIMITED
+    _, value = _cgroup_value("memory", ("memory.max", "memory.limit_in_bytes"))
+    if value is None or value == "max" or int(value) >= UNLIMITED:
+        return total
+    return min(int(value), total)
+
+
+def memory_usage() -> int:
+    """Memory in use by the container, in bytes, without reclaimable page cache.
+
+    Same working set the OOM killer and ``docker stats`` go by: the cgroup
+    usage minus its inactive file pages. Falls back to the machine's used RAM.
+    """
+    path, value = _cgroup_value("memory", ("memory.current", "memory.usage_in_bytes"))
+    if value is None:
+        return (_meminfo("MemTotal") or 0) - (_meminfo("MemAvailable") or 0)
+
+    usage = int(value)
+    stat = _read(os.path.join(os.path.dirname(path), "memory.stat"))
+    inactive = 0
+    for line in (stat or "").splitlines():
+        key, _, amount = line.partition(" ")
+        if key in ("inactive_file", "total_inactive_file"):
+            inactive = int(amount)
+            if key == "total_inactive_file":
+                break
+    return max(usage - inactive, 0)
+
+
+def memory_available() -> int:
+    """Bytes the container can still allocate before reaching its limit."""
+    return max(memory_limit() - memory_usage(), 0)
+
+
+def cpu_limit() -> float:
+    """CPUs the container may use: the CFS quota, the CPU affinity or the CPU count, whichever is lower."""
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        cpus = float(os.cpu_count() or 1)
+
+    path, value = _cgroup_value("cpu", ("cpu.max", "cpu.cfs_quota_us"))
+    if path is None:
+        return cpus
+    if path.endswith("cpu.max"):
+        quota, _, period = value.partition(" ")
+        if quota != "max":
+            cpus = min(cpus, int(quota) / int(period or 100000))
+    elif int(value) > 0:
+        period = _read(os.path.join(os.path.dirname(path), "cpu.cfs_period_us"))
+        cpus = min(cpus, int(value) / int(period or 100000))
+    return cpus
+
+
+def available_cpus() -> int:
+    """Whole CPUs available to the container (at least one)."""
+    return max(int(cpu_limit()), 1)
+
+
+def process_rss(pid: int = None) -> int:
+    """Resident set size of a process (this one by default), in bytes; 0 if it is gone."""
+    statm = _read(f"/proc/{pid or 'self'}/statm")
+    try:
+        return int(statm.split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, IndexError):
+        return 0
@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+from concurrent.futures import wait
+
+from utils.minio.uploader import UPLOADER
+
+
+class ArtifactUploader:
+    """Per-request upload stage for the rendered maps.
+
+    Workers only write files; the handler adds them to this manifest as each
+    work unit finishes and the shared MinIO uploader sends every new file
+    exactly once, overlapping the uploads with the rendering still in progress.
+    ``seconds`` spans from the first upload started to the last one finished.
+    Files under ``root`` keep their relative path in the object name (e.g.
+    tile pyramids); the rest are uploaded by file name.
+    """
+
+    def __init__(self, request_hash: str, uploader=UPLOADER, root: str = None):
+        self.request_hash = request_hash
+        self.uploader = uploader
+        self.root = os.path.abspath(root) if root else None
+        self.manifest = []
+        self.failed = []
+        self.objects = 0
+        self.bytes = 0
+        self._seen = set()
+        self._futures = []
+        self._first_start = None
+        self._last_end = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish()
+
+    def add(self, files):
+        """Start uploading the files not uploaded yet."""
+        for local_path in files:
+            if local_path in self._seen:
+                continue
+            self._seen.add(local_path)
+            self.manifest.append(local_path)
+            if self._first_start is None:
+                self._first_start = time.time()
+
+            object_name = f"{self.request_hash}/{self.relative_name(local_path)}"
+            future = self.uploader.submit(local_path, object_name)
+            future.add_done_callback(lambda done, local_path=local_path: self._on_done(done, local_path))
+            self._futures.append(future)
+
+    def relative_name(self, local_path: str) -> str:
+        """Object name of ``local_path`` below the request's prefix."""
+        if self.root is not None:
+            relative = os.path.relpath(os.path.abspath(local_path), self.root)
+            if not relative.startswith(os.pardir):
+                return relative.replace(os.sep, "/")
+        return os.path.basename(local_path)
+
+    def finish(self) -> dict:
+        """Wait for every upload started and return the upload stats."""
+        wait(self._futures)
+        return self.stats()
+
+    def stats(self) -> dict:
+        with self._lock:
+            seconds = 0.0
+            if self._first_start is not None and self._last_end is not None:
+                seconds = self._last_end - self._first_start
+            return {
+                "objects": self.objects,
+                "bytes": self.bytes,
+                "seconds": round(seconds, 2),
+                "failed": len(self.failed),
+            }
+
+    def _on_done(self, future, local_path: str):
+        with self._lock:
+            self._last_end = time.time()
+            try:
+                self.bytes += future.result()
+                self.objects += 1
+            except Exception as e:
+                print(f"Error uploading {os.path.basename(local_path)}: {str(e)}")
+                self.failed.append(local_path)
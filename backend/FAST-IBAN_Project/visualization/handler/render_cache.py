@@ -0,0 +1,310 @@
+import os
+import io
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
+import cartopy
+from minio.commonconfig import CopySource
+from minio.deleteobjects import DeleteObject
+
+from utils.consts.consts import LABEL_MODES, DEFAULT_LABEL_MODE
+from utils.minio.uploader import UPLOADER, MINIO_UPLOAD_WORKERS
+from visualization.mapGeneration.dataset_pool import file_identity
+
+# Prefix of the cache inside the bucket: render-cache/<key>/<object> plus render-cache/<key>/manifest.json
+RENDER_CACHE_PREFIX = os.getenv("RENDER_CACHE_PREFIX", "render-cache")
+# Size of the cache in the bucket; least recently used entries are evicted beyond it
+RENDER_CACHE_MAX_MB = float(os.getenv("RENDER_CACHE_MAX_MB", 4096))
+# 0 disables lookups and stores
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "1") != "0"
+# Bump to invalidate every entry by hand; source and library changes already do it
+RENDER_CACHE_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+# Settings read by the renderer from the environment that change its output
+RENDER_SETTINGS_PREFIXES = ("LOD_", "GEOJSON_", "TILE_", "ANIMATION_")
+MAP_GENERATION_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "mapGeneration"))
+
+
+def renderer_version() -> str:
+    """Digest of everything that changes a map besides the request: sources, libraries and settings."""
+    digest = hashlib.sha256(f"{RENDER_CACHE_VERSION}|{matplotlib.__version__}|{cartopy.__version__}".encode())
+    for name in sorted(os.listdir(MAP_GENERATION_DIR)):
+        if name.endswith(".py"):
+            with open(os.path.join(MAP_GENERATION_DIR, name), "rb") as f:
+                digest.update(name.encode() + f.read())
+    for name in sorted(os.environ):
+        if name.startswith(RENDER_SETTINGS_PREFIXES):
+            digest.update(f"{name}={os.environ[name]}".encode())
+    return digest.hexdigest()[:16]
+
+
+RENDERER_VERSION = renderer_version()
+
+# sha256 of the files already hashed, by (path, size, mtime)
+_content_digests = {}
+_digest_lock = threading.Lock()
+
+
+def content_digest(paths) -> str:
+    """sha256 of the contents of ``paths``, so copies of the same data share cache entries.
+
+    Each file is read once per process while its size and mtime don't change.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        identity = file_identity(path)
+        with _digest_lock:
+            file_digest = _content_digests.get(identity)
+        if file_digest is None:
+            file_hash = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                    file_hash.update(chunk)
+            file_digest = file_hash.hexdigest()
+            with _digest_lock:
+                _content_digests[identity] = file_digest
+        digest.update(file_digest.encode())
+    return digest.hexdigest()
+
+
+def render_key(**inputs) -> str:
+    """Cache key of one product: hash of its inputs plus the renderer version."""
+    payload = json.dumps({**inputs, "renderer": RENDERER_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RenderCache:
+    """Content-addressed cache of rendered products in the MinIO bucket.
+
+    A product (one map type and level of one time step, or one animation)
+    is stored under ``render-cache/<key>/`` with a manifest listing its
+    objects. A hit copies those objects server-side to the request's prefix
+    instead of rendering and uploading them again. The manifest is rewritten
+    on every hit, so its LastModified is the entry's last use and the least
+    recently used entries are evicted once the cache exceeds ``max_bytes``.
+    """
+
+    def __init__(self, uploader=UPLOADER, prefix: str = RENDER_CACHE_PREFIX,
+                 max_bytes: int = int(RENDER_CACHE_MAX_MB * 1024 * 1024), workers: int = MINIO_UPLOAD_WORKERS):
+        self.uploader = uploader
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.uploader.client
+
+    @property
+    def bucket(self) -> str:
+        return self.uploader.bucket
+
+    def manifest_name(self, key: str) -> str:
+        return f"{self.prefix}/{key}/{MANIFEST_NAME}"
+
+    def fetch(self, key: str, request_hash: str):
+        """Copy a cached product to ``request_hash/`` if the cache has it.
+
+        Returns:
+            list | None: Object names (relative to the request) copied, or None on a miss.
+        """
+        try:
+            self.uploader.ensure_bucket()
+            response = self.client.get_object(self.bucket, self.manifest_name(key))
+            try:
+                manifest = json.loads(response.read())
+            finally:
+                response.close()
+                response.release_conn()
+
+            for name in manifest["objects"]:
+                self.client.copy_object(self.bucket, f"{request_hash}/{name}",
+                                        CopySource(self.bucket, f"{self.prefix}/{key}/{name}"))
+            # Refresh the entry's last use for the LRU
+            self._put_manifest(key, manifest)
+        except Exception:
+            # Missing or half-evicted entries are rendered again
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return manifest["objects"]
+
+    def fetch_many(self, keys: dict, request_hash: str) -> dict:
+        """Look up several products concurrently.
+
+        Args:
+            keys (dict): {product: key}.
+            request_hash (str): Prefix the hits are copied to.
+
+        Returns:
+            dict: {product: objects copied} of the hits.
+        """
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render-cache") as executor:
+            copied = dict(zip(keys, executor.map(lambda key: self.fetch(key, request_hash), keys.values())))
+        return {product: objects for product, objects in copied.items() if objects is not None}
+
+    def store(self, key: str, request_hash: str, objects: list, size: int = 0, inputs: dict = None) -> bool:
+        """Copy the objects of a product just uploaded under ``request_hash/`` into the cache.
+
+        The manifest is written last, so an entry is only visible once complete.
+        """
+        try:
+            for name in objects:
+                self.client.copy_object(self.bucket, f"{self.prefix}/{key}/{name}",
+                                        CopySource(self.bucket, f"{request_hash}/{name}"))
+            self._put_manifest(key, {"objects": list(objects), "bytes": size, "inputs": inputs or {}})
+        except Exception as e:
+            print(f"Warning: render cache entry {key[:12]} not stored: {str(e)}")
+            return False
+
+        with self._lock:
+            self.stored += 1
+        return True
+
+    def store_many(self, entries: list, request_hash: str) -> int:
+        """Store (key, objects, size, inputs) entries concurrently and evict down to the size limit.
+
+        Returns:
+            int: Entries stored.
+        """
+        if not entries:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render-cache") as executor:
+            stored = sum(executor.map(lambda entry: self.store(entry[0], request_hash, *entry[1:]), entries))
+        self.evict()
+        return stored
+
+    def evict(self) -> int:
+        """Delete the least recently used entries until the cache fits ``max_bytes``.
+
+        Entries without a manifest (being stored, or left half-written) age
+        by their newest object.
+
+        Returns:
+            int: Entries evicted.
+        """
+        try:
+            entries = {}
+            for obj in self.client.list_objects(self.bucket, prefix=f"{self.prefix}/", recursive=True):
+                key = obj.object_name[len(self.prefix) + 1:].split("/", 1)[0]
+                entry = entries.setdefault(key, {"bytes": 0, "used": 0.0, "names": []})
+                entry["bytes"] += obj.size or 0
+                entry["names"].append(obj.object_name)
+                modified = obj.last_modified.timestamp() if obj.last_modified else time.time()
+                if obj.object_name.endswith(f"/{MANIFEST_NAME}"):
+                    entry["used"] = modified
+                    entry["manifest"] = True
+                elif not entry.get("manifest"):
+                    entry["used"] = max(entry["used"], modified)
+
+            total = sum(entry["bytes"] for entry in entries.values())
+            evicted = 0
+            for key, entry in sorted(entries.items(), key=lambda item: item[1]["used"]):
+                if total <= self.max_bytes:
+                    break
+                # Manifest first: a hit never sees an entry whose objects are going away
+                names = sorted(entry["names"], key=lambda name: not name.endswith(f"/{MANIFEST_NAME}"))
+                errors = list(self.client.remove_objects(self.bucket, [DeleteObject(name) for name in names]))
+                if errors:
+                    print(f"Warning: render cache entry {key[:12]} not fully evicted: {errors[0]}")
+                total -= entry["bytes"]
+                evicted += 1
+        except Exception as e:
+            print(f"Warning: render cache eviction failed: {str(e)}")
+            return 0
+
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored": self.stored,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _put_manifest(self, key: str, manifest: dict):
+        data = json.dumps(manifest).encode()
+        self.client.put_object(self.bucket, self.manifest_name(key), io.BytesIO(data), len(data),
+                               content_type="application/json")
+
+
+def request_sources(data: dict, csv_paths: list) -> dict:
+    """Digests of the inputs of a request: the NetCDF file and the engine's CSVs."""
+    return {
+        "netcdf": content_digest([data["file_name"]]),
+        "csv": content_digest(csv_paths) if csv_paths else None,
+    }
+
+
+def plan_render_keys(plan, data: dict, sources: dict, file_formats: list, animation_formats: list,
+                     csv_map_types) -> dict:
+    """Cache key and inputs of every product of a plan.
+
+    Args:
+        plan (TaskPlan): Work units and animations of the request.
+        data (dict): Request content.
+        sources (dict): Input digests, from ``request_sources``.
+        file_formats, animation_formats (list): Formats of the still maps and animations.
+        csv_map_types (set): Map types that also draw the engine's CSVs.
+
+    Returns:
+        dict: {(pressure_level, date, map_type, map_level): (key, inputs)}.
+    """
+    # Keyed by the mode actually drawn, so a change of the default doesn't serve maps labelled the old way
+    label_mode = data.get("label_mode") if data.get("label_mode") in LABEL_MODES else DEFAULT_LABEL_MODE
+    keys = {}
+    for task in [*plan.units, *plan.animations]:
+        for map_type, map_level in task.products:
+            inputs = {
+                "netcdf": sources["netcdf"],
+                "csv": sources["csv"] if map_type in csv_map_types else None,
+                "date": task.date,
+                "frames": getattr(task, "frames", None),
+                "variable": data["variable_name"],
+                "pressure_level": task.pressure_level,
+                "map_type": map_type,
+                "map_level": map_level,
+                "area": [float(area) for area in data["area_covered"]],
+                "formats": animation_formats if hasattr(task, "frames") else file_formats,
+                "label_mode": label_mode,
+            }
+            keys[(task.pressure_level, task.date, map_type, map_level)] = (render_key(**inputs), inputs)
+    return keys
+
+
+def skip_cached(plan, hits: dict):
+    """Plan without the products served by the cache; tasks left without products are dropped."""
+    def remaining(tasks):
+        kept = []
+        for task in tasks:
+            products = tuple(product for product in task.products
+                             if (task.pressure_level, task.date, *product) not in hits)
+            if products:
+                kept.append(task._replace(products=products))
+        return kept
+
+    units = remaining(plan.units)
+    animations = remaining(plan.animations)
+    planned_maps = sum(len(unit.products) for unit in units) + len(animations)
+    return plan._replace(units=units, animations=animations, planned_maps=planned_maps)
@@ -0,0 +1,242 @@
+import os
+import time
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+from utils.system_resources import available_cpus, memory_limit, memory_usage, process_rss
+
+# Worker count (0 sizes the pool from the container's CPU and memory limits) and recycling thresholds
+RENDER_POOL_WORKERS = int(os.getenv("RENDER_POOL_WORKERS", 0))
+RENDER_POOL_MAX_WORKERS = int(os.getenv("RENDER_POOL_MAX_WORKERS", 8))
+RENDER_POOL_MAX_TASKS = int(os.getenv("RENDER_POOL_MAX_TASKS", 200))
+RENDER_POOL_MAX_RSS_MB = float(os.getenv("RENDER_POOL_MAX_RSS_MB", 1536))
+# Share of the container's memory limit the rendering may use; tasks wait beyond it
+RENDER_POOL_MEMORY_FRACTION = float(os.getenv("RENDER_POOL_MEMORY_FRACTION", 0.8))
+# RSS of an idle warm worker, and memory of a typical task, used to size the pool
+RENDER_WORKER_BASE_MB = float(os.getenv("RENDER_WORKER_BASE_MB", 200))
+RENDER_TASK_DEFAULT_MB = float(os.getenv("RENDER_TASK_DEFAULT_MB", 100))
+# Seconds between live memory checks while a task waits for admission
+RENDER_POOL_ADMISSION_POLL = 0.5
+
+# Natural Earth scales loaded into every worker before it takes any task
+PRELOAD_SCALES = ("110m", "50m")
+
+
+def warm_worker():
+    """Executor initializer: import the plotting stack and read the cartopy features once.
+
+    Runs in every new worker, so the imports and the shapefile parsing are paid
+    when the worker starts instead of inside the first map of a request.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+    import xarray  # noqa: F401
+    import scipy.spatial  # noqa: F401
+    import cartopy.feature as cfeature
+    import visualization.mapGeneration.generate_maps  # noqa: F401
+
+    # cartopy keeps the parsed geometries in a module-level cache
+    for scale in PRELOAD_SCALES:
+        for feature in (cfeature.COASTLINE, cfeature.BORDERS):
+            try:
+                list(feature.with_scale(scale).geometries())
+            except Exception as e:
+                print(f"Warning: could not preload {feature.name} ({scale}): {e}")
+
+
+def worker_rss() -> int:
+    """Current resident set size of this process, in bytes."""
+    rss = process_rss()
+    if rss == 0:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return rss
+
+
+def run_task(fn, args):
+    """Run ``fn(args)`` in a worker and report the worker's RSS with the result."""
+    return fn(args), worker_rss()
+
+
+def memory_budget(fraction: float = RENDER_POOL_MEMORY_FRACTION) -> int:
+    """Bytes the rendering may use: a share of the container's memory limit."""
+    return int(memory_limit() * fraction)
+
+
+def pool_size(workers: int = RENDER_POOL_WORKERS, max_workers: int = RENDER_POOL_MAX_WORKERS) -> int:
+    """Workers that fit the container: one per available CPU, as long as each can hold a typical task.
+
+    An explicit ``workers`` (RENDER_POOL_WORKERS) wins over the limits.
+    """
+    if workers > 0:
+        return workers
+    per_worker = (RENDER_WORKER_BASE_MB + RENDER_TASK_DEFAULT_MB) * 1024 * 1024
+    by_memory = int((memory_budget() - process_rss()) // per_worker)
+    return max(min(available_cpus(), by_memory, max_workers), 1)
+
+
+def warm_up_task(_):
+    return True
+
+
+class RenderPool:
+    """Long-lived, pre-warmed process pool shared by every visualization request.
+
+    Workers are spawned once at service start with the plotting modules and the
+    cartopy features already loaded; their number comes from the container's
+    CPU and memory limits (``pool_size``). A worker is replaced after
+    ``max_tasks`` tasks, and the whole pool is recycled between requests when a
+    worker reports an RSS above ``max_rss_mb``.
+
+    Tasks are admitted against memory, not only against free workers: a task
+    with an estimated peak of ``memory`` bytes waits until the larger of the
+    live container usage and the idle usage plus the estimates of the tasks
+    in flight leaves room for it within ``memory_budget``. One task is always
+    admitted when nothing else runs.
+    """
+
+    def __init__(self, workers: int = None, max_tasks: int = RENDER_POOL_MAX_TASKS,
+                 max_rss_mb: float = RENDER_POOL_MAX_RSS_MB, memory_budget_bytes: int = None):
+        self.workers = workers or pool_size()
+        self.max_tasks = max_tasks
+        self.max_rss = int(max_rss_mb * 1024 * 1024)
+        self.memory_budget = memory_budget_bytes or memory_budget()
+        self.executor = None
+        self.startup_seconds = 0.0
+        self.recycles = 0
+        self.tasks = 0
+        self.peak_rss = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self._idle_usage = 0
+        self._reserved = 0
+        self._running = 0
+        self._over_rss = False
+        self._lock = threading.Lock()
+        self._admission = threading.Condition(self._lock)
+
+    def start(self) -> float:
+        """Spawn and warm every worker. Returns the time it took, in seconds."""
+        start_time = time.time()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context('spawn'),
+            initializer=warm_worker,
+            max_tasks_per_child=self.max_tasks,
+        )
+        # Force every worker to start (and run the initializer) now
+        wait([self.executor.submit(warm_up_task, None) for _ in range(self.workers)])
+        self.startup_seconds = time.time() - start_time
+        # Usage of the container with the warm pool idle, the floor the task estimates add to
+        self._idle_usage = memory_usage()
+        print(f"Render pool started with {self.workers} workers in {self.startup_seconds:.2f} seconds "
+              f"(memory budget {self.memory_budget / 1024 / 1024:.0f} MB, "
+              f"{self._idle_usage / 1024 / 1024:.0f} MB in use)")
+        return self.startup_seconds
+
+    def _fits(self, memory: int) -> bool:
+        projected = max(memory_usage(), self._idle_usage + self._reserved)
+        return projected + memory <= self.memory_budget
+
+    def admit(self, memory: int):
+        """Block until a task estimated at ``memory`` bytes fits the budget, and reserve it."""
+        with self._admission:
+            waited = None
+            while self._running and not self._fits(memory):
+                if waited is None:
+                    waited = time.time()
+                    self.throttled += 1
+                self._admission.wait(RENDER_POOL_ADMISSION_POLL)
+            if waited is not None:
+                self.throttled_seconds += time.time() - waited
+            self._reserved += memory
+            self._running += 1
+
+    def submit(self, fn, args, memory: int = 0) -> Future:
+        """Submit ``fn(args)`` to the pool once its estimated memory fits.
+
+        Args:
+            fn (callable): Task, run in a worker.
+            args (tuple): Its arguments.
+            memory (int): Estimated peak memory of the task, in bytes.
+
+        Returns:
+            Future: Resolves to ``fn(args)``'s return value.
+        """
+        if self.executor is None:
+            self.start()
+
+        self.admit(memory)
+        outer = Future()
+        try:
+            inner = self.executor.submit(run_task, fn, args)
+        except BaseException:
+            self._release(memory)
+            raise
+
+        def on_done(done):
+            self._release(memory)
+            try:
+                result, rss = done.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            with self._lock:
+                self.tasks += 1
+                self.peak_rss = max(self.peak_rss, rss)
+                if rss > self.max_rss:
+                    self._over_rss = True
+            outer.set_result(result)
+
+        inner.add_done_callback(on_done)
+        return outer
+
+    def _release(self, memory: int):
+        with self._admission:
+            self._reserved -= memory
+            self._running -= 1
+            self._admission.notify_all()
+
+    def finish_request(self):
+        """Recycle the pool if a worker went over the RSS threshold during the request."""
+        with self._lock:
+            recycle = self._over_rss
+            self._over_rss = False
+        if recycle:
+            print(f"Render pool worker over {self.max_rss / 1024 / 1024:.0f} MB RSS, recycling the pool...")
+            self.shutdown()
+            self.recycles += 1
+            self.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "startup_seconds": round(self.startup_seconds, 2),
+                "recycles": self.recycles,
+                "tasks": self.tasks,
+                "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1),
+                "memory_budget_mb": round(self.memory_budget / 1024 / 1024),
+                "throttled": self.throttled,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+            }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+_RENDER_POOL = None
+
+
+def get_render_pool() -> RenderPool:
+    """Return the process-wide render pool, creating and warming it on first use."""
+    global _RENDER_POOL
+    if _RENDER_POOL is None:
+        _RENDER_POOL = RenderPool()
+        _RENDER_POOL.start()
+    return _RENDER_POOL
@@ -0,0 +1,163 @@
+from collections import namedtuple
+
+from visualization.mapGeneration.generate_maps import resolve_time_index, from_elements_to_date, field_key, area_window
+from visualization.mapGeneration.dataset_pool import DATASET_POOL
+from visualization.mapGeneration.field_cache import FIELD_CACHE_MAX_MB
+from utils.enums.DataType import DataType
+
+# Map types that draw the NetCDF field (the rest only use the engine's CSVs)
+FIELD_MAP_TYPES = {
+    DataType.TYPE_CONT.value, DataType.TYPE_COMB.value, DataType.TYPE_FORMS.value,
+    DataType.TYPE_3D.value, DataType.TYPE_GEOJSON.value, DataType.TYPE_TILES.value
+}
+
+# Map types that draw the points/formations CSVs written by the engine
+CSV_MAP_TYPES = {DataType.TYPE_DISP.value, DataType.TYPE_COMB.value, DataType.TYPE_FORMS.value, DataType.TYPE_GEOJSON.value}
+
+# Map types whose output does not depend on the contour level
+LEVEL_INDEPENDENT_MAP_TYPES = {DataType.TYPE_3D.value}
+
+# Map types rendered once over every time step instead of once per time step
+ANIMATION_MAP_TYPES = {DataType.TYPE_ANIM.value}
+
+# Peak memory of one map over the warm worker: (fixed MB, bytes per grid cell of the area).
+# Fixed costs are the figure, its raster and the basemap; measured on 0.25 deg fields with margin.
+MAP_TYPE_MEMORY = {
+    DataType.TYPE_CONT.value: (60, 64),
+    DataType.TYPE_DISP.value: (50, 16),
+    DataType.TYPE_COMB.value: (60, 64),
+    DataType.TYPE_FORMS.value: (60, 64),
+    DataType.TYPE_3D.value: (60, 48),
+    DataType.TYPE_GEOJSON.value: (40, 48),
+    # Rendered one metatile at a time: the same whatever the zoom levels
+    DataType.TYPE_TILES.value: (50, 96),
+    DataType.TYPE_ANIM.value: (60, 64),
+}
+DEFAULT_MAP_MEMORY = (60, 64)
+# Bytes per cell of a decoded field (float64), kept once per time step by the worker's field cache
+FIELD_BYTES_PER_CELL = 8
+
+# Every map of one (pressure level, time step): products are (map_type, map_level) pairs.
+# key is the field cache key of the time step, or None when no product draws the field.
+# memory is the estimated peak memory of the unit in bytes, used for admission control.
+WorkUnit = namedtuple(
+    "WorkUnit",
+    ["pressure_level", "year", "month", "day", "hour", "date", "time_index", "products", "key", "memory"]
+)
+
+# One animation per pressure level and contour level: frames are (year, month, day, hour)
+# in time order, date spans the first and last frame and products is the single (anim, level) pair.
+AnimationTask = namedtuple("AnimationTask", ["pressure_level", "map_level", "frames", "date", "products", "memory"])
+
+TaskPlan = namedtuple("TaskPlan", ["units", "animations", "skipped_dates", "requested_maps", "planned_maps"])
+
+
+def unique(values) -> list:
+    """Drop repeated values keeping the original order."""
+    return list(dict.fromkeys(values))
+
+
+def plan_products(map_types, map_levels) -> tuple:
+    """Build the (map_type, map_level) pairs rendered for every time step.
+
+    Level-independent map types are rendered once, with the first level.
+    """
+    products = []
+    for map_type in unique(map_types):
+        if map_type in ANIMATION_MAP_TYPES:
+            continue
+        levels = unique(map_levels)
+        if map_type in LEVEL_INDEPENDENT_MAP_TYPES:
+            levels = levels[:1]
+        products.extend((map_type, map_level) for map_level in levels)
+    return tuple(products)
+
+
+def field_cells(file_name: str, area_covered: list) -> int:
+    """Grid cells of the area in the file, the size every per-map memory cost scales with."""
+    with DATASET_POOL.acquire(file_name) as handle:
+        lat_idx, lon_idx, _, _ = area_window(handle.latitude, handle.longitude, area_covered)
+    return len(lat_idx) * len(lon_idx)
+
+
+def estimate_memory(products, cells: int, frames: int = 1) -> int:
+    """Estimated peak memory, in bytes, of rendering ``products`` one after another over ``cells``.
+
+    Maps of a unit run sequentially, so the largest one counts, plus the
+    decoded field of every frame kept by the field cache: no more than its
+    capacity, however many frames, and at least the field being drawn.
+    """
+    peak = 0
+    for map_type, _ in products:
+        fixed_mb, per_cell = MAP_TYPE_MEMORY.get(map_type, DEFAULT_MAP_MEMORY)
+        peak = max(peak, int(fixed_mb * 1024 * 1024 + per_cell * cells))
+    field = FIELD_BYTES_PER_CELL * cells
+    return peak + max(field, min(field * frames, int(FIELD_CACHE_MAX_MB * 1024 * 1024)))
+
+
+def plan_map_tasks(data: dict, variable_type: str, area_covered: list) -> TaskPlan:
+    """Group the requested maps into one work unit per pressure level and time step.
+
+    The cartesian product of the request is checked against the time axis of
+    the NetCDF file first, so dates missing from the file never reach a worker.
+
+    Args:
+        data (dict): Request content (file_name, pressure_level, years, months,
+            days, hours, map_types, map_levels).
+        variable_type (str): Variable short name in the file (z, t).
+        area_covered (list): [lat_max, lon_min, lat_min, lon_max] as floats.
+
+    Returns:
+        TaskPlan: Work units, animations, dates not found in the file and map counts.
+    """
+    products = plan_products(data["map_types"], data["map_levels"])
+    draws_field = variable_type is not None and any(map_type in FIELD_MAP_TYPES for map_type, _ in products)
+    cells = field_cells(data["file_name"], area_covered)
+    unit_memory = estimate_memory(products, cells)
+
+    units = []
+    frames = {}
+    skipped_dates = []
+    requested_steps = 0
+    for pressure_level in unique(data["pressure_level"]):
+        for year in unique(data["years"]):
+            for month in unique(data["months"]):
+                for day in unique(data["days"]):
+                    for hour in unique(data["hours"]):
+                        requested_steps += 1
+                        date = from_elements_to_date(year, month, day, hour)
+                        time_index = resolve_time_index(data["file_name"], date)
+                        if time_index is None:
+                            if date not in skipped_dates:
+                                skipped_dates.append(date)
+                            continue
+
+                        frames.setdefault(pressure_level, {}).setdefault(time_index, (year, month, day, hour, date))
+                        if not products:
+                            continue
+
+                        key = None
+                        if draws_field:
+                            key = field_key(data["file_name"], variable_type, time_index, area_covered)
+                        units.append(WorkUnit(
+                            pressure_level, year, month, day, hour, date, time_index, products, key, unit_memory
+                        ))
+
+    animations = []
+    for map_type in unique(data["map_types"]):
+        if map_type not in ANIMATION_MAP_TYPES:
+            continue
+        for pressure_level, steps in frames.items():
+            ordered = [steps[time_index] for time_index in sorted(steps)]
+            for map_level in unique(data["map_levels"]):
+                animations.append(AnimationTask(
+                    pressure_level, map_level, tuple(step[:4] for step in ordered),
+                    f"{ordered[0][4]}..{ordered[-1][4]}", ((map_type, map_level),),
+                    estimate_memory(((map_type, map_level),), cells, len(ordered))
+                ))
+
+    # An animation is requested once per pressure level, not once per time step
+    animation_types = sum(1 for map_type in data["map_types"] if map_type in ANIMATION_MAP_TYPES)
+    requested_maps = (requested_steps * (len(data["map_types"]) - animation_types)
+                      + len(unique(data["pressure_level"])) * animation_types) * len(data["map_levels"])
+    return TaskPlan(units, animations, skipped_dates, requested_maps, len(units) * len(products) + len(animations))
@@ -4,14 +4,25 @@ import os
 import json
 import asyncio
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait, FIRST_COMPLETED
 import time
 import os
 os.environ.setdefault('CARTOPY_USER_BACKGROUNDS', '/root/.local/share/cartopy')
 
 sys.path.append('/app/')
 
-from visualization.mapGeneration.generate_maps import generate_map_parallel
+from visualization.mapGeneration.generate_maps import (
+    generate_time_step_maps, generate_animation_maps, resolve_variable_type, prepare_field, prepare_csv_stores,
+    obtain_csv_files
+)
+from visualization.mapGeneration.shared_fields import SharedFieldStore
+from visualization.mapGeneration.figure_export import parse_file_formats, ANIMATION_FORMATS, DEFAULT_ANIMATION_FORMAT
+from visualization.handler.render_pool import get_render_pool
+from visualization.handler.task_planner import plan_map_tasks, CSV_MAP_TYPES
+from visualization.handler.artifact_uploader import ArtifactUploader
+from visualization.handler.render_cache import (
+    RenderCache, RENDER_CACHE_ENABLED, request_sources, plan_render_keys, skip_cached
+)
 from utils.rabbitMQ.rabbitmq import RabbitMQ
 from utils.rabbitMQ.process_body import process_body
 from utils.rabbitMQ.create_message import create_message
@@ -23,6 +34,48 @@ from utils.consts.consts import STATUS_OK, STATUS_ERROR
 # Directory for map output
 OUT_DIR = "./out"
 
+
+def release_finished(in_flight: dict, shared_fields: SharedFieldStore):
+    """Release the shared fields of the tasks that have already finished."""
+    for future in [future for future in in_flight if future.done()]:
+        shared_fields.release(in_flight.pop(future))
+
+
+def request_csv_files(request_hash: str) -> list:
+    """CSVs written by the engine for this request (points and formations), if any."""
+    csv_files = []
+    for file_type in ("selected", "formations"):
+        try:
+            csv_files.append(obtain_csv_files(request_hash, file_type))
+        except FileNotFoundError:
+            pass
+    return csv_files
+
+
+def render_cache_entries(results: list, render_keys: dict, uploader: ArtifactUploader) -> list:
+    """(key, objects, bytes, inputs) of every product rendered and uploaded without errors."""
+    failed = set(uploader.failed)
+    entries = []
+    for result in results:
+        for map_type, map_level, files in result.get("products", []):
+            product = (result["pressure_level"], result["date"], map_type, map_level)
+            if product not in render_keys or not files or failed.intersection(files):
+                continue
+            key, inputs = render_keys[product]
+            objects = [uploader.relative_name(local_path) for local_path in files]
+            entries.append((key, objects, sum(os.path.getsize(local_path) for local_path in files), inputs))
+    return entries
+
+
+def summarize_cache(results: list, cache_name: str) -> dict:
+    """Add up the cache hits/misses reported by every work unit."""
+    total = {"hits": 0, "misses": 0}
+    for result in results:
+        for name, value in result.get(cache_name, {}).items():
+            total[name] += value
+    return total
+
+
 async def handle_message(body, rabbitmq_client):
     """Process the message received by the general handler, and launch the map generation."""
     data = process_body(body)
@@ -33,72 +86,155 @@ async def handle_message(body, rabbitmq_client):
     # Create output directory if it doesn't exist
     os.makedirs(f"{OUT_DIR}/{data['request_hash']}", exist_ok=True)
     
-    # Prepare arguments for parallel processing
-    map_tasks = []
-    for pressure_level in data["pressure_level"]:
-        for year in data["years"]:
-            for month in data["months"]:
-                for day in data["days"]:
-                    for hour in data["hours"]:
-                        for map_type in data["map_types"]:
-                            for map_level in data["map_levels"]:
-                                map_tasks.append((
-                                    data["file_name"],
-                                    data["request_hash"],
-                                    data["variable_name"],
-                                    pressure_level,
-                                    year,
-                                    month,
-                                    day,
-                                    hour,
-                                    map_type,
-                                    map_level,
-                                    data["file_format"],
-                                    data["area_covered"]
-                                ))
+    variable_type = resolve_variable_type(data["variable_name"])
+    area_covered = [float(area) for area in data["area_covered"]]
+    # Every figure is built once and written in each of these formats
+    file_formats = parse_file_formats(data.get("file_format"))
+    
+    # One work unit per pressure level and time step, dates missing from the file dropped up front
+    plan = plan_map_tasks(data, variable_type, area_covered)
+    for date in plan.skipped_dates:
+        print(f"Error: la fecha {date} no se encuentra en el archivo netCDF")
     
-    # Use ProcessPoolExecutor for true parallel processing
+    # Convert the engine's CSVs to their columnar, time-indexed form once, before any worker reads them
+    if any(map_type in CSV_MAP_TYPES for map_type in data["map_types"]):
+        prepare_csv_stores(data["request_hash"])
+    
+    # Long-lived, pre-warmed worker pool shared by every request
+    render_pool = get_render_pool()
     start_time = time.time()
     results = []
     
-    # Determine optimal number of processes
-    num_cpus = min(os.cpu_count() or 2, 8)  # Use up to 8 processes
-    
-    cont = 0
+    # Products already rendered from identical inputs are copied server-side instead of rendered again
+    render_cache = RenderCache() if RENDER_CACHE_ENABLED else None
+    render_keys, cached = {}, {}
+    rendered_plan = plan
+    if render_cache is not None:
+        try:
+            animation_formats = parse_file_formats(data.get("file_format"), ANIMATION_FORMATS, DEFAULT_ANIMATION_FORMAT)
+            sources = request_sources(data, request_csv_files(data["request_hash"]))
+            render_keys = plan_render_keys(plan, data, sources, file_formats, animation_formats, CSV_MAP_TYPES)
+            cached = render_cache.fetch_many({product: key for product, (key, _) in render_keys.items()},
+                                             data["request_hash"])
+            rendered_plan = skip_cached(plan, cached)
+        except Exception as e:
+            print(f"Warning: render cache not available, rendering every map: {str(e)}")
+            render_keys, cached = {}, {}
     
-    print(f"Starting map generation with {num_cpus} processes for {len(map_tasks)} maps...")
+    print(f"Starting map generation with {render_pool.workers} processes for {rendered_plan.planned_maps} maps "
+          f"in {len(rendered_plan.units)} time steps ({plan.requested_maps} requested, {len(cached)} cached), "
+          f"formats {', '.join(file_formats)}...")
     try:
-        # Use process pool for true parallelism
-        with ProcessPoolExecutor(max_workers=num_cpus) as executor:
-            # Submit all tasks
-            futures = [executor.submit(generate_map_parallel, task) for task in map_tasks]
+        with SharedFieldStore() as shared_fields, ArtifactUploader(data["request_hash"], root=f"{OUT_DIR}/{data['request_hash']}") as uploader:
+            futures = []
+            in_flight = {}
+            
+            # Submit one task per time step. Each field is decoded once here and handed to
+            # the workers through shared memory; only in-flight fields stay published.
+            # Submissions wait while the estimated memory of the tasks in flight fills the budget.
+            for unit in rendered_plan.units:
+                descriptor = None
+                if unit.key is not None:
+                    release_finished(in_flight, shared_fields)
+                    while unit.key not in shared_fields and shared_fields.is_full() and in_flight:
+                        wait(list(in_flight), return_when=FIRST_COMPLETED)
+                        release_finished(in_flight, shared_fields)
+                    
+                    descriptor = shared_fields.acquire(
+                        unit.key,
+                        lambda: prepare_field(data["file_name"], variable_type, unit.time_index, area_covered)
+                    )
+                
+                future = render_pool.submit(generate_time_step_maps, (
+                    data["file_name"],
+                    data["request_hash"],
+                    data["variable_name"],
+                    unit.pressure_level,
+                    unit.year,
+                    unit.month,
+                    unit.day,
+                    unit.hour,
+                    unit.products,
+                    file_formats,
+                    data["area_covered"],
+                    data.get("label_mode"),
+                    descriptor
+                ), memory=unit.memory)
+                futures.append((future, unit))
+                if descriptor is not None:
+                    in_flight[future] = unit.key
             
-            # Process results as they complete
-            for future in futures:
+            # Animations span every time step of a pressure level; their frames are streamed to the encoder
+            for animation in rendered_plan.animations:
+                (map_type, map_level), = animation.products
+                future = render_pool.submit(generate_animation_maps, (
+                    data["file_name"],
+                    data["request_hash"],
+                    data["variable_name"],
+                    animation.pressure_level,
+                    map_type,
+                    map_level,
+                    animation.frames,
+                    data.get("file_format"),
+                    data["area_covered"]
+                ), memory=animation.memory)
+                futures.append((future, animation))
+            
+            # Process results as they complete, uploading each unit's maps while the rest render
+            for future, unit in futures:
                 try:
-                    cont += 1
                     result = future.result()
+                    uploader.add(result["files"])
                     results.append(result)
                 except Exception as e:
                     print(f"Error in map generation task: {e}")
-                    results.append(False)
+                    results.append({"date": unit.date, "maps": 0, "failed": len(unit.products)})
             
             await notify_update(rabbitmq_client, 2, "MAPS: Mapa generado con éxito.")
+        
+        upload = uploader.stats()
+        
+        # Store the new products in the render cache and evict the least recently used ones
+        if render_cache is not None:
+            render_cache.store_many(render_cache_entries(results, render_keys, uploader), data["request_hash"])
+        render_stats = render_cache.stats() if render_cache is not None else None
+        
+        # Recycle the workers between requests if any of them grew too much
+        render_pool.finish_request()
                     
         end_time = time.time()
         duration = end_time - start_time
-        maps_per_second = len(map_tasks) / duration if duration > 0 else 0
+        generated = sum(result["maps"] for result in results)
+        failed = sum(result["failed"] for result in results)
+        maps_per_second = generated / duration if duration > 0 else 0
+        field_cache = summarize_cache(results, "field_cache")
         
         print(f"Map generation completed in {duration:.2f} seconds ({maps_per_second:.2f} maps/sec)")
+        print(f"Field cache (this request): {field_cache}, basemap cache: {summarize_cache(results, 'basemap_cache')}, "
+              f"contour cache: {summarize_cache(results, 'contour_cache')}")
+        print(f"Render pool: {render_pool.stats()}")
+        print(f"Upload: {upload['objects']} objects, {upload['bytes'] / 1024 / 1024:.2f} MB in {upload['seconds']:.2f} seconds")
+        if render_stats is not None:
+            print(f"Render cache: {render_stats}")
         
         # Check if all maps were generated successfully
-        if all(results) and results:
+        if (results or cached) and failed == 0 and upload["failed"] == 0:
             print("\n✅ Generación de mapas completada exitosamente.")
             message = {
                 "request_type": NOTIFY_VISUALIZATION,
                 "exec_status": STATUS_OK, 
-                "exec_message": f"Map generation completed successfully. Generated {len(results)} maps in {duration:.2f} seconds."
+                "exec_message": f"Map generation completed successfully. Generated {generated} maps for {len(plan.units)} time steps "
+                                f"and {len(plan.animations)} animations "
+                                f"as {', '.join(file_formats)} in {duration:.2f} seconds (render pool startup {render_pool.startup_seconds:.2f} seconds, "
+                                f"paid once at service start). Field cache: {field_cache['hits']} hits, {field_cache['misses']} misses. "
+                                f"Skipped {len(plan.skipped_dates)} dates not found in the file. "
+                                f"Uploaded {upload['objects']} objects ({upload['bytes'] / 1024 / 1024:.2f} MB) "
+                                f"in {upload['seconds']:.2f} seconds."
             }
+            if render_stats is not None:
+                message["exec_message"] += (f" Render cache: {render_stats['hits']} hits, {render_stats['misses']} misses "
+                                            f"({render_stats['hit_rate']:.0%} hit rate), {len(cached)} maps copied "
+                                            f"instead of rendered, {render_stats['evictions']} entries evicted.")
             await rabbitmq_client.publish(
                 NOTIFICATIONS_EXCHANGE,
                 NOTIFY_HANDLER_KEY,
@@ -110,7 +246,12 @@ async def handle_message(body, rabbitmq_client):
             )     
             return True
         else:
-            error_msg = f"Failed to generate {results.count(False)} of {len(results)} maps"
+            if upload["failed"]:
+                error_msg = f"Failed to upload {upload['failed']} of {upload['failed'] + upload['objects']} maps"
+            elif results:
+                error_msg = f"Failed to generate {failed} of {generated + failed} maps"
+            else:
+                error_msg = f"No maps to generate: none of the requested dates are in the file ({len(plan.skipped_dates)} skipped)"
             print(f"Error: {error_msg}")
             message = { "request_type": NOTIFY_VISUALIZATION, "exec_status": STATUS_ERROR, "exec_message": error_msg}
             await rabbitmq_client.publish(
@@ -145,6 +286,9 @@ if __name__ == "__main__":
     mp.set_start_method('spawn', force=True)
     
     async def main():
+        # Spawn and warm the rendering workers before taking any request
+        get_render_pool()
+        
         # Initialize the RabbitMQ connection
         rabbitmq_client = RabbitMQ()
         await rabbitmq_client.initialize()
@@ -0,0 +1,92 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+# Frames per second of the animations and resolution of their frames
+ANIMATION_FPS = float(os.getenv("ANIMATION_FPS", 2))
+ANIMATION_DPI = int(os.getenv("ANIMATION_DPI", 100))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+# ffmpeg output options per container. GIF builds a palette per frame, so
+# nothing has to be buffered; MP4 needs even dimensions (frames are cropped to them).
+OUTPUT_OPTIONS = {
+    "gif": ["-vf", "split[a][b];[a]palettegen=stats_mode=single[p];[b][p]paletteuse=new=1", "-loop", "0"],
+    "mp4": ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+    "webp": ["-c:v", "libwebp_anim", "-quality", "80", "-loop", "0"],
+}
+
+
+def frame_box(fig, bbox) -> tuple:
+    """Rows and columns (top, bottom, left, right) of ``bbox`` (inches) in the figure's RGBA buffer.
+
+    The box is clipped to the canvas and shrunk to even dimensions, as video encoders require.
+    """
+    width, height = fig.canvas.get_width_height()
+    x0, y0, x1, y1 = (np.array(bbox.extents) * fig.dpi).round().astype(int)
+    left, right = max(x0, 0), min(x1, width)
+    top, bottom = max(height - y1, 0), min(height - y0, height)
+    right -= (right - left) % 2
+    bottom -= (bottom - top) % 2
+    return top, bottom, left, right
+
+
+class FrameEncoder:
+    """Stream raw RGBA frames into a single ffmpeg process writing every output.
+
+    Frames go through the process' stdin as they are rendered, so neither the
+    frames nor intermediate files are kept: memory does not depend on the
+    number of frames.
+    """
+
+    def __init__(self, outputs: dict, width: int, height: int, fps: float = ANIMATION_FPS):
+        """
+        Args:
+            outputs (dict): {format: path} of the files to write ("gif", "mp4", "webp").
+            width, height (int): Frame size in pixels.
+            fps (float): Frames per second.
+        """
+        if shutil.which(FFMPEG_BIN) is None:
+            raise RuntimeError(f"ffmpeg not found ({FFMPEG_BIN}), animations can't be encoded")
+
+        command = [
+            FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        ]
+        for file_format, path in outputs.items():
+            command += OUTPUT_OPTIONS[file_format] + [path]
+
+        self.outputs = outputs
+        self.frames = 0
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                         stderr=self._stderr)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._process.kill()
+            self._process.wait()
+            self._stderr.close()
+            return
+        self.close()
+
+    def write(self, frame: np.ndarray):
+        """Send one (height, width, 4) uint8 frame to the encoder."""
+        self._process.stdin.write(np.ascontiguousarray(frame).tobytes())
+        self.frames += 1
+
+    def close(self) -> list:
+        """Finish encoding and return the files written."""
+        self._process.stdin.close()
+        returncode = self._process.wait()
+        self._stderr.seek(0)
+        errors = self._stderr.read().decode(errors="replace").strip()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {errors}")
+        return list(self.outputs.values())
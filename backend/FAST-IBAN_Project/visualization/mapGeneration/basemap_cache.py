@@ -0,0 +1,128 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import shapely
+import cartopy.feature as cfeature
+from matplotlib.path import Path
+from matplotlib.collections import PathCollection
+
+try:
+    from cartopy.mpl.path import shapely_to_path
+except ImportError:
+    # Cartopy < 0.23 (the image's pin) only has geos_to_path, one path per part of the geometry
+    from cartopy.mpl.patch import geos_to_path
+
+    def shapely_to_path(geometry) -> Path:
+        paths = geos_to_path(geometry)
+        return Path.make_compound_path(*paths) if paths else Path(np.empty((0, 2)))
+
+# Maximum number of (area, figure, projection) backgrounds kept per process
+BASEMAP_CACHE_SIZE = int(os.getenv("BASEMAP_CACHE_SIZE", 16))
+
+# Degrees kept around the visible extent when clipping, so strokes reach the frame
+CLIP_MARGIN = 1.0
+
+# Cartographic layers drawn under the data: (feature, drawing style)
+BASEMAP_LAYERS = (
+    (cfeature.COASTLINE, dict(edgecolor='black', facecolor='none')),
+    (cfeature.BORDERS, dict(edgecolor='black', facecolor='none', linestyle=':')),
+)
+
+# Projected, pre-clipped paths of every layer, in BASEMAP_LAYERS order
+Basemap = namedtuple("Basemap", ["extent", "layers"])
+
+
+def clipped_paths(feature, extent: tuple, projection) -> list:
+    """Clip a Natural Earth feature to ``extent`` and project it as matplotlib paths.
+
+    Args:
+        feature (cartopy.feature.Feature): Feature to clip.
+        extent (tuple): (lon_min, lon_max, lat_min, lat_max) in the feature's CRS.
+        projection (cartopy.crs.Projection): Projection of the target axes.
+
+    Returns:
+        list: One matplotlib Path per clipped geometry.
+    """
+    x0, x1, y0, y1 = extent
+    clip_box = shapely.box(x0 - CLIP_MARGIN, y0 - CLIP_MARGIN, x1 + CLIP_MARGIN, y1 + CLIP_MARGIN)
+
+    paths = []
+    for geom in feature.intersecting_geometries(extent):
+        clipped = geom.intersection(clip_box)
+        if clipped.is_empty:
+            continue
+        if projection != feature.crs:
+            clipped = projection.project_geometry(clipped, feature.crs)
+        paths.append(shapely_to_path(clipped))
+    return paths
+
+
+class BasemapCache:
+    """LRU cache of the coastline/border layers of a map background.
+
+    Entries are keyed by (area_covered, figsize, dpi, projection) and hold the
+    feature geometries already clipped to the visible area and projected, so
+    the maps of the same area only pay for the cartography once per process.
+    """
+
+    def __init__(self, max_entries: int = BASEMAP_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ax, area_covered, figsize, dpi) -> Basemap:
+        """Return the background for ``ax``, building it from the axes extent on a miss.
+
+        Args:
+            ax (GeoAxes): Axes with its final limits already set.
+            area_covered (list): [lat_max, lon_min, lat_min, lon_max] of the map.
+            figsize (tuple): Figure size in inches.
+            dpi (int): Figure resolution.
+
+        Returns:
+            Basemap: Extent and projected paths of every layer.
+        """
+        key = (tuple(float(area) for area in area_covered), tuple(figsize), dpi, ax.projection)
+
+        with self._lock:
+            basemap = self._entries.get(key)
+            if basemap is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return basemap
+            self.misses += 1
+
+        extent = ax.get_extent(BASEMAP_LAYERS[0][0].crs)
+        basemap = Basemap(extent, tuple(
+            clipped_paths(feature, extent, ax.projection) for feature, _ in BASEMAP_LAYERS
+        ))
+
+        with self._lock:
+            self._entries[key] = basemap
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return basemap
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def add_basemap(ax, basemap: Basemap):
+    """Draw the cached coastline/border layers on ``ax``.
+
+    Each layer is a single PathCollection with the same style and z-order
+    cartopy uses for its feature artists.
+    """
+    for paths, (_, style) in zip(basemap.layers, BASEMAP_LAYERS):
+        collection = PathCollection(paths, transform=ax.transData, zorder=1.5, **style)
+        collection.set_clip_path(ax.patch)
+        ax.add_collection(collection, autolim=False)
+
+
+BASEMAP_CACHE = BasemapCache()
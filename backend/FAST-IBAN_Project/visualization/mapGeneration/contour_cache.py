@@ -0,0 +1,218 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import numpy.ma as ma
+import contourpy
+import matplotlib as mpl
+from matplotlib.artist import Artist
+from matplotlib.contour import ContourSet
+from matplotlib.path import Path
+
+# Memory budget for contour lines kept per process
+CONTOUR_CACHE_MAX_MB = float(os.getenv("CONTOUR_CACHE_MAX_MB", 128))
+
+# Lines of every level, in lon/lat: vertices[i] and codes[i] hold all the lines of levels[i]
+ContourGeometry = namedtuple("ContourGeometry", ["levels", "vertices", "codes"])
+
+
+def geometry_nbytes(geometry: ContourGeometry) -> int:
+    return geometry.levels.nbytes + sum(v.nbytes + c.nbytes for v, c in zip(geometry.vertices, geometry.codes))
+
+
+def contour_levels(variable, step: float):
+    """Contour levels every ``step`` over the range of the field, as the maps draw them.
+
+    Returns:
+        np.ndarray | None: Levels, or None when the field has no finite values.
+    """
+    vmin = np.nanmin(variable)
+    vmax = np.nanmax(variable)
+    if not np.isfinite(vmin) or not np.isfinite(vmax):
+        return None
+
+    levels = np.arange(np.ceil(vmin/10)*10, vmax, step)
+    if len(levels) < 2:
+        # Fallback if range is too small
+        levels = np.linspace(vmin, vmax, 5)
+    return levels
+
+
+def compute_contours(lon: np.ndarray, lat: np.ndarray, variable: np.ndarray, step: float, levels=None):
+    """Run marching squares once for every level of a field.
+
+    Uses the same contourpy generator (algorithm, corner masking and line
+    type) as ``Axes.contour``, so drawing the result gives the same lines.
+
+    Args:
+        lon, lat (np.ndarray): 1-D coordinates of the grid.
+        variable (np.ndarray): Field on the (lat, lon) grid; NaNs are masked.
+        step (float): Distance between levels.
+        levels (array-like, optional): Fixed levels to use instead of the
+            ones derived from the field's range (e.g. shared by animation frames).
+
+    Returns:
+        ContourGeometry | None: Lines per level, or None when the field has no finite values.
+    """
+    z = ma.masked_invalid(ma.asarray(variable, dtype=np.float64), copy=False)
+    if levels is None:
+        levels = contour_levels(z, step)
+        if levels is None:
+            return None
+    else:
+        levels = np.array(levels, dtype=np.float64)
+
+    x, y = np.meshgrid(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    generator = contourpy.contour_generator(
+        x, y, z, name=mpl.rcParams["contour.algorithm"], corner_mask=mpl.rcParams["contour.corner_mask"],
+        line_type=contourpy.LineType.SeparateCode
+    )
+
+    vertices, codes = [], []
+    for level in levels:
+        level_vertices, level_codes = generator.create_contour(level)
+        if len(level_vertices):
+            vertices.append(np.concatenate(level_vertices))
+            codes.append(np.concatenate(level_codes))
+        else:
+            vertices.append(np.empty((0, 2)))
+            codes.append(np.empty(0, dtype=Path.code_type))
+
+    for array in [levels, *vertices, *codes]:
+        array.setflags(write=False)
+    return ContourGeometry(levels, vertices, codes)
+
+
+def contour_lines(geometry: ContourGeometry):
+    """Yield (level, (N, 2) lon/lat array) for every line, e.g. for vector exports.
+
+    Closed lines repeat their first point at the end.
+    """
+    for level, vertices, codes in zip(geometry.levels, geometry.vertices, geometry.codes):
+        starts = np.flatnonzero(codes == Path.MOVETO)
+        for start, end in zip(starts, np.append(starts[1:], len(codes))):
+            yield float(level), vertices[start:end]
+
+
+def contour_artists(contour_set: ContourSet) -> list:
+    """Artists that draw the lines of a contour set.
+
+    From matplotlib 3.8 the set is itself a Collection; before (3.7, the
+    image's pin) it draws through one LineCollection per level.
+    """
+    if isinstance(contour_set, Artist):
+        return [contour_set]
+    return list(contour_set.collections)
+
+
+def draw_contours(ax, geometry: ContourGeometry, transform=None, animated: bool = False, **kwargs) -> ContourSet:
+    """Draw cached contour lines; takes the styling keywords of ``ax.contour``.
+
+    The lines are projected to the axes' coordinates before the set is
+    built, as cartopy's GeoContourSet does before labelling them, and handed
+    over one path per line, as ``Axes.contour`` does on matplotlib 3.7 (its
+    inline labels cut one line per path), so the result is the same on every
+    matplotlib version.
+
+    Args:
+        ax (GeoAxes): Axes to draw on.
+        geometry (ContourGeometry): Lines in lon/lat.
+        transform (cartopy.crs.CRS, optional): CRS of the lines. Defaults to the axes' projection.
+        animated (bool): Leave the lines out of ``fig.canvas.draw``, to blit them frame by frame.
+
+    Returns:
+        ContourSet: The set, with ``levels`` and colormap for colorbars and ``clabel``.
+    """
+    vertices = geometry.vertices
+    if transform is not None and transform != ax.projection:
+        vertices = [ax.projection.transform_points(transform, v[:, 0], v[:, 1])[:, :2] if len(v) else v
+                    for v in vertices]
+
+    allsegs, allkinds = [], []
+    for level_vertices, level_codes in zip(vertices, geometry.codes):
+        # A level without lines has no paths at all (not an empty one)
+        starts = np.flatnonzero(level_codes == Path.MOVETO)
+        allsegs.append(np.split(level_vertices, starts[1:]) if len(starts) else [])
+        allkinds.append(np.split(level_codes, starts[1:]) if len(starts) else [])
+    contour_set = ContourSet(ax, geometry.levels, allsegs, allkinds, transform=ax.transData, **kwargs)
+    # Not a keyword of ContourSet before matplotlib 3.8: set on the artists that draw the lines
+    for artist in contour_artists(contour_set):
+        artist.set_animated(animated)
+    return contour_set
+
+
+class ContourCache:
+    """Bounded LRU cache of contour lines, keyed by (field key, level step).
+
+    The contour, combined and formations maps of one time step share the
+    field and the step, so the lines are computed once per time step.
+    """
+
+    def __init__(self, max_bytes: int = int(CONTOUR_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the lines cached for ``key``, calling ``compute()`` on a miss.
+
+        Args:
+            key (tuple): Cache key.
+            compute (callable): Builds the ContourGeometry, or returns None
+                when there is nothing to cache.
+
+        Returns:
+            ContourGeometry | None: Cached or freshly computed lines.
+        """
+        with self._lock:
+            geometry = self._entries.get(key)
+            if geometry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return geometry
+            self.misses += 1
+
+        geometry = compute()
+        if geometry is None:
+            return None
+
+        size = geometry_nbytes(geometry)
+        if size > self.max_bytes:
+            return geometry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= geometry_nbytes(previous)
+            self._entries[key] = geometry
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= geometry_nbytes(evicted)
+                self.evictions += 1
+        return geometry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+CONTOUR_CACHE = ContourCache()
@@ -0,0 +1,161 @@
+import os
+import json
+import shutil
+import threading
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Suffix of the folder holding the columnar copy of a CSV
+STORE_SUFFIX = ".cols"
+META_FILE = "meta.json"
+TIMES_FILE = "_times.npy"
+OFFSETS_FILE = "_offsets.npy"
+
+
+def source_identity(csv_path: str) -> list:
+    """Size and modification time of the CSV the store was built from."""
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def store_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+
+def is_current(csv_path: str) -> bool:
+    """Whether the columnar copy of ``csv_path`` exists and matches the CSV."""
+    try:
+        with open(os.path.join(store_path(csv_path), META_FILE)) as f:
+            return json.load(f)["source"] == source_identity(csv_path)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def convert_csv(csv_path: str) -> str:
+    """Convert one of the engine's CSVs into one ``.npy`` file per column.
+
+    Rows are (stably) sorted by ``time`` and a time -> row range index is
+    stored next to the columns, so a time step is a contiguous slice. String
+    columns are stored as integer codes plus their categories, missing values
+    as code -1 so they read back as NaN.
+
+    Args:
+        csv_path (str): Path to the CSV file.
+
+    Returns:
+        str: Folder with the columnar copy.
+    """
+    target = store_path(csv_path)
+    source = source_identity(csv_path)
+
+    data = pd.read_csv(csv_path)
+    if not data["time"].is_monotonic_increasing:
+        data = data.sort_values("time", kind="stable")
+
+    # Build in a temporary folder and move it in place, so readers never see half a store
+    tmp = tempfile.mkdtemp(prefix=os.path.basename(target) + ".", dir=os.path.dirname(target))
+    try:
+        columns = {}
+        for name in data.columns:
+            values = data[name]
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                codes, categories = pd.factorize(values)
+                np.save(os.path.join(tmp, f"{name}.npy"), codes.astype(np.int32))
+                np.save(os.path.join(tmp, f"{name}.categories.npy"), categories.to_numpy().astype(str))
+                columns[name] = "categorical"
+            else:
+                np.save(os.path.join(tmp, f"{name}.npy"), values.to_numpy())
+                columns[name] = str(values.dtype)
+
+        times, starts = np.unique(data["time"].to_numpy(), return_index=True)
+        np.save(os.path.join(tmp, TIMES_FILE), times)
+        np.save(os.path.join(tmp, OFFSETS_FILE), np.append(starts, len(data)))
+
+        with open(os.path.join(tmp, META_FILE), "w") as f:
+            json.dump({"source": source, "columns": columns, "rows": len(data)}, f)
+
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        # Another process may have built the same store meanwhile
+        if not is_current(csv_path):
+            raise
+
+    return target
+
+
+class CsvStore:
+    """Memory-mapped columnar copy of a CSV, sliced by time step."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.source = meta["source"]
+        self.columns = meta["columns"]
+        self.times = np.load(os.path.join(path, TIMES_FILE))
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE))
+        self._arrays = {}
+        self._categories = {}
+
+    def column(self, name: str) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+            self._arrays[name] = array
+            if self.columns[name] == "categorical":
+                self._categories[name] = np.load(os.path.join(self.path, f"{name}.categories.npy"))
+        return array
+
+    def row_range(self, time_index: int) -> tuple:
+        """Rows [start, end) of ``time_index`` (empty when the time is not present)."""
+        i = np.searchsorted(self.times, time_index)
+        if i == len(self.times) or self.times[i] != time_index:
+            return 0, 0
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def time_slice(self, time_index: int, columns=None) -> pd.DataFrame:
+        """Rows of one time step as a DataFrame with the CSV's columns.
+
+        Args:
+            time_index (int): Value of the ``time`` column.
+            columns (list, optional): Columns to read. Defaults to every column.
+
+        Returns:
+            pd.DataFrame: The rows of that time step.
+        """
+        start, end = self.row_range(time_index)
+        data = {}
+        for name in columns or self.columns:
+            values = np.array(self.column(name)[start:end])
+            if self.columns[name] == "categorical":
+                codes, values = values, np.full(len(values), np.nan, dtype=object)
+                present = codes >= 0
+                values[present] = self._categories[name][codes[present]]
+            data[name] = values
+        return pd.DataFrame(data)
+
+
+_STORES = {}
+_LOCK = threading.Lock()
+
+
+def open_csv_store(csv_path: str) -> CsvStore:
+    """Return the store of ``csv_path``, converting the CSV if it changed or was never converted."""
+    source = source_identity(csv_path)
+    with _LOCK:
+        store = _STORES.get(csv_path)
+        if store is not None and store.source == source:
+            return store
+
+    if not is_current(csv_path):
+        convert_csv(csv_path)
+
+    store = CsvStore(store_path(csv_path))
+    with _LOCK:
+        _STORES[csv_path] = store
+    return store
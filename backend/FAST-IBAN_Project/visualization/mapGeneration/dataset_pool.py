@@ -0,0 +1,125 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import xarray as xr
+
+# Maximum number of idle NetCDF handles kept open per process
+DATASET_POOL_SIZE = int(os.getenv("DATASET_POOL_SIZE", 8))
+
+
+def file_identity(file_name: str) -> tuple:
+    """Identify a file on disk by its path, size and modification time.
+
+    Args:
+        file_name (str): Path to the file.
+
+    Returns:
+        tuple: (absolute path, size in bytes, mtime in ns).
+    """
+    stat = os.stat(file_name)
+    return os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns
+
+
+class DatasetHandle:
+    """Open NetCDF dataset plus the coordinate arrays every reader needs.
+
+    The dataset is opened lazily (``cache=False``) so that indexing a variable
+    and calling ``.values`` only reads the requested hyperslab from disk.
+    """
+
+    def __init__(self, file_name: str, identity: tuple):
+        self.file_name = file_name
+        self.identity = identity
+        self.dataset = xr.open_dataset(file_name, cache=False)
+        self.latitude = self.dataset.latitude.values
+        self.longitude = self.dataset.longitude.values
+        self.times = self.dataset.time.values
+        # Memo for values derived from the coordinates (time lookups, area windows)
+        self.derived = {}
+        self.refs = 0
+        self.stale = False
+
+    def close(self):
+        self.dataset.close()
+
+
+class DatasetPool:
+    """Process-wide pool of open NetCDF handles.
+
+    Handles are reference counted: ``acquire`` hands out a shared handle and
+    readers never close it themselves. Idle handles are closed in LRU order
+    once more than ``max_open`` files are open, and a handle whose file has
+    changed on disk (e.g. rewritten by ``adapt_netcdf``) is replaced.
+    """
+
+    def __init__(self, max_open: int = DATASET_POOL_SIZE):
+        self.max_open = max_open
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, file_name: str):
+        """Borrow the pooled handle for ``file_name`` for the duration of the block.
+
+        Args:
+            file_name (str): Path to the NetCDF file.
+
+        Yields:
+            DatasetHandle: Shared open handle.
+        """
+        handle = self._checkout(file_name)
+        try:
+            yield handle
+        finally:
+            self._release(handle)
+
+    def close_all(self):
+        """Close every idle handle and mark the busy ones to be closed on release."""
+        with self._lock:
+            for key, handle in list(self._handles.items()):
+                self._drop(key, handle)
+
+    def _checkout(self, file_name: str) -> DatasetHandle:
+        identity = file_identity(file_name)
+        key = identity[0]
+
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None and handle.identity != identity:
+                self._drop(key, handle)
+                handle = None
+
+            if handle is None:
+                handle = DatasetHandle(file_name, identity)
+                self._handles[key] = handle
+
+            self._handles.move_to_end(key)
+            handle.refs += 1
+            self._evict_idle()
+
+        return handle
+
+    def _release(self, handle: DatasetHandle):
+        with self._lock:
+            handle.refs -= 1
+            if handle.stale and handle.refs == 0:
+                handle.close()
+            self._evict_idle()
+
+    def _drop(self, key: str, handle: DatasetHandle):
+        del self._handles[key]
+        handle.stale = True
+        if handle.refs == 0:
+            handle.close()
+
+    def _evict_idle(self):
+        while len(self._handles) > self.max_open:
+            idle = next((key for key, handle in self._handles.items() if handle.refs == 0), None)
+            if idle is None:
+                break
+            self._drop(idle, self._handles[idle])
+
+
+DATASET_POOL = DatasetPool()
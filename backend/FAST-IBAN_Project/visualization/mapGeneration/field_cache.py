@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+# Memory budget for decoded fields kept per process
+FIELD_CACHE_MAX_MB = float(os.getenv("FIELD_CACHE_MAX_MB", 512))
+
+PreparedField = namedtuple("PreparedField", ["lat", "lon", "variable"])
+
+
+def field_nbytes(field: PreparedField) -> int:
+    """Bytes held by the arrays of a prepared field."""
+    return sum(getattr(array, "nbytes", 0) for array in field)
+
+
+class FieldCache:
+    """Bounded LRU cache of decoded, unit-converted and cropped fields.
+
+    Entries are keyed by (file identity, variable, time index, area) and hold
+    the lat/lon/field arrays ready to plot, so every map type and contour level
+    of one time step shares a single decode. Arrays are stored read-only:
+    callers must copy before modifying them.
+    """
+
+    def __init__(self, max_bytes: int = int(FIELD_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """Return the cached field for ``key`` or None, updating the counters."""
+        with self._lock:
+            field = self._entries.get(key)
+            if field is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return field
+
+    def put(self, key, field: PreparedField):
+        """Store ``field`` under ``key``, evicting least recently used entries."""
+        for array in field:
+            if hasattr(array, "setflags"):
+                array.setflags(write=False)
+
+        size = field_nbytes(field)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= field_nbytes(previous)
+
+            self._entries[key] = field
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= field_nbytes(evicted)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Return the cached field for ``key``, calling ``loader()`` on a miss.
+
+        Args:
+            key (tuple): Cache key.
+            loader (callable): Builds the PreparedField, or returns None when
+                there is nothing to cache.
+
+        Returns:
+            PreparedField | None: Cached or freshly loaded field.
+        """
+        field = self.get(key)
+        if field is None:
+            field = loader()
+            if field is not None:
+                self.put(key, field)
+        return field
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+FIELD_CACHE = FieldCache()
@@ -0,0 +1,124 @@
+import io
+import os
+
+import numpy as np
+import matplotlib as mpl
+import matplotlib.image as mpimg
+from PIL import Image
+
+from utils.enums.DataFormat import DataFormat
+
+DEFAULT_FILE_FORMAT = DataFormat.PNG_FORMAT.value
+FILE_FORMATS = [data_format.value for data_format in DataFormat]
+# Containers of the animated product; WebP is both a still and an animated format
+ANIMATION_FORMATS = ["gif", "mp4", DataFormat.WEBP_FORMAT.value]
+DEFAULT_ANIMATION_FORMAT = "gif"
+# Formats encoded from the same Agg pixel buffer; the rest are vector backends
+RASTER_FORMATS = {
+    DataFormat.PNG_FORMAT.value,
+    DataFormat.JPG_FORMAT.value,
+    DataFormat.JPEG_FORMAT.value,
+    DataFormat.WEBP_FORMAT.value,
+}
+
+
+def parse_file_formats(file_format, allowed=FILE_FORMATS, default: str = DEFAULT_FILE_FORMAT) -> list:
+    """Normalize the ``fileFormat`` of a request into a list of formats.
+
+    Accepts a single format, a comma separated string ("png,svg") or a list.
+    Only the ``allowed`` formats are kept, in the requested order and without
+    duplicates; formats neither still nor animated are reported. Falls back
+    to ``default`` when nothing valid is left.
+
+    Args:
+        file_format (str | list | None): Format(s) requested.
+        allowed (list): Formats accepted (still images by default).
+        default (str): Format used when none of the requested ones is allowed.
+
+    Returns:
+        list: Lower case format names.
+    """
+    if file_format is None:
+        requested = []
+    elif isinstance(file_format, str):
+        requested = file_format.split(",")
+    else:
+        requested = list(file_format)
+
+    formats = []
+    for value in requested:
+        value = str(value).strip().lower().lstrip(".")
+        if not value:
+            continue
+        if value not in FILE_FORMATS and value not in ANIMATION_FORMATS:
+            print(f"Warning: formato de archivo '{value}' no válido, se ignora")
+        elif value in allowed and value not in formats:
+            formats.append(value)
+
+    return formats or [default]
+
+
+def unique_base_name(base_name: str, formats: list) -> str:
+    """First ``base_name`` / ``base_name(n)`` free for every format, so all copies share a name."""
+    cont = 0
+    while True:
+        candidate = base_name if cont == 0 else f"{base_name}({cont})"
+        if not any(os.path.exists(f"{candidate}.{file_format}") for file_format in formats):
+            return candidate
+        cont += 1
+
+
+def tight_bbox(fig, dpi: float):
+    """Bounding box (in inches) that ``savefig(bbox_inches='tight')`` would crop to."""
+    original_dpi = fig.dpi
+    fig.set_dpi(dpi)
+    try:
+        fig.draw_without_rendering()
+        return fig.get_tightbbox().padded(mpl.rcParams["savefig.pad_inches"])
+    finally:
+        fig.set_dpi(original_dpi)
+
+
+def save_figure(fig, base_name: str, formats: list, dpi: float = None, tight: bool = True) -> list:
+    """Serialize one figure to several formats without building it again.
+
+    The tight bounding box is computed once and shared by every format.
+    Raster formats (PNG, JPG/JPEG, WebP) are encoded from a single Agg
+    rendering; each vector format (SVG, PDF) needs its own backend pass.
+
+    Args:
+        fig (Figure): Figure to save.
+        base_name (str): Output path without extension.
+        formats (list): Formats to write, as returned by ``parse_file_formats``.
+        dpi (float, optional): Resolution. Defaults to the figure's dpi.
+        tight (bool): Crop to the tight bounding box, as ``bbox_inches='tight'``.
+
+    Returns:
+        list: Paths written, in the order of ``formats``.
+    """
+    dpi = dpi or fig.dpi
+    bbox = tight_bbox(fig, dpi) if tight else None
+
+    rgba = None
+    files = []
+    for file_format in formats:
+        path = f"{base_name}.{file_format}"
+        if file_format not in RASTER_FORMATS:
+            fig.savefig(path, dpi=dpi, bbox_inches=bbox, format=file_format)
+        else:
+            if rgba is None:
+                # Rasterize once; the PNG bytes are also the PNG output
+                buffer = io.BytesIO()
+                fig.savefig(buffer, dpi=dpi, bbox_inches=bbox, format=DataFormat.PNG_FORMAT.value)
+                png = buffer.getvalue()
+                rgba = np.asarray(Image.open(io.BytesIO(png)).convert("RGBA"))
+            if file_format == DataFormat.PNG_FORMAT.value:
+                with open(path, "wb") as f:
+                    f.write(png)
+            else:
+                # Same encoding savefig uses: JPEG is blended against white
+                with mpl.rc_context({"savefig.facecolor": "white"}):
+                    mpimg.imsave(path, rgba, format=file_format, dpi=dpi)
+        files.append(path)
+
+    return files
@@ -8,25 +8,34 @@ from mpl_toolkits.mplot3d import Axes3D
 import cartopy.crs as ccrs 
 import cartopy as cartopy
 import numpy as np
-import numpy.ma as ma
 import xarray as xr
 import pandas as pd
 import sys
+import time
 from collections import namedtuple
 from datetime import datetime, timedelta
 from scipy.spatial import ConvexHull
-import threading
-from multiprocessing import Manager, Pool
-from functools import lru_cache
-
-# Thread-local storage for NetCDF file access
-thread_local = threading.local()
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from utils.enums.DataType import DataType
-from utils.minio.upload_files import upload_files_to_request_hash
-from utils.consts.consts import VARIABLE_NAMES, STATUS_OK
+from utils.consts.consts import VARIABLE_NAMES, STATUS_OK, LABEL_MODES, LABEL_MODE_POINTS, LABEL_MODE_NONE, DEFAULT_LABEL_MODE
+from visualization.mapGeneration.dataset_pool import DATASET_POOL, file_identity
+from visualization.mapGeneration.field_cache import FIELD_CACHE, PreparedField
+from visualization.mapGeneration.shared_fields import attach_shared_field
+from visualization.mapGeneration.basemap_cache import BASEMAP_CACHE, add_basemap
+from visualization.mapGeneration.contour_cache import CONTOUR_CACHE, compute_contours, contour_levels, draw_contours, contour_artists
+from visualization.mapGeneration.csv_store import open_csv_store
+from visualization.mapGeneration.layers import add_text_layer, add_outline_layer, cull_overlapping, count_artists
+from visualization.mapGeneration.figure_export import (
+    parse_file_formats, unique_base_name, save_figure, ANIMATION_FORMATS, DEFAULT_ANIMATION_FORMAT
+)
+from visualization.mapGeneration.animation import FrameEncoder, frame_box, ANIMATION_DPI
+from visualization.mapGeneration.tiles import render_tile_pyramid
+from visualization.mapGeneration.lod import decimate_grid, decimate_points
+from visualization.mapGeneration.vector_export import (
+    GEOJSON_PRECISION, contour_features, point_features, hull_features, write_feature_collection
+)
 
 
 g_0 = 9.80665 # m/s^2
@@ -36,35 +45,226 @@ R = 6371 # km
 k_factor = 273.15 # K
 
 OUT_DIR = "./out" # Directory to save the generated maps
+MAP_FIGSIZE = (11, 5) # inches
+MAP_DPI = 250
+
+
+def date_from_nc(nc_file: str) -> np.ndarray:
+    """Extract dates from a NetCDF file.
 
-# Add LRU cache to avoid repeated file access
-@lru_cache(maxsize=16)
-def get_dataset(file_name: str):
-    """Get a cached xarray dataset to avoid repeated file opens.
-    
     Args:
-        file_name (str): Path to NetCDF file
-        
+        nc_file (str): Path to the NetCDF file.
+
     Returns:
-        xarray.Dataset: Opened dataset
+        np.ndarray: Array of date values.
     """
-    return xr.open_dataset(file_name)
+    with DATASET_POOL.acquire(nc_file) as handle:
+        return handle.times
 
 
-def date_from_nc(nc_file: str) -> np.ndarray:
-    """Extract dates from a NetCDF file.
+def resolve_time_index(nc_file: str, actual_date: str):
+    """Obtiene el índice temporal de una fecha dentro de un archivo netCDF.
+
+    Args:
+        nc_file (str): Ruta del archivo netCDF.
+        actual_date (str): Fecha con formato YYYY-MM-DD_HHUTC.
+
+    Returns:
+        int | None: Índice de la fecha o None si no está en el archivo.
+    """
+    with DATASET_POOL.acquire(nc_file) as handle:
+        lookup = handle.derived.get("time_lookup")
+        if lookup is None:
+            lookup = {}
+            for i, date in enumerate(handle.times):
+                lookup.setdefault(from_nc_to_date(str(date)), i)
+            handle.derived["time_lookup"] = lookup
+        return lookup.get(actual_date)
+
+
+def area_window(lat: np.ndarray, lon: np.ndarray, area_covered) -> tuple:
+    """Calcula la ventana lat/lon de un área sobre la malla nativa del archivo.
+
+    Las longitudes 0-360 se reordenan igual que en ``MapGenerator.adjust_lon``
+    (-180-180), y se devuelve además a qué índices nativos corresponden.
+
+    Args:
+        lat (np.ndarray): Latitudes del archivo.
+        lon (np.ndarray): Longitudes del archivo.
+        area_covered (list): Área con formato N W S E.
+
+    Returns:
+        tuple (lat_idx, native_lon_idx, lat, lon): Índices de latitud, índices
+        nativos de longitud y coordenadas recortadas.
+    """
+    lat_max, lon_min, lat_min, lon_max = area_covered
+
+    shift = 0
+    if np.max(lon) > 180:
+        shift = len(lon) // 2
+        lon = np.roll(np.where(lon >= 180, lon - 360, lon), shift)
+
+    lat_idx = np.nonzero((lat >= lat_min) & (lat <= lat_max))[0]
+    lon_idx = np.nonzero((lon >= lon_min) & (lon <= lon_max))[0]
+
+    return lat_idx, (lon_idx - shift) % len(lon), lat[lat_idx], lon[lon_idx]
+
+
+def contiguous_runs(indices: np.ndarray) -> list:
+    """Split sorted-by-position indices into contiguous slices.
+
+    Args:
+        indices (np.ndarray): Integer indices.
+
+    Returns:
+        list: List of slices covering the indices in order.
+    """
+    breaks = np.nonzero(np.diff(indices) != 1)[0] + 1
+    return [slice(int(run[0]), int(run[-1]) + 1) for run in np.split(indices, breaks)]
+
+
+def read_time_slice(nc_file: str, variable_type: str, time_index: int, area_covered):
+    """Read a single time step of a variable, cropped to the requested area.
+
+    Only the selected time step and the lat/lon window of ``area_covered`` are
+    read and decoded; the rest of the variable never leaves the disk.
 
     Args:
         nc_file (str): Path to the NetCDF file.
+        variable_type (str): Variable name inside the file (e.g. "z").
+        time_index (int): Time index to read.
+        area_covered (list): Area as N W S E.
 
     Returns:
-        np.ndarray: Array of date values.
+        tuple (lat, lon, variable) | None: Cropped coordinates and field with
+        longitudes in -180..180, or None if the area holds no grid points.
     """
-    # Use cached dataset
-    ds = get_dataset(nc_file)
-    
-    # Extract and return the dates
-    return ds.time.values
+    with DATASET_POOL.acquire(nc_file) as handle:
+        key = ("window", tuple(area_covered))
+        window = handle.derived.get(key)
+        if window is None:
+            window = area_window(handle.latitude, handle.longitude, area_covered)
+            handle.derived[key] = window
+        lat_idx, native_lon_idx, lat, lon = window
+
+        if len(lat_idx) == 0 or len(native_lon_idx) == 0:
+            return None
+
+        lat_slice = slice(int(lat_idx[0]), int(lat_idx[-1]) + 1)
+        variable = handle.dataset[variable_type]
+        variable = np.concatenate([
+            variable.isel(time=time_index, latitude=lat_slice, longitude=lon_run).values
+            for lon_run in contiguous_runs(native_lon_idx)
+        ], axis=-1)
+
+    return lat, lon, variable
+
+
+def convert_units(variable_type: str, variable: np.ndarray) -> np.ndarray:
+    """Convierte la variable a las unidades de representación (m o ºC).
+
+    Args:
+        variable_type (str): Nombre de la variable en el archivo ("z", "t"...).
+        variable (np.ndarray): Valores leídos del archivo.
+
+    Returns:
+        np.ndarray: Valores convertidos.
+    """
+    if variable_type == 'z':
+        # Convert geopotential height to meters
+        print("Converting geopotential height to meters...")
+        return variable / g_0
+    elif variable_type == 't':
+        # Convert temperature from Kelvin to Celsius
+        print("Converting temperature from Kelvin to Celsius...")
+        return variable - k_factor
+    return variable
+
+
+def resolve_variable_type(variable_name: str):
+    """Obtiene el nombre de la variable dentro del netCDF ("z", "t"...).
+
+    Args:
+        variable_name (str): Nombre de la variable solicitada (e.g. "geopotential").
+
+    Returns:
+        str | None: Nombre de la variable en el archivo o None si no es válida.
+    """
+    for key, value in VARIABLE_NAMES.items():
+        if variable_name.lower() == key.lower():
+            return value
+    return None
+
+
+def field_key(nc_file: str, variable_type: str, time_index: int, area_covered) -> tuple:
+    """Key identifying a prepared field in the field cache (and in shared memory)."""
+    return (file_identity(nc_file), variable_type, int(time_index), tuple(float(area) for area in area_covered))
+
+
+def prepare_field(nc_file: str, variable_type: str, time_index: int, area_covered):
+    """Read, convert and crop one time step of a variable, bypassing the cache.
+
+    Args:
+        nc_file (str): Path to the NetCDF file.
+        variable_type (str): Variable name inside the file (e.g. "z").
+        time_index (int): Time index to read.
+        area_covered (list): Area as N W S E.
+
+    Returns:
+        PreparedField | None: (lat, lon, variable) arrays, or None if the area
+        holds no grid points.
+    """
+    window = read_time_slice(nc_file, variable_type, time_index, area_covered)
+    if window is None:
+        return None
+    lat, lon, variable = window
+    return PreparedField(lat, lon, convert_units(variable_type, variable))
+
+
+def load_field(nc_file: str, variable_type: str, time_index: int, area_covered):
+    """Get a decoded, unit-converted field cropped to the area, via the field cache.
+
+    Every map type and contour level of the same time step shares one entry,
+    so the read/decode/convert/crop work is done once per time step.
+
+    Args:
+        nc_file (str): Path to the NetCDF file.
+        variable_type (str): Variable name inside the file (e.g. "z").
+        time_index (int): Time index to read.
+        area_covered (list): Area as N W S E.
+
+    Returns:
+        PreparedField | None: Read-only (lat, lon, variable) arrays, or None if
+        the area holds no grid points.
+    """
+    return FIELD_CACHE.get_or_load(
+        field_key(nc_file, variable_type, time_index, area_covered),
+        lambda: prepare_field(nc_file, variable_type, time_index, area_covered)
+    )
+
+
+def load_contours(nc_file: str, variable_type: str, time_index: int, area_covered, field: PreparedField, step: float):
+    """Get the contour lines of a prepared field every ``step``, via the contour cache.
+
+    The contour, combined and formations maps of the same time step and
+    level step share one entry, so marching squares runs once for them.
+
+    Args:
+        nc_file (str): Path to the NetCDF file.
+        variable_type (str): Variable name inside the file (e.g. "z").
+        time_index (int): Time index of the field.
+        area_covered (list): Area as N W S E.
+        field (PreparedField): The field, as returned by ``load_field``.
+        step (float): Distance between contour levels.
+
+    Returns:
+        ContourGeometry | None: Lines per level, or None if the field has no
+        finite values.
+    """
+    return CONTOUR_CACHE.get_or_compute(
+        (field_key(nc_file, variable_type, time_index, area_covered), float(step)),
+        lambda: compute_contours(field.lon, field.lat, field.variable, step)
+    )
 
 
 def from_nc_to_date(date: str) -> str:
@@ -137,8 +337,97 @@ def obtain_csv_files(file_path: str, file_type: str) -> str:
     raise FileNotFoundError(f"No se encontró un archivo CSV con tipo '{file_type}' en {search_path}")
 
 
+def load_time_rows(request_hash: str, file_type: str, time_index: int) -> pd.DataFrame:
+    """Lee las filas de un paso temporal de un CSV del algoritmo desde su copia columnar.
+
+    Args:
+        request_hash (str): Carpeta de la petición.
+        file_type (str): Tipo de archivo ("selected", "formations").
+        time_index (int): Índice temporal a extraer.
+
+    Returns:
+        pd.DataFrame: Filas del paso temporal.
+    """
+    return open_csv_store(obtain_csv_files(request_hash, file_type)).time_slice(time_index)
+
+
+def prepare_csv_stores(request_hash: str, file_types=("selected", "formations")):
+    """Convierte una sola vez los CSV del algoritmo a formato columnar antes de repartir los mapas.
+
+    Args:
+        request_hash (str): Carpeta de la petición.
+        file_types (tuple): Tipos de archivo a convertir.
+    """
+    for file_type in file_types:
+        try:
+            open_csv_store(obtain_csv_files(request_hash, file_type))
+        except FileNotFoundError as e:
+            print(f"Warning: {e}")
+
+
+class ClusterIndex:
+    """Índice de las filas de cada cluster de un paso temporal.
+
+    Se construye una vez con un argsort estable de la columna ``cluster``, de
+    modo que las filas de un cluster son un tramo contiguo del orden y
+    conservan el orden original del CSV.
+    """
+
+    def __init__(self, clusters: np.ndarray):
+        self.order = np.argsort(clusters, kind="stable")
+        self.ids, self.starts = np.unique(clusters[self.order], return_index=True)
+        self.ends = np.append(self.starts[1:], len(self.order))
+
+    def rows(self, cluster_id) -> np.ndarray:
+        """Filas del cluster ``cluster_id`` (vacío si no tiene puntos)."""
+        i = np.searchsorted(self.ids, cluster_id)
+        if i == len(self.ids) or self.ids[i] != cluster_id:
+            return self.order[:0]
+        return self.order[self.starts[i]:self.ends[i]]
+
+
+# Filas de cada cluster (índices sobre los arrays de puntos) de una formación
+Formation = namedtuple('Formation', ['max', 'min1', 'min2', 'type'])
+
+
+def load_formations(request_hash: str, time_index: int, clusters: ClusterIndex) -> list:
+    """Lee las formaciones de un paso temporal y resuelve las filas de sus clusters.
+
+    Args:
+        request_hash (str): Carpeta de la petición.
+        time_index (int): Índice temporal a extraer.
+        clusters (ClusterIndex): Índice de clusters de los puntos seleccionados del mismo paso.
+
+    Returns:
+        list: Una ``Formation`` por fila (min2 solo en los bloqueos OMEGA).
+    """
+    forms_data = load_time_rows(request_hash, "formations", time_index)
+    formations = []
+    for max_id, min1_id, min2_id, f_type in zip(forms_data['max_id'], forms_data['min1_id'],
+                                                 forms_data['min2_id'], forms_data['type']):
+        min2_rows = clusters.rows(min2_id) if f_type == 'OMEGA' else None
+        formations.append(Formation(clusters.rows(max_id), clusters.rows(min1_id), min2_rows, f_type))
+    return formations
+
+
+def formation_hull(lats: np.ndarray, lons: np.ndarray, padding: float = 0.3) -> np.ndarray:
+    """Envolvente convexa (lon, lat) de los puntos de una formación, ampliada un ``padding`` relativo.
+
+    Si los puntos cruzan el antimeridiano las longitudes negativas pasan a 0-360.
+    """
+    if(abs(lons.min() - lons.max()) >= 180):
+        lons = np.where(lons < 0, lons + 360, lons)
+    points = np.column_stack((lats, lons))
+    
+    hull = ConvexHull(points)
+    polygon_points = points[hull.vertices]
+    centroid = np.mean(polygon_points, axis=0)
+    polygon_points = polygon_points + padding * (polygon_points - centroid)
+    return polygon_points[:, ::-1]
+
+
 class MapGenerator:
-    def __init__(self, file_name, request_hash, variable_name, pressure_level, year, month, day, hour, map_type, map_level, file_format, area_covered):
+    def __init__(self, file_name, request_hash, variable_name, pressure_level, year, month, day, hour, map_type, map_level, file_format, area_covered, label_mode=DEFAULT_LABEL_MODE, frames=None):
         self.file_name = file_name
         self.request_hash = request_hash
         self.variable_name = variable_name
@@ -149,12 +438,21 @@ class MapGenerator:
         self.hour = hour
         self.map_type = map_type
         self.map_level = map_level
-        self.file_format = file_format
+        self.file_formats = parse_file_formats(file_format)
+        self.animation_formats = parse_file_formats(file_format, ANIMATION_FORMATS, DEFAULT_ANIMATION_FORMAT)
+        # (year, month, day, hour) of every frame, only for animations
+        self.frames = frames or [(year, month, day, hour)]
         self.area_covered = area_covered # N W S E
+        self.label_mode = label_mode if label_mode in LABEL_MODES else DEFAULT_LABEL_MODE
+        if label_mode is not None and label_mode not in LABEL_MODES:
+            print(f"Warning: modo de etiquetas '{label_mode}' no válido, se usa '{DEFAULT_LABEL_MODE}'")
         
         # Create output directory if it doesn't exist
         os.makedirs(f"{OUT_DIR}/{self.request_hash}", exist_ok=True)
         
+        # Files written by this generator, uploaded later by the handler
+        self.files = []
+        
         self.init_generation()
         
     def init_generation(self):
@@ -173,17 +471,19 @@ class MapGenerator:
         elif self.map_type == DataType.TYPE_3D.value:
             self.generate_3d_surface_map()
             pass
+        elif self.map_type == DataType.TYPE_GEOJSON.value:
+            self.generate_vector_map()
+        elif self.map_type == DataType.TYPE_TILES.value:
+            self.generate_tile_pyramid()
+        elif self.map_type == DataType.TYPE_ANIM.value:
+            self.generate_animation()
         else:
             print("Error en el tipo de archivo")
 
     def generate_contour_map(self):
         print("Generando mapa de contornos...")
-        variable_type = None
+        variable_type = resolve_variable_type(self.variable_name)
         
-        for key, value in VARIABLE_NAMES.items():
-            if self.variable_name.lower() == key.lower():
-                variable_type = value
-                
         print(f"Variable: {self.variable_name} -> {variable_type}")
         
         if variable_type is None:
@@ -193,90 +493,33 @@ class MapGenerator:
         print(f"File name: {self.file_name}")
         
         try:
-            # Use xarray for more robust file handling
-            ds = get_dataset(self.file_name)
-            dates_nc = date_from_nc(self.file_name)
-            corrected_dates = [from_nc_to_date(str(date)) for date in dates_nc]
             actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
             
-            #from corrected_dates, obtain the index of the date that is equal to actual_date
-            if actual_date not in corrected_dates:
+            if time_index is None:
                 print(f"Error: la fecha {actual_date} no se encuentra en el archivo netCDF")
                 return
             
-            time_index = corrected_dates.index(actual_date)
-            
-            # Extract coordinates and data using xarray for better performance
-            lat = ds.latitude.values
-            lon = ds.longitude.values
-            variable = ds[variable_type].values[time_index]
+            # Decoded field for this time step, shared by every map type and level
+            field = load_field(self.file_name, variable_type, time_index, self.area_covered)
             
-            # Ensure dataset is closed properly
-            ds.close()
-            
-            #Adjust variable
-            if variable_type == 'z':
-                # Convert geopotential height to meters
-                print("Converting geopotential height to meters...")
-                variable = variable / g_0
-            elif variable_type == 't':
-                # Convert temperature from Kelvin to Celsius
-                print("Converting temperature from Kelvin to Celsius...")
-                variable = variable - k_factor
-            
-            # Ajustar valores mayores a 180 restando 360
-            if np.max(lon) > 180:
-                lon, variable = self.adjust_lon(lon, variable)
-            
-            # Adapt lat,lon and variable to the selected area
-            lat_max, lon_min, lat_min, lon_max = self.area_covered
-            
-            lat_idx = np.nonzero((lat >= lat_min) & (lat <= lat_max))[0]
-            lon_idx = np.nonzero((lon >= lon_min) & (lon <= lon_max))[0]
-            
-            if len(lat_idx) == 0 or len(lon_idx) == 0:
+            if field is None:
                 print("Error: No data points within the specified area")
                 return
             
-            lat = lat[lat_idx]
-            lon = lon[lon_idx]
-            variable = variable[..., lat_idx[:, None], lon_idx]  # broadcasting over lat/lon
+            # Contour lines for this field and level step, shared with the other map types
+            geometry = load_contours(self.file_name, variable_type, time_index, self.area_covered, field, self.map_level)
             
-            # Mask invalid values
-            variable = ma.masked_invalid(variable)
+            if geometry is None:
+                print("Error: Invalid data range (NaN or Inf values)")
+                return
 
             # Generate the figure
             fig, ax = self.config_map()
             
-            # Calculate contour levels
-            vmin = np.nanmin(variable) 
-            vmax = np.nanmax(variable)
-            step = self.map_level
-            
-            if not np.isfinite(vmin) or not np.isfinite(vmax):
-                print("Error: Invalid data range (NaN or Inf values)")
-                return
-            
-            # print(f"Var max: {variable.max()}, Var min: {variable.min()}")
-            
-            # print(f"Variable range: {vmin} to {vmax}, step: {step}")
-            
-            # print(f"Latitudes: {lat_min} to {lat_max}, Longitudes: {lon_min} to {lon_max}")
-            
-            # print(f"Variable shape: {variable.shape}, Lat shape: {lat.shape}, Lon shape: {lon.shape}")
-                
-            # Ensure we have a valid range for contours
-            cont_levels = np.arange(np.ceil(vmin/10)*10, vmax, step)
-            if len(cont_levels) < 2:
-                # Fallback if range is too small
-                cont_levels = np.linspace(vmin, vmax, 5)
-                
-            # print(f"Contour levels: {cont_levels}")
-            
-            co = ax.contour(lon, lat, variable, levels=cont_levels, cmap='jet', 
-                        transform=ccrs.PlateCarree(), linewidths=1)
+            # print(f"Contour levels: {geometry.levels}")
             
-            # print("Contours co.levels:", co.levels)
+            co = draw_contours(ax, geometry, cmap='jet', transform=ccrs.PlateCarree(), linewidths=1)
             
             plt.clabel(co, inline=True, fontsize=8)
             
@@ -297,12 +540,8 @@ class MapGenerator:
      
     def generate_scatter_map(self):
         print("Generando mapa de dispersión...")
-        variable_type = None
+        variable_type = resolve_variable_type(self.variable_name)
         
-        for key, value in VARIABLE_NAMES.items():
-            if self.variable_name.lower() == key.lower():
-                variable_type = value
-                
         print(f"Variable: {self.variable_name} -> {variable_type}")
         
         if variable_type is None:
@@ -312,30 +551,23 @@ class MapGenerator:
         # print(f"File name: {self.file_name}")
         
         try:
-            data = pd.read_csv(obtain_csv_files(self.request_hash, "selected"))
-            dates_nc = date_from_nc(self.file_name)
-            corrected_dates = [from_nc_to_date(str(date)) for date in dates_nc]
             actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
             
-            #from corrected_dates, obtain the index of the date that is equal to actual_date
-            if actual_date not in corrected_dates:
+            if time_index is None:
                 print(f"Error: la fecha {actual_date} no se encuentra en el archivo netCDF")
                 return
             
-            time_index = corrected_dates.index(actual_date)
-            
             #Filtrar los datos para el índice de tiempo actual
-            data = data[data['time'] == time_index]
+            data = self.thin_points(load_time_rows(self.request_hash, "selected", time_index), variable_type)
              
             lat = data['latitude'].copy()
             lon = data['longitude'].copy()
-            cluster = data['cluster'].copy()
             variable = data[variable_type].copy()
             
             # Ensure we have valid data in numpy arrays
             lat = lat.to_numpy()
             lon = lon.to_numpy()
-            cluster = cluster.to_numpy()
             variable = variable.to_numpy()
 
             # Generate the figure
@@ -352,9 +584,8 @@ class MapGenerator:
                 edgecolors='black'
             )
 
-            for i, txt in enumerate(cluster):
-                # Add text labels to the scatter points
-                ax.annotate(txt, (lon[i], lat[i]), fontsize=1, color='white')
+            # Etiquetas de los puntos según el modo elegido
+            self.add_point_labels(ax, data, zorder=3)
                 
             #visual_adds
             self.visual_adds(fig, ax, sc, self.map_type, variable_type, "v", actual_date)
@@ -373,12 +604,8 @@ class MapGenerator:
      
     def generate_combined_map(self):
         print("Generando mapa combinado (disp + cont)...")
-        variable_type = None
+        variable_type = resolve_variable_type(self.variable_name)
         
-        for key, value in VARIABLE_NAMES.items():
-            if self.variable_name.lower() == key.lower():
-                variable_type = value
-                
         print(f"Variable: {self.variable_name} -> {variable_type}")
         
         if variable_type is None:
@@ -388,91 +615,43 @@ class MapGenerator:
         print(f"File name: {self.file_name}")
         
         try:
-            cont_ds = get_dataset(self.file_name)
-            disp_data = pd.read_csv(obtain_csv_files(self.request_hash, "selected"))
-            
-            dates_nc = date_from_nc(self.file_name)
-            corrected_dates = [from_nc_to_date(str(date)) for date in dates_nc]
             actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
             
-            #from corrected_dates, obtain the index of the date that is equal to actual_date
-            if actual_date not in corrected_dates:
+            if time_index is None:
                 print(f"Error: la fecha {actual_date} no se encuentra en el archivo netCDF")
                 return
             
-            time_index = corrected_dates.index(actual_date)
-            
-            # Extract coordinates and data using xarray for better performance
-            cont_lat = cont_ds.latitude.values
-            cont_lon = cont_ds.longitude.values
-            cont_variable = cont_ds[variable_type].values[time_index]
+            # Decoded field for this time step, shared by every map type and level
+            cont_field = load_field(self.file_name, variable_type, time_index, self.area_covered)
             
-            # Ensure dataset is closed properly
-            cont_ds.close()
+            if cont_field is None:
+                print("Error: No data points within the specified area")
+                return
             
             #Filtrar los datos para el índice de tiempo actual
-            disp_data = disp_data[disp_data['time'] == time_index]
+            disp_data = self.thin_points(load_time_rows(self.request_hash, "selected", time_index), variable_type)
              
             disp_lat = disp_data['latitude'].copy()
             disp_lon = disp_data['longitude'].copy()
-            disp_cluster = disp_data['cluster'].copy()
             disp_variable = disp_data[variable_type].copy()
             
             # Ensure we have valid data in numpy arrays
             disp_lat = disp_lat.to_numpy()
             disp_lon = disp_lon.to_numpy()
-            disp_cluster = disp_cluster.to_numpy()
             disp_variable = disp_variable.to_numpy()
             
-            #Adjust variable
-            if variable_type == 'z':
-                # Convert geopotential height to meters
-                print("Converting geopotential height to meters...")
-                cont_variable = cont_variable / g_0
-            
-            # Ajustar valores mayores a 180 restando 360
-            if np.max(cont_lon) > 180:
-                cont_lon, cont_variable = self.adjust_lon(cont_lon, cont_variable)
-            
-            # Adapt lat,lon and variable to the selected area
-            lat_max, lon_min, lat_min, lon_max = self.area_covered
-            
-            lat_idx = np.nonzero((cont_lat >= lat_min) & (cont_lat <= lat_max))[0]
-            lon_idx = np.nonzero((cont_lon >= lon_min) & (cont_lon <= lon_max))[0]
-            
-            if len(lat_idx) == 0 or len(lon_idx) == 0:
-                print("Error: No data points within the specified area")
-                return
-            
-            cont_lat = cont_lat[lat_idx]
-            cont_lon = cont_lon[lon_idx]
-            cont_variable = cont_variable[..., lat_idx[:, None], lon_idx]  # broadcasting over lat/lon
-            
-            # Mask invalid values
-            cont_variable = ma.masked_invalid(cont_variable)
-            
-            # Calculate contour levels
-            vmin = np.nanmin(cont_variable) 
-            vmax = np.nanmax(cont_variable)
-            step = self.map_level
+            # Contour lines for this field and level step, shared with the other map types
+            geometry = load_contours(self.file_name, variable_type, time_index, self.area_covered, cont_field, self.map_level)
             
-            if not np.isfinite(vmin) or not np.isfinite(vmax):
+            if geometry is None:
                 print("Error: Invalid data range (NaN or Inf values)")
                 return
             
-            # Ensure we have a valid range for contours
-            cont_levels = np.arange(np.ceil(vmin/10)*10, vmax, step)
-            if len(cont_levels) < 2:
-                # Fallback if range is too small
-                cont_levels = np.linspace(vmin, vmax, 5)
-                
-            # print(f"Contour levels: {cont_levels}")
-            
             # Generate the figure
             fig, ax = self.config_map()
             
-            co = ax.contour(cont_lon, cont_lat, cont_variable, levels=cont_levels, cmap='jet', 
-                        transform=ccrs.PlateCarree(), linewidths=1)
+            co = draw_contours(ax, geometry, cmap='jet', transform=ccrs.PlateCarree(), linewidths=1)
             
             plt.clabel(co, inline=True, fontsize=8)
             
@@ -489,10 +668,8 @@ class MapGenerator:
                 zorder=10  # Higher zorder ensures points are drawn on top
             )
             
-            # Enumerate cluster labels
-            for i, txt in enumerate(disp_cluster):
-                # Add text labels to the scatter points
-                ax.annotate(txt, (disp_lon[i], disp_lat[i]), fontsize=1, color='white', zorder=11)
+            # Etiquetas de los puntos según el modo elegido
+            self.add_point_labels(ax, disp_data, zorder=11)
             
             
             #visual_adds
@@ -512,12 +689,8 @@ class MapGenerator:
      
     def generate_formations_map(self):
         print("Generando mapa de formaciones...")
-        variable_type = None
+        variable_type = resolve_variable_type(self.variable_name)
         
-        for key, value in VARIABLE_NAMES.items():
-            if self.variable_name.lower() == key.lower():
-                variable_type = value
-                
         print(f"Variable: {self.variable_name} -> {variable_type}")
         
         if variable_type is None:
@@ -527,168 +700,83 @@ class MapGenerator:
         # print(f"File name: {self.file_name}")
         
         try:
-            select_data = pd.read_csv(obtain_csv_files(self.request_hash, "selected"))
-            forms_data = pd.read_csv(obtain_csv_files(self.request_hash, "formations"))
-            dates_nc = date_from_nc(self.file_name)
-            corrected_dates = [from_nc_to_date(str(date)) for date in dates_nc]
             actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
             
-            #from corrected_dates, obtain the index of the date that is equal to actual_date
-            if actual_date not in corrected_dates:
+            if time_index is None:
                 print(f"Error: la fecha {actual_date} no se encuentra en el archivo netCDF")
                 return
             
-            time_index = corrected_dates.index(actual_date)
-            
             #Filtrar los datos para el índice de tiempo actual
-            select_data = select_data[select_data['time'] == time_index]
+            select_data = load_time_rows(self.request_hash, "selected", time_index)
              
-            s_lat = select_data['latitude'].copy()
-            s_lon = select_data['longitude'].copy()
-            s_cluster = select_data['cluster'].copy()
-            s_type = select_data['type'].copy()
-            s_variable = select_data[variable_type].copy()
+            s_lat = select_data['latitude'].to_numpy()
+            s_lon = select_data['longitude'].to_numpy()
+            s_cluster = select_data['cluster'].to_numpy()
+            s_type = select_data['type'].to_numpy()
+            s_variable = select_data[variable_type].to_numpy()
             
             #Filtrar los datos de formaciones para el índice de tiempo actual
-            forms_data = forms_data[forms_data['time'] == time_index]
-            max_ids = forms_data['max_id'].copy()
-            min1_ids = forms_data['min1_id'].copy()
-            min2_ids = forms_data['min2_id'].copy()
-            f_types = forms_data['type'].copy()
-            
-            Points = namedtuple('Points', ['lat', 'lon', 'var', 'cluster', 'type'])
-            Formations = namedtuple('Formations', ['max', 'min1', 'min2', 'type'])
-            
-            formations_array = []
-            
-            for max_id, min1_id, min2_id, f_type in zip(max_ids, min1_ids, min2_ids, f_types):
-                max_points = [Points(lat, lon, var, clus, t) for lat, lon, var, clus, t in zip(s_lat, s_lon, s_variable, s_cluster, s_type) if clus == max_id]
-                min1_points = [Points(lat, lon, var, clus, t) for lat, lon, var, clus, t in zip(s_lat, s_lon, s_variable, s_cluster, s_type) if clus == min1_id]
-                min2_points = [Points(lat, lon, var, clus, t) for lat, lon, var, clus, t in zip(s_lat, s_lon, s_variable, s_cluster, s_type) if clus == min2_id] if f_type == 'OMEGA' else None
+            formations_array = load_formations(self.request_hash, time_index, ClusterIndex(s_cluster))
         
-                formations_array.append(Formations(max_points, min1_points, min2_points, f_type))
-        
-            dataset_nc = get_dataset(self.file_name)
-            
-             # Extract coordinates and data using xarray for better performance
-            nc_lat = dataset_nc.latitude.values
-            nc_lon = dataset_nc.longitude.values
-            nc_variable = dataset_nc[variable_type].values[time_index]
-            
-            # Ensure dataset is closed properly
-            dataset_nc.close()
-            
-            #Adjust variable
-            if variable_type == 'z':
-                # Convert geopotential height to meters
-                print("Converting geopotential height to meters...")
-                nc_variable = nc_variable / g_0
-           
-            
-            # Ajustar valores mayores a 180 restando 360
-            if np.max(nc_lon) > 180:
-                nc_lon, nc_variable = self.adjust_lon(nc_lon, nc_variable)
-            
-            # Adapt lat,lon and variable to the selected area
-            lat_max, lon_min, lat_min, lon_max = self.area_covered
+            # Decoded field for this time step, shared by every map type and level
+            nc_field = load_field(self.file_name, variable_type, time_index, self.area_covered)
             
-            lat_idx = np.nonzero((nc_lat >= lat_min) & (nc_lat <= lat_max))[0]
-            lon_idx = np.nonzero((nc_lon >= lon_min) & (nc_lon <= lon_max))[0]
-            
-            if len(lat_idx) == 0 or len(lon_idx) == 0:
+            if nc_field is None:
                 print("Error: No data points within the specified area")
                 return
             
-            nc_lat = nc_lat[lat_idx]
-            nc_lon = nc_lon[lon_idx]
-            nc_variable = nc_variable[..., lat_idx[:, None], lon_idx]  # broadcasting over lat/lon
+            # Contour lines for this field and level step, shared with the other map types
+            geometry = load_contours(self.file_name, variable_type, time_index, self.area_covered, nc_field, self.map_level)
             
-            # Mask invalid values
-            nc_variable = ma.masked_invalid(nc_variable)
+            if geometry is None:
+                print("Error: Invalid data range (NaN or Inf values)")
+                return
             
             # Generate the figure
             fig, ax = self.config_map()
             
-            # Calculate contour levels
-            vmin = np.nanmin(nc_variable) 
-            vmax = np.nanmax(nc_variable)
-            step = self.map_level
-            
-            if not np.isfinite(vmin) or not np.isfinite(vmax):
-                print("Error: Invalid data range (NaN or Inf values)")
-                return
-            
             co = None
             
+            # Capas de la formación: se acumulan y se dibujan como una colección por tipo
+            point_rows = []
+            hulls = []
+            id_labels, id_lons, id_lats = [], [], []
+            type_labels, type_lons, type_lats = [], [], []
+            
             for formation in formations_array:
-                all_points = []
-                for points in [formation.max, formation.min1, formation.min2]:
-                    if points:
-                        latitude = [p.lat for p in points]
-                        longitude = [p.lon for p in points]
-                        ids = [p.cluster for p in points]
-                        type = [p.type for p in points]
+                all_lats = []
+                all_lons = []
+                for rows in [formation.max, formation.min1, formation.min2]:
+                    if rows is not None and len(rows) > 0:
+                        latitude = s_lat[rows]
+                        longitude = s_lon[rows]
                         
-                        # Dibujar los puntos en el scatter plot
-                        for i, t in enumerate(type):
-                            color = 'red' if t == 'MAX' else 'blue'
-                            sc = ax.scatter(longitude, latitude, c=color, s=8, 
-                                    transform=ccrs.PlateCarree(), 
-                                    linewidths=0.3, edgecolors='black', zorder=10
-                            )
-
-                        all_points.extend(zip(latitude, longitude))
+                        point_rows.append(rows)
+                        all_lats.append(latitude)
+                        all_lons.append(longitude)
                         
                         # Encontrar la posición más arriba a la derecha
                         max_lat_idx = np.argmax(latitude)
-                        max_lat = latitude[max_lat_idx]
-                        corresponding_lon = longitude[max_lat_idx]
-                        
                         margin = 0.5
                         
-                        # Anotar el ID del grupo en la posición media
-                        num = ax.annotate(
-                            ids[0], 
-                            xy=(corresponding_lon + margin, max_lat + margin), 
-                            fontsize=6, 
-                            ha='left', color='white', transform=ccrs.PlateCarree(), zorder=11
-                        )
-                        plt.setp(
-                            num, 
-                            path_effects=[path_effects.Stroke(linewidth=1, foreground='black'), 
-                                path_effects.Normal()]
-                        )
+                        # Anotar el ID del grupo junto al punto más al norte
+                        id_labels.append(s_cluster[rows[0]])
+                        id_lons.append(longitude[max_lat_idx] + margin)
+                        id_lats.append(latitude[max_lat_idx] + margin)
                         
-                if all_points:
-                    lon_points = [point[1] for point in all_points]
+                if all_lats:
+                    lats = np.concatenate(all_lats)
+                    lons = np.concatenate(all_lons)
                     
-                    if(abs(min(lon_points) - max(lon_points)) >= 180):
-                        norm_points = [(lat, lon + 360 if lon < 0 else lon) for lat, lon in all_points]
-                        lats, lons = zip(*norm_points) 
-                        points = np.array(norm_points)
-                    else:
-                        lats, lons = zip(*all_points)
-                        points = np.array(all_points)
+                    if(abs(lons.min() - lons.max()) >= 180):
+                        lons = np.where(lons < 0, lons + 360, lons)
                     
-                    min_lat, max_lat = min(lats), max(lats)
-                    min_lon, max_lon = min(lons), max(lons)
-                    padding = 0.3
+                    min_lat, max_lat = lats.min(), lats.max()
+                    min_lon, max_lon = lons.min(), lons.max()
                     
-                    hull = ConvexHull(points)
-                    polygon_points = points[hull.vertices]
-                    centroid = np.mean(polygon_points, axis=0)
-                    polygon_points = polygon_points + padding * (polygon_points - centroid)
-                    
-                    # Trazar el polígono
-                    ax.plot(polygon_points[:, 1], polygon_points[:, 0], 
-                            color='black', linewidth=0.75, 
-                            transform=ccrs.PlateCarree(), zorder=10
-                    )
-                    ax.plot([polygon_points[0, 1], polygon_points[-1, 1]], 
-                            [polygon_points[0, 0], polygon_points[-1, 0]], 
-                            color='black', linewidth=0.75, transform=ccrs.PlateCarree(), 
-                            zorder=10
-                    )
+                    # Polígono en (lon, lat)
+                    hulls.append(formation_hull(lats, lons))
                     
                     # Anotar el tipo de la formación en el mapa
                     mid_lat = (min_lat + max_lat) / 2
@@ -698,27 +786,32 @@ class MapGenerator:
                         mid_lon = 170
                     
                     if formation.type == 'OMEGA':
-                        an_xy = (mid_lon, mid_lat - 8)
-                    else:
-                        an_xy = (mid_lon, mid_lat)
-                        
-                    type_an = ax.annotate(formation.type, an_xy, fontsize=4, ha='center', 
-                                          color='white', transform=ccrs.PlateCarree(), zorder=13)
-                    plt.setp(type_an, 
-                             path_effects=[path_effects.Stroke(linewidth=1, foreground='black'), 
-                                           path_effects.Normal()]
-                    )
+                        mid_lat = mid_lat - 8
+                    
+                    type_labels.append(formation.type)
+                    type_lons.append(mid_lon)
+                    type_lats.append(mid_lat)
+            
+            # Una PathCollection por tipo de punto
+            if point_rows:
+                rows = np.concatenate(point_rows)
+                is_max = s_type[rows] == 'MAX'
+                for mask, color in ((is_max, 'red'), (~is_max, 'blue')):
+                    if mask.any():
+                        ax.scatter(s_lon[rows][mask], s_lat[rows][mask], c=color, s=8,
+                                   transform=ccrs.PlateCarree(),
+                                   linewidths=0.3, edgecolors='black', zorder=10
+                        )
             
+            # Una LineCollection para todos los polígonos y una capa de texto por estilo
+            add_outline_layer(ax, hulls, color='black', linewidth=0.75, zorder=10)
+            add_text_layer(ax, id_labels, id_lons, id_lats, fontsize=6, ha='left', zorder=11)
+            add_text_layer(ax, type_labels, type_lons, type_lats, fontsize=4, ha='center', zorder=13)
+
             #Valor entre los contornos
-            cont_levels = np.arange(np.ceil(vmin/10)*10, vmax, step)
-            if len(cont_levels) < 2:
-                # Fallback if range is too small
-                cont_levels = np.linspace(vmin, vmax, 5)
-                
-            co = ax.contour(nc_lon, nc_lat, nc_variable, levels=cont_levels, cmap='jet', 
-                            transform=ccrs.PlateCarree(), vmax=s_variable.max(), 
-                            vmin=s_variable.min(), linewidths=0.5, zorder=7
-                            )
+            co = draw_contours(ax, geometry, cmap='jet', transform=ccrs.PlateCarree(), vmax=s_variable.max(), 
+                               vmin=s_variable.min(), linewidths=0.5, zorder=7
+                               )
             
             # Valores de contorno
             cont_txt = plt.clabel(co, inline=True, fontsize=4, zorder=8)
@@ -741,14 +834,255 @@ class MapGenerator:
 
         return True
      
+    def generate_vector_map(self):
+        """Exporta las isolíneas, los puntos seleccionados y las formaciones como GeoJSON.
+
+        Las isolíneas salen de la caché de contornos compartida con los mapas
+        raster y las coordenadas se cuantizan a ``GEOJSON_PRECISION`` decimales,
+        para que el frontend las dibuje y estilice sin descargar imágenes.
+        """
+        print("Generando mapa vectorial (GeoJSON)...")
+        variable_type = resolve_variable_type(self.variable_name)
+        
+        if variable_type is None:
+            print("Error: variable no válida")
+            return
+        
+        try:
+            actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
+            
+            if time_index is None:
+                print(f"Error: la fecha {actual_date} no se encuentra en el archivo netCDF")
+                return
+            
+            # Decoded field for this time step, shared by every map type and level
+            field = load_field(self.file_name, variable_type, time_index, self.area_covered)
+            
+            if field is None:
+                print("Error: No data points within the specified area")
+                return
+            
+            geometry = load_contours(self.file_name, variable_type, time_index, self.area_covered, field, self.map_level)
+            
+            if geometry is None:
+                print("Error: Invalid data range (NaN or Inf values)")
+                return
+            
+            features = contour_features(geometry)
+            
+            # Puntos seleccionados, agrupados por cluster
+            select_data = load_time_rows(self.request_hash, "selected", time_index)
+            s_lat = select_data['latitude'].to_numpy()
+            s_lon = select_data['longitude'].to_numpy()
+            s_cluster = select_data['cluster'].to_numpy()
+            features += point_features(s_lon, s_lat, select_data[variable_type].to_numpy(),
+                                       s_cluster, select_data['type'].to_numpy())
+            
+            # Envolventes de las formaciones
+            hulls, properties = [], []
+            for formation in load_formations(self.request_hash, time_index, ClusterIndex(s_cluster)):
+                rows = [rows for rows in (formation.max, formation.min1, formation.min2)
+                        if rows is not None and len(rows) > 0]
+                if not rows:
+                    continue
+                hulls.append(formation_hull(np.concatenate([s_lat[r] for r in rows]),
+                                            np.concatenate([s_lon[r] for r in rows])))
+                properties.append({"type": str(formation.type),
+                                   "clusters": [int(s_cluster[r[0]]) for r in rows]})
+            features += hull_features(hulls, properties)
+            
+            base_name = unique_base_name(
+                f"{OUT_DIR}/{self.request_hash}/map_{self.variable_name}_{self.map_type}_{self.map_level}l_{actual_date}",
+                ["geojson"]
+            )
+            output_path = write_feature_collection(f"{base_name}.geojson", features, {
+                "variable": self.variable_name,
+                "pressure_level": self.pressure_level,
+                "date": actual_date,
+                "level_step": self.map_level,
+                "levels": [round(float(level), 2) for level in geometry.levels],
+                "precision": GEOJSON_PRECISION,
+            })
+            self.files.append(output_path)
+            
+            print(f"GeoJSON guardado en {output_path}: {len(features)} features, "
+                  f"{os.path.getsize(output_path) / 1024:.1f} KB")
+        
+        except Exception as e:
+            print(f"Error in generate_vector_map: {str(e)}")
+            raise
+        
+        return True
+     
+    def generate_tile_pyramid(self):
+        """Renderiza los contornos como una pirámide de teselas z/x/y (plate carrée).
+
+        Las teselas se guardan en ``tiles/{variable}/{nivel}l/{fecha}/`` junto a
+        un ``tiles.json`` que describe la pirámide; las vacías no se escriben y
+        las idénticas a otra se escriben una sola vez (``duplicates`` en el manifiesto).
+        """
+        print("Generando pirámide de teselas...")
+        variable_type = resolve_variable_type(self.variable_name)
+        
+        if variable_type is None:
+            print("Error: variable no válida")
+            return
+        
+        try:
+            actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
+            
+            if time_index is None:
+                print(f"Error: la fecha {actual_date} no se encuentra en el archivo netCDF")
+                return
+            
+            # Decoded field for this time step, shared by every map type and level
+            field = load_field(self.file_name, variable_type, time_index, self.area_covered)
+            
+            if field is None:
+                print("Error: No data points within the specified area")
+                return
+            
+            geometry = load_contours(self.file_name, variable_type, time_index, self.area_covered, field, self.map_level)
+            
+            if geometry is None:
+                print("Error: Invalid data range (NaN or Inf values)")
+                return
+            
+            def draw(ax):
+                co = draw_contours(ax, geometry, cmap='jet', transform=ccrs.PlateCarree(), linewidths=1)
+                co.clabel(inline=True, fontsize=8)
+            
+            out_dir = f"{OUT_DIR}/{self.request_hash}/tiles/{self.variable_name}/{self.map_level}l/{actual_date}"
+            start_time = time.time()
+            stats = render_tile_pyramid(draw, self.area_covered, out_dir, {
+                "variable": self.variable_name,
+                "pressure_level": self.pressure_level,
+                "date": actual_date,
+                "level_step": self.map_level,
+            })
+            self.files.extend(stats.files)
+            
+            print(f"Teselas guardadas en {out_dir}: {stats.written} escritas, {stats.empty} vacías omitidas, "
+                  f"{len(stats.duplicates)} duplicadas, {time.time() - start_time:.2f} s")
+        
+        except Exception as e:
+            print(f"Error in generate_tile_pyramid: {str(e)}")
+            plt.close('all')
+            raise
+        
+        return True
+     
+    def generate_animation(self):
+        """Anima el mapa de contornos a lo largo de los pasos temporales de ``self.frames``.
+
+        El fondo (costas, ejes, barra de color) se dibuja una sola vez; en cada
+        fotograma solo se rasterizan los contornos, sus etiquetas y el título,
+        y el fotograma se envía directamente al codificador. Los niveles se fijan
+        con el rango de toda la serie para que los colores sean comparables.
+        """
+        print("Generando animación...")
+        variable_type = resolve_variable_type(self.variable_name)
+        
+        if variable_type is None:
+            print("Error: variable no válida")
+            return
+        
+        outputs = {}
+        try:
+            steps = []
+            for year, month, day, hour in self.frames:
+                date = from_elements_to_date(year, month, day, hour)
+                time_index = resolve_time_index(self.file_name, date)
+                if time_index is None:
+                    print(f"Error: la fecha {date} no se encuentra en el archivo netCDF")
+                    continue
+                steps.append((date, time_index))
+            
+            # Rango de cada fotograma en una sola pasada, de atrás hacia delante: si la serie no cabe
+            # en la caché de campos, los que quedan en ella son los primeros que se dibujan
+            ranges = {}
+            for _, time_index in reversed(steps):
+                field = load_field(self.file_name, variable_type, time_index, self.area_covered)
+                if field is not None:
+                    ranges[time_index] = (np.nanmin(field.variable), np.nanmax(field.variable))
+            steps = [(date, time_index) for date, time_index in steps if time_index in ranges]
+            
+            if not steps:
+                print("Error: ningún paso temporal de la animación tiene datos en el archivo netCDF y el área indicados")
+                return
+            
+            levels = contour_levels(np.array([value for bounds in ranges.values() for value in bounds]), self.map_level)
+            if levels is None:
+                print("Error: Invalid data range (NaN or Inf values)")
+                return
+            
+            fig, ax = self.config_map(dpi=ANIMATION_DPI)
+            
+            def draw_frame(time_index):
+                field = load_field(self.file_name, variable_type, time_index, self.area_covered)
+                geometry = compute_contours(field.lon, field.lat, field.variable, self.map_level, levels)
+                co = draw_contours(ax, geometry, cmap='jet', transform=ccrs.PlateCarree(), linewidths=1,
+                                   vmin=levels[0], vmax=levels[-1], animated=True)
+                for text in co.clabel(inline=True, fontsize=8):
+                    text.set_animated(True)
+                return co
+            
+            first_date = steps[0][0]
+            co = draw_frame(steps[0][1])
+            self.visual_adds(fig, ax, co, self.map_type, variable_type, "v", first_date)
+            title = ax.title
+            title_text = title.get_text()
+            title.set_animated(True)
+            
+            # Fondo estático: todo menos los artistas animados
+            fig.canvas.draw()
+            background = fig.canvas.copy_from_bbox(fig.bbox)
+            top, bottom, left, right = frame_box(fig, fig.get_tightbbox().padded(0.1))
+            
+            base_name = unique_base_name(
+                f"{OUT_DIR}/{self.request_hash}/anim_{self.variable_name}_{self.map_level}l_{first_date}_{steps[-1][0]}",
+                self.animation_formats
+            )
+            outputs = {file_format: f"{base_name}.{file_format}" for file_format in self.animation_formats}
+            
+            start_time = time.time()
+            with FrameEncoder(outputs, right - left, bottom - top) as encoder:
+                for i, (date, time_index) in enumerate(steps):
+                    if i > 0:
+                        co.remove()
+                        co = draw_frame(time_index)
+                    title.set_text(title_text.replace(first_date, date))
+                    
+                    fig.canvas.restore_region(background)
+                    for artist in contour_artists(co):
+                        ax.draw_artist(artist)
+                    for text in co.labelTexts:
+                        ax.draw_artist(text)
+                    ax.draw_artist(title)
+                    encoder.write(np.asarray(fig.canvas.buffer_rgba())[top:bottom, left:right])
+            
+            self.files.extend(outputs.values())
+            print(f"Animación guardada en {', '.join(outputs.values())}: {len(steps)} fotogramas "
+                  f"en {time.time() - start_time:.2f} s")
+        
+        except Exception as e:
+            print(f"Error in generate_animation: {str(e)}")
+            # Un vídeo a medio codificar no se sube
+            for path in outputs.values():
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            plt.close('all')
+        
+        return True
+     
     def generate_3d_surface_map(self):
         print("Generando mapa de superficie 3D...")
-        variable_type = None
+        variable_type = resolve_variable_type(self.variable_name)
         
-        for key, value in VARIABLE_NAMES.items():
-            if self.variable_name.lower() == key.lower():
-                variable_type = value
-                
         print(f"Variable: {self.variable_name} -> {variable_type}")
         
         if variable_type is None:
@@ -758,58 +1092,41 @@ class MapGenerator:
         print(f"File name: {self.file_name}")
         
         try:
-            ds = get_dataset(self.file_name)
-            dates_nc = date_from_nc(self.file_name)
-            corrected_dates = [from_nc_to_date(str(date)) for date in dates_nc]
             actual_date = from_elements_to_date(self.year, self.month, self.day, self.hour)
+            time_index = resolve_time_index(self.file_name, actual_date)
             
-            if actual_date not in corrected_dates:
+            if time_index is None:
                 print(f"Fecha {actual_date} no encontrada en el archivo NetCDF")
                 return
 
-            time_index = corrected_dates.index(actual_date)
             print(f"Time index for {actual_date}: {time_index}")
 
-            lat = ds.latitude.values
-            lon = ds.longitude.values
-            variable = ds[variable_type].values[time_index]
+            # Decoded field for this time step, shared by every map type and level
+            field = load_field(self.file_name, variable_type, time_index, self.area_covered)
             
-            print(f"Variable shape before adjustment: {variable.shape}, Lat shape: {lat.shape}, Lon shape: {lon.shape}")
-
-            ds.close()
+            if field is None:
+                print("Error: No data points within the specified area")
+                return
             
-            #Adjust variable
-            if variable_type == 'z':
-                # Convert geopotential height to meters
-                print("Converting geopotential height to meters...")
-                variable = variable / g_0
-            elif variable_type == 't':
-                # Convert temperature from Kelvin to Celsius
-                print("Converting temperature from Kelvin to Celsius...")
-                variable = variable - k_factor
+            lat, lon, variable = field
                 
             print(f"Variable shape: {variable.shape}, Lat shape: {lat.shape}, Lon shape: {lon.shape}")
             
-            if np.max(lon) > 180:
-                lon, variable = self.adjust_lon(lon, variable)
-
-            lat_max, lon_min, lat_min, lon_max = self.area_covered
-            lat_idx = np.nonzero((lat >= lat_min) & (lat <= lat_max))[0]
-            lon_idx = np.nonzero((lon >= lon_min) & (lon <= lon_max))[0]
-
-            lat = lat[lat_idx]
-            lon = lon[lon_idx]
-            variable = variable[..., lat_idx[:, None], lon_idx]
-
+            # Files that still carry a level dimension hold (level, lat, lon)
+            surface = variable[0] if variable.ndim == 3 else variable
+            # Aggregate the grid to the polygon budget instead of letting plot_surface skip rows
+            lon, lat, surface, lod = decimate_grid(lon, lat, surface)
             lon_grid, lat_grid = np.meshgrid(lon, lat)
             
-            print(f"Lon grid shape: {lon_grid.shape}, Lat grid shape: {lat_grid.shape}, Variable shape: {variable.shape}")
+            print(f"Lon grid shape: {lon_grid.shape}, Lat grid shape: {lat_grid.shape}, Variable shape: {surface.shape}")
 
+            render_start = time.time()
             fig = plt.figure(figsize=(10, 6), dpi=200)
             ax = fig.add_subplot(111, projection='3d')
 
-            # Plot 3D surface
-            surf = ax.plot_surface(lon_grid, lat_grid, variable[0], cmap='viridis', linewidth=0, antialiased=False)
+            # Plot 3D surface, one quad per grid cell left
+            surf = ax.plot_surface(lon_grid, lat_grid, surface, cmap='viridis', linewidth=0, antialiased=False,
+                                   rcount=surface.shape[0], ccount=surface.shape[1])
 
             ax.set_xlabel('Longitude')
             ax.set_ylabel('Latitude')
@@ -818,11 +1135,15 @@ class MapGenerator:
 
             fig.colorbar(surf, ax=ax, shrink=0.5, aspect=5)
 
-            output_path = f"{OUT_DIR}/{self.request_hash}/{self.variable_name}_3D_{actual_date}.{self.file_format}"
-            plt.savefig(output_path)
+            base_name = f"{OUT_DIR}/{self.request_hash}/{self.variable_name}_3D_{actual_date}"
+            output_paths = save_figure(fig, base_name, self.file_formats, tight=False)
             plt.close()
+            self.files.extend(output_paths)
+
+            print(f"LOD 3D: {lod.original} -> {lod.rendered} polygons (block {lod.factor}), "
+                  f"rendered in {time.time() - render_start:.2f} s")
 
-            print(f"Mapa 3D guardado en {output_path}")
+            print(f"Mapa 3D guardado en {', '.join(output_paths)}")
         except Exception as e:
             print(f"Error in generate_3d_map: {str(e)}")
             # Clean up any open figures
@@ -831,6 +1152,58 @@ class MapGenerator:
         
         return True
         
+    def thin_points(self, points: pd.DataFrame, variable_type: str) -> pd.DataFrame:
+        """Rows of a dense point cloud kept for the scatter, within the point budget of the LOD engine."""
+        keep, lod = decimate_points(points['longitude'].to_numpy(), points['latitude'].to_numpy(),
+                                    points[variable_type].to_numpy())
+        if lod.rendered == lod.original:
+            return points
+        print(f"LOD scatter: {lod.original} -> {lod.rendered} points (cells of {lod.factor:.2f} deg)")
+        return points.iloc[keep]
+
+    def add_point_labels(self, ax, points: pd.DataFrame, zorder: float):
+        """Etiqueta los puntos seleccionados según ``self.label_mode``.
+
+        - "points": el id de cluster en cada punto (texto diminuto, una sola capa).
+        - "clusters": un id por cluster en su centroide, descartando los que se solapan.
+        - "none": sin etiquetas.
+
+        Args:
+            ax (GeoAxes): Eje del mapa.
+            points (pd.DataFrame): Puntos del paso temporal (latitude, longitude, cluster...).
+            zorder (float): Orden de dibujo de las etiquetas.
+        """
+        if self.label_mode == LABEL_MODE_NONE or points.empty:
+            return
+
+        lat = points['latitude'].to_numpy()
+        lon = points['longitude'].to_numpy()
+        cluster = points['cluster'].to_numpy()
+
+        if self.label_mode == LABEL_MODE_POINTS:
+            add_text_layer(ax, cluster, lon, lat, fontsize=1, stroke=None, zorder=zorder)
+            return
+
+        clusters = ClusterIndex(cluster)
+        has_centroid = 'centroid_lat' in points and 'centroid_lon' in points
+        label_lat, label_lon, sizes = [], [], []
+        for start, end in zip(clusters.starts, clusters.ends):
+            rows = clusters.order[start:end]
+            if has_centroid:
+                label_lat.append(points['centroid_lat'].iat[rows[0]])
+                label_lon.append(points['centroid_lon'].iat[rows[0]])
+            else:
+                label_lat.append(lat[rows].mean())
+                label_lon.append(lon[rows].mean())
+            sizes.append(len(rows))
+
+        # Los clusters más grandes tienen prioridad al resolver solapes
+        kept = cull_overlapping(ax, clusters.ids, label_lon, label_lat, fontsize=6, ha='center', priority=sizes)
+        add_text_layer(
+            ax, clusters.ids[kept], np.asarray(label_lon)[kept], np.asarray(label_lat)[kept],
+            fontsize=6, ha='center', zorder=zorder
+        )
+
     def adjust_lon(self, lon, z):
         """Convierte las longitudes de 0-360 a -180-180 y ajusta z para que coincida.
 
@@ -855,26 +1228,28 @@ class MapGenerator:
         
         return lon, z
     
-    def config_map(self):
+    def config_map(self, dpi: int = MAP_DPI):
         """Configura un mapa con los rangos de latitud y longitud especificados.
         Crea una figura y un eje para el mapa del mundo, establece límites manuales para cubrir todo el mundo y agrega detalles geográficos al mapa.
 
+        Args:
+            dpi (int): Resolución de la figura.
+
         Returns:
             tuple (fig, ax): Tupla con la figura y el eje del mapa.
         """
         lat_max, lon_min, lat_min, lon_max = self.area_covered
         
         # Crear una figura para un mapa del mundo
-        fig, ax = plt.subplots(figsize=(11, 5), dpi=250, subplot_kw=dict(projection=ccrs.PlateCarree()))
+        fig, ax = plt.subplots(figsize=MAP_FIGSIZE, dpi=dpi, subplot_kw=dict(projection=ccrs.PlateCarree()))
         ax.set_global()
 
         # Establecer límites manuales para cubrir todo el mundo
         ax.set_xlim(lon_min, lon_max)
         ax.set_ylim(lat_min, lat_max)
 
-        # Agregar detalles geográficos al mapa
-        ax.coastlines()
-        ax.add_feature(cartopy.feature.BORDERS, linestyle=':')
+        # Agregar detalles geográficos al mapa (costas y fronteras ya recortadas, cacheadas por área)
+        add_basemap(ax, BASEMAP_CACHE.get(ax, self.area_covered, MAP_FIGSIZE, dpi))
         
         return fig, ax
 
@@ -924,49 +1299,150 @@ class MapGenerator:
         ax.set_xticklabels([f'{deg:.0f}°' for deg in xticks])
     
     def save_map(self, date):
-        base_name = f"{OUT_DIR}/{self.request_hash}/map_{self.variable_name}_{self.map_type}_{self.map_level}l_{date}"
-        extension = f".{self.file_format}"
-
-        cont = 0 
-        
-        # Generate a unique file name
-        while True: 
-            if cont == 0: 
-                file_saved = f"{base_name}{extension}" 
-            else: 
-                file_saved = f"{base_name}({cont}){extension}" 
-            if not os.path.exists(file_saved): 
-                break 
-            cont += 1 
+        base_name = unique_base_name(
+            f"{OUT_DIR}/{self.request_hash}/map_{self.variable_name}_{self.map_type}_{self.map_level}l_{date}",
+            self.file_formats
+        )
+        files_saved = []
         
         try:
-            # Save the figure and close it to prevent resource leaks
-            plt.savefig(file_saved, bbox_inches='tight', dpi=250, format=self.file_format)
-            upload_files_to_request_hash(self.request_hash, OUT_DIR+"/"+self.request_hash)
+            # Build the figure once and write it in every requested format
+            fig = plt.gcf()
+            artists = count_artists(fig)
+            start_time = time.time()
+            files_saved = save_figure(fig, base_name, self.file_formats, dpi=250)
+            draw_seconds = time.time() - start_time
+            self.files.extend(files_saved)
+            sizes = ", ".join(f"{os.path.getsize(file_saved) / 1024:.1f} KB {os.path.splitext(file_saved)[1][1:]}"
+                              for file_saved in files_saved)
+            print(f"Map stats ({self.map_type}, labels {self.label_mode}): {artists} artists, drawn and saved in {draw_seconds:.2f} s, "
+                  f"{sizes}")
         except Exception as e:
+            # The map is reported as failed by the caller
             print(f"Error saving figure: {str(e)}")
+            raise
         finally:
             plt.close('all')  # Close all figures to ensure proper cleanup
             
-        print(f"Image saved in: {file_saved}") 
+        print(f"Image saved in: {', '.join(files_saved)}") 
+
+
+def cache_delta(before: dict, after: dict) -> dict:
+    """Counters accumulated by a cache between two ``stats()`` snapshots."""
+    return {name: after[name] - before[name] for name in ("hits", "misses")}
+
 
 # Function for parallel processing
-def generate_map_parallel(args):
-    """Process map generation in parallel."""
+def generate_time_step_maps(args):
+    """Render every map of one pressure level and time step.
+
+    The field is loaded once (or attached from shared memory when the parent
+    already decoded it) and reused by every map type and contour level.
+
+    Args:
+        args (tuple): (file_name, request_hash, variable_name, pressure_level,
+            year, month, day, hour, products, file_format, area_covered,
+            label_mode, shared_field), where products are (map_type, map_level) pairs and
+            shared_field is an optional SharedFieldDescriptor.
+
+    Returns:
+        dict: Date, maps rendered and failed, files written (all and per (map_type, map_level)
+        product) and cache hits/misses of the unit.
+    """
+    (file_name, request_hash, variable_name, pressure_level,
+     year, month, day, hour, products,
+     file_format, area_covered, label_mode, shared_field) = args
+
+    field_stats = FIELD_CACHE.stats()
+    basemap_stats = BASEMAP_CACHE.stats()
+    contour_stats = CONTOUR_CACHE.stats()
+    result = {
+        "date": from_elements_to_date(year, month, day, hour),
+        "pressure_level": pressure_level,
+        "maps": 0,
+        "failed": 0,
+        "files": [],
+        "products": [],
+    }
+
     try:
-        (file_name, request_hash, variable_name, pressure_level, 
-         year, month, day, hour, map_type, map_level, 
-         file_format, area_covered) = args
-        
         # Create directory if it doesn't exist
         os.makedirs(f"{OUT_DIR}/{request_hash}", exist_ok=True)
-        
-        MapGenerator(
+
+        if shared_field is not None:
+            attach_shared_field(shared_field)
+    except Exception as e:
+        print(f"Error in generate_time_step_maps: {str(e)}")
+        result["failed"] = len(products)
+        return result
+
+    for map_type, map_level in products:
+        try:
+            generator = MapGenerator(
+                file_name, request_hash, variable_name, float(pressure_level),
+                year, month, day, hour, map_type, int(map_level),
+                file_format, [float(area) for area in area_covered], label_mode
+            )
+            result["files"].extend(generator.files)
+            # Missing dates, empty areas and NaN fields return without writing anything
+            if generator.files:
+                result["products"].append((map_type, map_level, generator.files))
+            result["maps"] += 1 if generator.files else 0
+            result["failed"] += 0 if generator.files else 1
+        except Exception as e:
+            print(f"Error in generate_time_step_maps ({map_type}, {map_level}): {str(e)}")
+            result["failed"] += 1
+
+    result["field_cache"] = cache_delta(field_stats, FIELD_CACHE.stats())
+    result["basemap_cache"] = cache_delta(basemap_stats, BASEMAP_CACHE.stats())
+    result["contour_cache"] = cache_delta(contour_stats, CONTOUR_CACHE.stats())
+    print(f"Field cache: {FIELD_CACHE.stats()}")
+    print(f"Basemap cache: {BASEMAP_CACHE.stats()}")
+    print(f"Contour cache: {CONTOUR_CACHE.stats()}")
+    return result
+
+
+def generate_animation_maps(args):
+    """Render the animation of one pressure level and contour level over every time step.
+
+    Args:
+        args (tuple): (file_name, request_hash, variable_name, pressure_level,
+            map_type, map_level, frames, file_format, area_covered), where
+            frames are the (year, month, day, hour) of every time step in order.
+
+    Returns:
+        dict: Same fields as ``generate_time_step_maps``.
+    """
+    (file_name, request_hash, variable_name, pressure_level,
+     map_type, map_level, frames, file_format, area_covered) = args
+
+    field_stats = FIELD_CACHE.stats()
+    basemap_stats = BASEMAP_CACHE.stats()
+    result = {
+        "date": f"{from_elements_to_date(*frames[0])}..{from_elements_to_date(*frames[-1])}",
+        "pressure_level": pressure_level,
+        "maps": 0,
+        "failed": 0,
+        "files": [],
+        "products": [],
+    }
+
+    try:
+        os.makedirs(f"{OUT_DIR}/{request_hash}", exist_ok=True)
+        generator = MapGenerator(
             file_name, request_hash, variable_name, float(pressure_level),
-            year, month, day, hour, map_type, int(map_level),
-            file_format, [float(area) for area in area_covered]
+            *frames[0], map_type, int(map_level),
+            file_format, [float(area) for area in area_covered], frames=list(frames)
         )
-        return True
+        result["files"].extend(generator.files)
+        if generator.files:
+            result["products"].append((map_type, map_level, generator.files))
+        result["maps"] += 1 if generator.files else 0
+        result["failed"] += 0 if generator.files else 1
     except Exception as e:
-        print(f"Error in generate_map_parallel: {str(e)}")
-        return False
+        print(f"Error in generate_animation_maps ({map_type}, {map_level}): {str(e)}")
+        result["failed"] += 1
+
+    result["field_cache"] = cache_delta(field_stats, FIELD_CACHE.stats())
+    result["basemap_cache"] = cache_delta(basemap_stats, BASEMAP_CACHE.stats())
+    return result
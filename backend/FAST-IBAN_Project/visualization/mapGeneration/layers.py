@@ -0,0 +1,141 @@
+import numpy as np
+import cartopy.crs as ccrs
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D
+
+# Glyph outlines already built, by (text, fontsize, ha)
+_TEXT_PATHS = {}
+
+
+def data_transform(ax):
+    """Matplotlib transform from lon/lat degrees to the axes' display space."""
+    return ccrs.PlateCarree()._as_mpl_transform(ax)
+
+
+def text_path(text: str, fontsize: float, ha: str = 'left'):
+    """Outline of ``text`` in points, anchored at its baseline like an annotation."""
+    key = (text, fontsize, ha)
+    path = _TEXT_PATHS.get(key)
+    if path is None:
+        path = TextPath((0, 0), text, size=fontsize, prop=FontProperties(size=fontsize))
+        if ha != 'left' and len(path.vertices):
+            x0, x1 = path.vertices[:, 0].min(), path.vertices[:, 0].max()
+            shift = (x0 + x1) / 2 if ha == 'center' else x1
+            path = path.transformed(Affine2D().translate(-shift, 0))
+        _TEXT_PATHS[key] = path
+    return path
+
+
+def visible(ax, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """Mask of the positions that fall inside the axes limits."""
+    x0, x1 = sorted(ax.get_xlim())
+    y0, y1 = sorted(ax.get_ylim())
+    return (lons >= x0) & (lons <= x1) & (lats >= y0) & (lats <= y1)
+
+
+def add_text_layer(ax, texts, lons, lats, fontsize: float, ha: str = 'left', color: str = 'white',
+                   stroke: str = 'black', stroke_width: float = 1, zorder: float = 11):
+    """Draw many labels as one outlined layer instead of one Text artist each.
+
+    Every label becomes a glyph path placed at its (lon, lat) anchor, drawn
+    through two PathCollections: a stroked outline and the fill on top,
+    which reproduces the Stroke + Normal path effects used for annotations.
+    Labels anchored outside the map are dropped, as annotations are.
+
+    Args:
+        ax (GeoAxes): Axes to draw on.
+        texts (list): Label strings.
+        lons, lats (array-like): Anchor of every label in degrees.
+        fontsize (float): Font size in points.
+        ha (str): Horizontal alignment ('left', 'center' or 'right').
+        color (str): Fill color of the glyphs.
+        stroke (str | None): Outline color, or None for no outline.
+        stroke_width (float): Outline width in points.
+        zorder (float): Drawing order of the layer.
+
+    Returns:
+        list: Collections added (empty when no label is visible).
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    keep = visible(ax, lons, lats)
+    if not keep.any():
+        return []
+
+    paths = [text_path(str(text), fontsize, ha) for text, shown in zip(texts, keep) if shown]
+    offsets = np.column_stack((lons[keep], lats[keep]))
+    # Glyph paths are in points; scale them to pixels and place them at the projected anchors
+    points_to_pixels = Affine2D().scale(ax.figure.dpi / 72)
+
+    styles = []
+    if stroke is not None:
+        styles.append(dict(facecolors=color, edgecolors=stroke, linewidths=stroke_width))
+    styles.append(dict(facecolors=color, edgecolors='none', linewidths=0))
+
+    collections = []
+    for style in styles:
+        collection = PathCollection(
+            paths, offsets=offsets, offset_transform=data_transform(ax),
+            transform=points_to_pixels, zorder=zorder, **style
+        )
+        collection.set_clip_path(ax.patch)
+        ax.add_collection(collection, autolim=False)
+        collections.append(collection)
+    return collections
+
+
+def cull_overlapping(ax, texts, lons, lats, fontsize: float, ha: str = 'left',
+                     priority=None, padding: float = 2) -> np.ndarray:
+    """Pick the labels that can be drawn without overlapping each other.
+
+    Label boxes are estimated in display space and accepted greedily by
+    ``priority`` (highest first), checking only the neighbouring cells of a
+    uniform grid as large as the biggest box.
+
+    Returns:
+        np.ndarray: Indices of the labels kept, in their original order.
+    """
+    if len(texts) == 0:
+        return np.zeros(0, dtype=int)
+
+    anchors = data_transform(ax).transform(np.column_stack((lons, lats)))
+    scale = ax.figure.dpi / 72
+    # Average glyph advance of the default font is ~0.6 em
+    widths = np.array([0.6 * fontsize * len(str(text)) for text in texts]) * scale + padding
+    height = fontsize * scale + padding
+    left = anchors[:, 0] - {'left': 0, 'center': 0.5, 'right': 1}[ha] * widths
+
+    order = np.arange(len(texts)) if priority is None else np.argsort(-np.asarray(priority), kind='stable')
+    cell = max(widths.max(), height)
+    grid = {}
+    kept = []
+    for i in order:
+        box = (left[i], anchors[i, 1], left[i] + widths[i], anchors[i, 1] + height)
+        cx, cy = int(box[0] // cell), int(box[1] // cell)
+        neighbours = (grid.get((x, y), ()) for x in (cx - 1, cx, cx + 1) for y in (cy - 1, cy, cy + 1))
+        if any(box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+               for boxes in neighbours for other in boxes):
+            continue
+        grid.setdefault((cx, cy), []).append(box)
+        kept.append(i)
+
+    return np.sort(np.array(kept, dtype=int))
+
+
+def add_outline_layer(ax, polygons, color: str = 'black', linewidth: float = 0.75, zorder: float = 10):
+    """Draw closed polygon outlines (lists of (lon, lat) vertices) as one LineCollection."""
+    if not polygons:
+        return None
+    segments = [np.vstack((polygon, polygon[:1])) for polygon in polygons]
+    collection = LineCollection(
+        segments, colors=color, linewidths=linewidth, transform=data_transform(ax), zorder=zorder
+    )
+    ax.add_collection(collection, autolim=False)
+    return collection
+
+
+def count_artists(fig) -> int:
+    """Number of artists in the figure, children included."""
+    return sum(1 for _ in fig.findobj()) - 1
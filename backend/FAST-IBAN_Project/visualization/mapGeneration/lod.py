@@ -0,0 +1,146 @@
+import os
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Quality knob: scales every budget below (0.5 halves the polygons and points drawn, 2 doubles them)
+LOD_QUALITY = float(os.getenv("LOD_QUALITY", 1.0))
+# Quads drawn by the 3D surface and points drawn by the scatter maps at quality 1
+LOD_MAX_POLYGONS = int(os.getenv("LOD_MAX_POLYGONS", 10000))
+LOD_MAX_POINTS = int(os.getenv("LOD_MAX_POINTS", 20000))
+# Block aggregation of the surface: "minmax" keeps peaks and troughs, "mean" smooths them
+LOD_AGGREGATION = os.getenv("LOD_AGGREGATION", "minmax")
+
+# Polygons or points before and after decimation, and the block side (grid, 1 = untouched)
+# or cell size in degrees (points) used
+LodStats = namedtuple("LodStats", ["original", "rendered", "factor"])
+
+
+def polygon_budget(quality: float = LOD_QUALITY) -> int:
+    return max(int(LOD_MAX_POLYGONS * quality), 1)
+
+
+def point_budget(quality: float = LOD_QUALITY) -> int:
+    return max(int(LOD_MAX_POINTS * quality), 2)
+
+
+def grid_polygons(rows: int, columns: int) -> int:
+    """Quads of a surface drawn over a rows x columns grid."""
+    return max(rows - 1, 0) * max(columns - 1, 0)
+
+
+def block_factor(rows: int, columns: int, max_polygons: int) -> int:
+    """Smallest block side that brings the grid within ``max_polygons`` quads."""
+    factor = max(math.ceil(math.sqrt(grid_polygons(rows, columns) / max_polygons)), 1)
+    while grid_polygons(math.ceil(rows / factor), math.ceil(columns / factor)) > max_polygons:
+        factor += 1
+    return factor
+
+
+def _blocks(array: np.ndarray, factor: int, axis: int) -> np.ndarray:
+    """Pad ``axis`` with NaN to a multiple of ``factor`` and split it in blocks (new axis after it)."""
+    array = np.asarray(array, dtype=np.float64)
+    pad = -array.shape[axis] % factor
+    if pad:
+        widths = [(0, 0)] * array.ndim
+        widths[axis] = (0, pad)
+        array = np.pad(array, widths, constant_values=np.nan)
+    shape = list(array.shape)
+    shape[axis:axis + 1] = [shape[axis] // factor, factor]
+    return array.reshape(shape)
+
+
+def _nanmean(array: np.ndarray, axis) -> np.ndarray:
+    """Mean ignoring NaNs; all-NaN blocks give NaN (without nanmean's warnings)."""
+    valid = ~np.isnan(array)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, array, 0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def aggregate_blocks(values: np.ndarray, factor: int, mode: str = LOD_AGGREGATION) -> np.ndarray:
+    """Reduce a 2-D field to one value per ``factor`` x ``factor`` block.
+
+    ``mean`` averages each block. ``minmax`` keeps the block's maximum (or
+    minimum) where it stands out from the mean (a ridge, a cut-off low), and
+    the mean where the block is a plain gradient, so extremes survive the
+    decimation instead of being skipped by strided sampling. NaNs are ignored.
+    """
+    blocks = _blocks(_blocks(values, factor, 0), factor, 2)
+    mean = _nanmean(blocks, axis=(1, 3))
+    if mode != "minmax":
+        return mean
+
+    valid = ~np.isnan(blocks)
+    high = np.where(valid, blocks, -np.inf).max(axis=(1, 3))
+    low = np.where(valid, blocks, np.inf).min(axis=(1, 3))
+    with np.errstate(invalid="ignore"):
+        above, below = high - mean, mean - low
+        return np.where(above > 2 * below, high, np.where(below > 2 * above, low, mean))
+
+
+def decimate_grid(lon: np.ndarray, lat: np.ndarray, values: np.ndarray,
+                  max_polygons: int = None, mode: str = LOD_AGGREGATION) -> tuple:
+    """Aggregate a (lat, lon) field until its surface has at most ``max_polygons`` quads.
+
+    Args:
+        lon, lat (np.ndarray): 1-D coordinates of the grid.
+        values (np.ndarray): Field on the (lat, lon) grid.
+        max_polygons (int, optional): Quad budget. Defaults to ``LOD_MAX_POLYGONS`` x ``LOD_QUALITY``.
+        mode (str): Block aggregation, "minmax" or "mean".
+
+    Returns:
+        tuple: (lon, lat, values, LodStats); coordinates are the block centers.
+    """
+    max_polygons = max_polygons or polygon_budget()
+    rows, columns = values.shape
+    original = grid_polygons(rows, columns)
+    if original <= max_polygons:
+        return lon, lat, values, LodStats(original, original, 1)
+
+    factor = block_factor(rows, columns, max_polygons)
+    lon = _nanmean(_blocks(lon, factor, 0), axis=1)
+    lat = _nanmean(_blocks(lat, factor, 0), axis=1)
+    values = aggregate_blocks(values, factor, mode)
+    return lon, lat, values, LodStats(original, grid_polygons(*values.shape), factor)
+
+
+def decimate_points(lon: np.ndarray, lat: np.ndarray, values: np.ndarray, max_points: int = None) -> tuple:
+    """Thin a dense point cloud, keeping the lowest and highest point of each cell.
+
+    Points are binned in a lon/lat grid with half as many cells as the budget,
+    so at most ``max_points`` are kept and the extremes of every region stay
+    visible. Clouds within the budget are returned untouched.
+
+    Args:
+        lon, lat, values (np.ndarray): Coordinates and value of every point.
+        max_points (int, optional): Point budget. Defaults to ``LOD_MAX_POINTS`` x ``LOD_QUALITY``.
+
+    Returns:
+        tuple: (indices of the points kept, in their original order, LodStats).
+    """
+    max_points = max_points or point_budget()
+    lon, lat, values = np.asarray(lon, float), np.asarray(lat, float), np.asarray(values, float)
+    original = len(values)
+    if original <= max_points:
+        return np.arange(original), LodStats(original, original, 1)
+
+    width = max(np.ptp(lon), 1e-9)
+    height = max(np.ptp(lat), 1e-9)
+    cells = max_points // 2
+    cell = math.sqrt(width * height / cells)
+    columns = max(int(width / cell), 1)
+    rows = max(cells // columns, 1)
+    x = np.minimum(((lon - lon.min()) / width * columns).astype(np.int64), columns - 1)
+    y = np.minimum(((lat - lat.min()) / height * rows).astype(np.int64), rows - 1)
+    cell_ids = y * columns + x
+
+    # Sort by cell and then value: the first and last point of each run are its extremes
+    order = np.lexsort((np.nan_to_num(values, nan=np.inf), cell_ids))
+    sorted_cells = cell_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    keep = np.unique(np.concatenate((order[starts], order[ends])))
+    return keep, LodStats(original, len(keep), cell)
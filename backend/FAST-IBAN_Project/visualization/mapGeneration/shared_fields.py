@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from visualization.mapGeneration.field_cache import FIELD_CACHE, PreparedField
+
+# Upper bound for the fields published at the same time by the parent process.
+# Keep it below the container's /dev/shm size (shm_size in docker-compose).
+SHARED_FIELDS_MAX_MB = float(os.getenv("SHARED_FIELDS_MAX_MB", 256))
+
+# Lightweight, picklable reference to a field living in shared memory.
+# lat/lon are small and travel inline; the field itself stays in the block.
+SharedFieldDescriptor = namedtuple(
+    "SharedFieldDescriptor", ["key", "shm_name", "shape", "dtype", "lat", "lon"]
+)
+
+# Worker side: blocks attached by this process, by block name -> (cache key, block)
+_ATTACHED = {}
+
+
+class SharedFieldStore:
+    """Parent-side owner of the shared memory blocks handed to the workers.
+
+    Each field is published once and reference counted by the tasks that use
+    it; the block is unlinked as soon as the last of those tasks finishes, so
+    only the fields of in-flight tasks occupy /dev/shm.
+    """
+
+    def __init__(self, max_bytes: int = int(SHARED_FIELDS_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._blocks
+
+    def acquire(self, key, loader):
+        """Return the descriptor for ``key``, publishing ``loader()`` on first use.
+
+        Args:
+            key (tuple): Field cache key the workers will register the field under.
+            loader (callable): Builds the PreparedField, or returns None.
+
+        Returns:
+            SharedFieldDescriptor | None: Descriptor to pass to the workers.
+        """
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                block["refs"] += 1
+                return block["descriptor"]
+
+        field = loader()
+        if field is None:
+            return None
+
+        variable = np.ascontiguousarray(field.variable)
+        shm = shared_memory.SharedMemory(create=True, size=max(variable.nbytes, 1))
+        np.ndarray(variable.shape, dtype=variable.dtype, buffer=shm.buf)[...] = variable
+
+        descriptor = SharedFieldDescriptor(
+            key, shm.name, variable.shape, variable.dtype.str,
+            np.asarray(field.lat), np.asarray(field.lon)
+        )
+
+        with self._lock:
+            self._blocks[key] = {"shm": shm, "descriptor": descriptor, "refs": 1}
+            self.nbytes += shm.size
+
+        return descriptor
+
+    def release(self, key):
+        """Drop one reference to ``key`` and unlink its block when unused."""
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                return
+            block["refs"] -= 1
+            if block["refs"] > 0:
+                return
+            del self._blocks[key]
+            self.nbytes -= block["shm"].size
+
+        self._unlink(block["shm"])
+
+    def is_full(self) -> bool:
+        return self.nbytes >= self.max_bytes
+
+    def close(self):
+        """Unlink every block still published."""
+        with self._lock:
+            blocks = list(self._blocks.values())
+            self._blocks.clear()
+            self.nbytes = 0
+
+        for block in blocks:
+            self._unlink(block["shm"])
+
+    @staticmethod
+    def _unlink(shm):
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def attach_shared_field(descriptor: SharedFieldDescriptor):
+    """Register a published field in this process' field cache without copying it.
+
+    The field becomes a read-only NumPy view over the shared block, so
+    ``load_field`` calls for the same key are served from it.
+
+    Args:
+        descriptor (SharedFieldDescriptor): Descriptor received in the task.
+    """
+    _release_unused()
+
+    if descriptor.key in FIELD_CACHE:
+        return
+
+    shm = shared_memory.SharedMemory(name=descriptor.shm_name)
+    variable = np.ndarray(descriptor.shape, dtype=np.dtype(descriptor.dtype), buffer=shm.buf)
+
+    _ATTACHED[shm.name] = (descriptor.key, shm)
+    FIELD_CACHE.put(descriptor.key, PreparedField(descriptor.lat, descriptor.lon, variable))
+
+
+def _release_unused():
+    """Close the attached blocks whose fields have left the field cache."""
+    for name, (key, shm) in list(_ATTACHED.items()):
+        if key in FIELD_CACHE:
+            continue
+        try:
+            shm.close()
+        except BufferError:
+            # A map still holds a view over the block; retry on the next attach
+            continue
+        del _ATTACHED[name]
@@ -0,0 +1,182 @@
+import os
+import json
+import math
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+import matplotlib.pyplot as plt
+import cartopy.crs as ccrs
+from PIL import Image
+
+from visualization.mapGeneration.basemap_cache import BASEMAP_CACHE, add_basemap
+
+# Tile pyramid in plate carrée (EPSG:4326, as Leaflet's L.CRS.EPSG4326):
+# zoom z has 2^(z+1) x 2^z tiles of 180/2^z degrees, x from 180W and y from 90N
+TILE_SIZE = int(os.getenv("TILE_SIZE", 256))
+TILE_MIN_ZOOM = int(os.getenv("TILE_MIN_ZOOM", 0))
+# Deepest zoom rendered: tiles of under 3 degrees, already finer than the 0.25 degree grids
+TILE_ZOOM_LIMIT = 6
+TILE_MAX_ZOOM = min(int(os.getenv("TILE_MAX_ZOOM", 3)), TILE_ZOOM_LIMIT)
+# Tiles per side of a metatile, the largest image rendered at once
+TILE_METATILE = int(os.getenv("TILE_METATILE", 4))
+# Pixels drawn around each metatile and cut off, so lines run across its edges
+TILE_BUFFER = int(os.getenv("TILE_BUFFER", 64))
+# 64 dpi keeps figure sizes exact in pixels (TILE_SIZE is a multiple of 64) and fonts legible
+TILE_DPI = 64
+
+# duplicates maps the z/x/y of every tile not written to the identical tile that was
+TileStats = namedtuple("TileStats", ["written", "empty", "duplicates", "files"])
+
+
+def tile_degrees(zoom: int) -> float:
+    return 180 / 2 ** zoom
+
+
+def tile_range(area_covered, zoom: int) -> tuple:
+    """Columns and rows (x0, x1, y0, y1, inclusive) of the tiles that cover the area (N W S E)."""
+    lat_max, lon_min, lat_min, lon_max = area_covered
+    size = tile_degrees(zoom)
+    x_count, y_count = 2 ** (zoom + 1), 2 ** zoom
+
+    x0 = min(max(math.floor((lon_min + 180) / size), 0), x_count - 1)
+    x1 = min(max(math.ceil((lon_max + 180) / size) - 1, x0), x_count - 1)
+    y0 = min(max(math.floor((90 - lat_max) / size), 0), y_count - 1)
+    y1 = min(max(math.ceil((90 - lat_min) / size) - 1, y0), y_count - 1)
+    return x0, x1, y0, y1
+
+
+def render_metatile(draw, zoom: int, x: int, y: int, columns: int, rows: int) -> np.ndarray:
+    """Render ``columns`` x ``rows`` tiles from tile (x, y) as one image, with ``TILE_BUFFER`` pixels around.
+
+    The buffer is drawn and cut off afterwards, so lines cross the edges of
+    the metatile; it is left out on the sides touching the edge of the world.
+
+    Returns:
+        np.ndarray: RGBA image of the tiles, without the buffer.
+    """
+    size = tile_degrees(zoom)
+    left = TILE_BUFFER if x > 0 else 0
+    right = TILE_BUFFER if x + columns < 2 ** (zoom + 1) else 0
+    top = TILE_BUFFER if y > 0 else 0
+    bottom = TILE_BUFFER if y + rows < 2 ** zoom else 0
+    degrees = size / TILE_SIZE
+    west, east = -180 + x * size - left * degrees, -180 + (x + columns) * size + right * degrees
+    north, south = 90 - y * size + top * degrees, 90 - (y + rows) * size - bottom * degrees
+    figsize = ((columns * TILE_SIZE + left + right) / TILE_DPI, (rows * TILE_SIZE + top + bottom) / TILE_DPI)
+
+    fig = plt.figure(figsize=figsize, dpi=TILE_DPI)
+    try:
+        fig.patch.set_alpha(0)
+        ax = fig.add_axes([0, 0, 1, 1], projection=ccrs.PlateCarree())
+        ax.set_xlim(west, east)
+        ax.set_ylim(south, north)
+        ax.patch.set_visible(False)
+        ax.spines['geo'].set_visible(False)
+
+        add_basemap(ax, BASEMAP_CACHE.get(ax, (north, west, south, east), figsize, TILE_DPI))
+        draw(ax)
+
+        fig.canvas.draw()
+        image = np.asarray(fig.canvas.buffer_rgba())
+    finally:
+        plt.close(fig)
+
+    return image[top:top + rows * TILE_SIZE, left:left + columns * TILE_SIZE]
+
+
+def render_zoom_level(draw, area_covered, zoom: int, out_dir: str, written: dict = None) -> TileStats:
+    """Render one zoom level in metatiles of up to ``TILE_METATILE`` x ``TILE_METATILE`` tiles and cut them.
+
+    Only one metatile is in memory at a time, so the figure does not grow
+    with the zoom. The background is transparent and tiles with nothing drawn
+    on them (open ocean, outside the data) are not written; a tile identical
+    to one already written is recorded as a duplicate of it instead.
+
+    Args:
+        draw (callable): ``draw(ax)`` adds the map content to a GeoAxes.
+        area_covered (list): Area as N W S E.
+        zoom (int): Zoom level.
+        out_dir (str): Root of the pyramid; tiles go to ``{z}/{x}/{y}.png``.
+        written (dict, optional): Digest -> ``z/x/y`` of the tiles written so far, shared by the levels.
+
+    Returns:
+        TileStats: Tiles written, skipped and duplicated, and the files written.
+    """
+    x0, x1, y0, y1 = tile_range(area_covered, zoom)
+    written = {} if written is None else written
+
+    files = []
+    empty = 0
+    duplicates = {}
+    for x in range(x0, x1 + 1, TILE_METATILE):
+        for y in range(y0, y1 + 1, TILE_METATILE):
+            columns, rows = min(TILE_METATILE, x1 - x + 1), min(TILE_METATILE, y1 - y + 1)
+            image = render_metatile(draw, zoom, x, y, columns, rows)
+
+            for row in range(rows):
+                for column in range(columns):
+                    tile = image[row * TILE_SIZE:(row + 1) * TILE_SIZE, column * TILE_SIZE:(column + 1) * TILE_SIZE]
+                    if not tile[..., 3].any():
+                        empty += 1
+                        continue
+                    name = f"{zoom}/{x + column}/{y + row}"
+                    digest = hashlib.blake2b(tile.tobytes(), digest_size=16).hexdigest()
+                    if digest in written:
+                        duplicates[name] = written[digest]
+                        continue
+                    written[digest] = name
+                    tile_dir = os.path.join(out_dir, str(zoom), str(x + column))
+                    os.makedirs(tile_dir, exist_ok=True)
+                    path = os.path.join(tile_dir, f"{y + row}.png")
+                    Image.fromarray(tile).save(path)
+                    files.append(path)
+
+    return TileStats(len(files), empty, duplicates, files)
+
+
+def render_tile_pyramid(draw, area_covered, out_dir: str, metadata: dict = None,
+                        min_zoom: int = TILE_MIN_ZOOM, max_zoom: int = TILE_MAX_ZOOM) -> TileStats:
+    """Render every zoom level of the pyramid and describe it in ``tiles.json``.
+
+    Args:
+        draw (callable): ``draw(ax)`` adds the map content to a GeoAxes.
+        area_covered (list): Area as N W S E.
+        out_dir (str): Root folder of the pyramid.
+        metadata (dict, optional): Extra entries for ``tiles.json``.
+        min_zoom, max_zoom (int): Zoom levels rendered.
+
+    Returns:
+        TileStats: Totals over every level; files include ``tiles.json``.
+    """
+    max_zoom = min(max_zoom, TILE_ZOOM_LIMIT)
+    written, empty, duplicates, files = 0, 0, {}, []
+    digests = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        stats = render_zoom_level(draw, area_covered, zoom, out_dir, digests)
+        written += stats.written
+        empty += stats.empty
+        duplicates.update(stats.duplicates)
+        files.extend(stats.files)
+
+    lat_max, lon_min, lat_min, lon_max = area_covered
+    manifest = {
+        "scheme": "xyz",
+        "crs": "EPSG:4326",
+        "tiles": "{z}/{x}/{y}.png",
+        "tile_size": TILE_SIZE,
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "bounds": [lon_min, lat_min, lon_max, lat_max],
+        "written": written,
+        "empty": empty,
+        # Tiles not written because they are identical to another one: z/x/y -> z/x/y to load instead
+        "duplicates": duplicates,
+        **(metadata or {}),
+    }
+    manifest_path = os.path.join(out_dir, "tiles.json")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    files.append(manifest_path)
+
+    return TileStats(written, empty, duplicates, files)
@@ -0,0 +1,131 @@
+import os
+import json
+
+import numpy as np
+
+from visualization.mapGeneration.contour_cache import contour_lines
+
+# Decimals kept in exported coordinates (2 ~ 1 km, below the 0.25 deg grid)
+GEOJSON_PRECISION = int(os.getenv("GEOJSON_PRECISION", 2))
+# Largest deviation (degrees) allowed when simplifying contour lines, well below the 0.25 deg grid
+GEOJSON_SIMPLIFY_DEG = float(os.getenv("GEOJSON_SIMPLIFY_DEG", 0.02))
+
+
+def simplify(line: np.ndarray, tolerance: float = GEOJSON_SIMPLIFY_DEG) -> np.ndarray:
+    """Douglas-Peucker simplification of a (lon, lat) polyline.
+
+    Marching squares emits one vertex per crossed cell edge, most of them
+    nearly collinear; the endpoints (and so closed rings) are always kept.
+    """
+    if tolerance <= 0 or len(line) < 3:
+        return line
+
+    keep = np.zeros(len(line), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(line) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last <= first + 1:
+            continue
+        chord = line[last] - line[first]
+        offsets = line[first + 1:last] - line[first]
+        length = np.hypot(chord[0], chord[1])
+        if length > 0:
+            distances = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.extend(((first, split), (split, last)))
+    return line[keep]
+
+
+def quantize(coords: np.ndarray, precision: int = GEOJSON_PRECISION) -> np.ndarray:
+    """Round (lon, lat) vertices and drop the consecutive ones that became equal."""
+    coords = np.round(np.asarray(coords, dtype=float), precision)
+    if len(coords) > 1:
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        coords = coords[keep]
+    return coords
+
+
+def to_list(coords: np.ndarray, precision: int = GEOJSON_PRECISION) -> list:
+    """Coordinates as nested lists, with integers where the decimals are zero to save bytes."""
+    values = []
+    for vertex in coords:
+        rounded = [round(float(x), precision) for x in vertex]
+        values.append([int(x) if x.is_integer() else x for x in rounded])
+    return values
+
+
+def contour_features(geometry, precision: int = GEOJSON_PRECISION,
+                     tolerance: float = GEOJSON_SIMPLIFY_DEG) -> list:
+    """One MultiLineString per contour level, from the cached contour lines."""
+    lines_by_level = {}
+    for level, line in contour_lines(geometry):
+        line = quantize(simplify(line, tolerance), precision)
+        if len(line) >= 2:
+            lines_by_level.setdefault(level, []).append(to_list(line, precision))
+
+    return [
+        {
+            "type": "Feature",
+            "geometry": {"type": "MultiLineString", "coordinates": lines},
+            "properties": {"layer": "contours", "level": round(level, 2)},
+        }
+        for level, lines in lines_by_level.items()
+    ]
+
+
+def point_features(lons, lats, values, clusters, types, precision: int = GEOJSON_PRECISION) -> list:
+    """One MultiPoint per cluster of selected points; ``values`` follow the point order."""
+    lons, lats, values = np.asarray(lons), np.asarray(lats), np.asarray(values)
+    clusters, types = np.asarray(clusters), np.asarray(types)
+
+    features = []
+    for cluster_id in dict.fromkeys(clusters.tolist()):
+        rows = np.flatnonzero(clusters == cluster_id)
+        coords = np.round(np.column_stack((lons[rows], lats[rows])).astype(float), precision)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "MultiPoint", "coordinates": to_list(coords, precision)},
+            "properties": {
+                "layer": "points",
+                "cluster": int(cluster_id),
+                "type": str(types[rows[0]]),
+                "values": [round(float(value), 1) for value in values[rows]],
+            },
+        })
+    return features
+
+
+def hull_features(hulls, properties, precision: int = GEOJSON_PRECISION) -> list:
+    """One Polygon per formation hull (closed (lon, lat) rings), with its properties."""
+    features = []
+    for hull, feature_properties in zip(hulls, properties):
+        ring = quantize(np.vstack((hull, hull[:1])), precision)
+        if len(ring) < 4:
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [to_list(ring, precision)]},
+            "properties": {"layer": "formations", **feature_properties},
+        })
+    return features
+
+
+def write_feature_collection(path: str, features: list, properties: dict = None) -> str:
+    """Write a compact GeoJSON FeatureCollection (no whitespace) and return its path.
+
+    ``properties`` describe the whole product (date, variable, level step...)
+    and are stored as a foreign member of the collection.
+    """
+    collection = {"type": "FeatureCollection", "features": features}
+    if properties:
+        collection["properties"] = properties
+    with open(path, "w") as f:
+        json.dump(collection, f, separators=(",", ":"))
+    return path
@@ -67,7 +67,7 @@ const RequestSummary: React.FC<RequestSummaryProps> = ({ formData, onPrevious, t
     const days = formData.days;
     const hours = formData.hours;
     const mapTypes = formData.mapTypes;
-    const fileFormat = formData.fileFormat ?? t("common.none");
+    const fileFormat = formData.fileFormat?.length ? formData.fileFormat.join(", ") : t("common.none");
 
     // Create array of summary items
     const summaryItems = [
@@ -198,7 +198,7 @@ export const FORM_FIELDS_CONFIG: FormFieldConfig[] = [
   {
     id: "fileFormat",
     name: "fileFormat",
-    inputType: InputType.SELECT,
+    inputType: InputType.MULTISELECT,
     tabPlace: TabPlace.ADDITIONAL_SETTINGS,
     advancedField: false,
     optionalField: true,
@@ -206,6 +206,7 @@ export const FORM_FIELDS_CONFIG: FormFieldConfig[] = [
     label: "requests-form.fileFormat",
     tooltip: "requests-form.fileFormatTooltip",
     options: FILE_FORMAT_OPTIONS.map(format => ({ value: format, label: format.toUpperCase() })),
+    defaultValue: [],
   },
   {
     id: "noMaps",
@@ -133,7 +133,7 @@ export const AVAILABLE_HOURS = Array.from({ length: 24 }, (_, i) => i.toString()
 /**
  * Available map types for selection
  */
-export const MAP_TYPES = ["cont", "disp", "comb", "forms"];
+export const MAP_TYPES = ["cont", "disp", "comb", "forms", "geojson", "tiles", "anim"];
 
 /**
  * Available map areas for selection
@@ -148,7 +148,7 @@ export const MAP_LEVELS = ["10", "15", "20", "25", "30"];
 /**
  * Available file formats for selection
  */
-export const FILE_FORMAT_OPTIONS = ["svg", "png", "jpg", "jpeg", "pdf"];
+export const FILE_FORMAT_OPTIONS = ["svg", "png", "jpg", "jpeg", "pdf", "webp", "gif", "mp4"];
 
 /**
  * Toast duration in milliseconds
@@ -23,6 +23,7 @@ const initialState: SubmitRequestsState = {
     areaCovered: [],
     mapTypes: [],
     mapLevels: [],
+    fileFormat: [],
   } as RequestForm,
   isSubmitting: false,
   requestHash: null,
@@ -36,6 +37,11 @@ export const submitRequest = createAsyncThunk(
   async (requestData: RequestForm, { rejectWithValue }) => {
     try {
       const token = localStorage.getItem("token");
+      // Every format is rendered from the same figure; the API takes them comma separated ("png,svg")
+      const body = JSON.stringify({
+        ...requestData,
+        fileFormat: requestData.fileFormat?.length ? requestData.fileFormat.join(",") : undefined,
+      });
       let response;
 
       if (!token) {
@@ -44,7 +50,7 @@ export const submitRequest = createAsyncThunk(
           headers: {
             "Content-Type": "application/json",
           },
-          body: JSON.stringify(requestData),
+          body,
         });
       } else {
         response = await fetch(API_URL_REQUESTS, {
@@ -53,7 +59,7 @@ export const submitRequest = createAsyncThunk(
             Authorization: `Bearer ${token}`,
             "Content-Type": "application/json",
           },
-          body: JSON.stringify(requestData),
+          body,
         });
       }
 
@@ -21,7 +21,7 @@ export interface RequestForm {
   areaCovered?: string[];
   mapTypes?: string[];
   mapLevels?: string[];
-  fileFormat?: string;
+  fileFormat?: string[];
   noMaps?: boolean;
   noData?: boolean;
   omp?: boolean;
@@ -213,7 +213,7 @@ function toRequestForm(request: UserRequestsReturned): RequestForm {
     areaCovered: request.areaCovered,
     mapTypes: request.mapTypes,
     mapLevels: request.mapLevels,
-    fileFormat: request.fileFormat,
+    fileFormat: request.fileFormat ? request.fileFormat.split(",") : [],
     noMaps: request.noMaps,
     noData: request.noData,
     omp: request.omp,